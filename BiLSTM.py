@@ -1,46 +1,33 @@
 import numpy as np
-import pandas as pd
+import os
 import mlflow
 import mlflow.keras
-from tensorflow.keras.preprocessing.text import Tokenizer #type:ignore
-from tensorflow.keras.preprocessing.sequence import pad_sequences #type:ignore
 from tensorflow.keras.models import Sequential #type:ignore
-from tensorflow.keras.layers import Embedding, LSTM, Bidirectional, Dense, Dropout, BatchNormalization #type:ignore
+from tensorflow.keras.layers import Input, Embedding, LSTM, Bidirectional, Dense, Dropout, BatchNormalization #type:ignore
 from tensorflow.keras.optimizers import Adam #type:ignore
+from Preprocessing import load_preprocessed
+from EmbeddingStore import build_embedding_matrix
+import InputPipeline
 
 # --- 1. Load Data ---
-df = pd.read_csv('Dataset/master_dataset.csv').dropna()
-X = df['text']
-y = pd.get_dummies(df['label']).values
-num_classes = y.shape[1]
-
-# Tokenization
+# Tokenization (fitted once per dataset version and shared with TuneModel.py / Metrics.py)
 max_words = 20000
 max_len = 100
-tokenizer = Tokenizer(num_words=max_words)
-tokenizer.fit_on_texts(X)
-X_seq = pad_sequences(tokenizer.texts_to_sequences(X), maxlen=max_len)
+data = load_preprocessed(num_words=max_words, max_len=max_len)
+tokenizer, X_seq = data.tokenizer, data.X_seq
+num_classes = len(data.label_encoder.classes_)
+y = np.eye(num_classes, dtype=np.float32)[data.y]
 
 # --- 2. Load GloVe Embeddings ---
+# Memory-mapped binary copy of glove.6B.100d.txt (converted on first use, see EmbeddingStore.py)
 print("Loading GloVe Embeddings...")
-embeddings_index = {}
-with open('Dataset/glove.6B.100d.txt', encoding='utf-8') as f:
-    for line in f:
-        values = line.split()
-        word = values[0]
-        embeddings_index[word] = np.asarray(values[1:], dtype='float32')
-
-# Create Embedding Matrix
-embedding_matrix = np.zeros((max_words, 100))
-for word, i in tokenizer.word_index.items():
-    if i < max_words:
-        embedding_vector = embeddings_index.get(word)
-        if embedding_vector is not None:
-            embedding_matrix[i] = embedding_vector
+embedding_matrix = build_embedding_matrix(tokenizer.word_index, max_words)
 
 # --- 3. Build Bidirectional Model ---
 def build_bilstm():
     model = Sequential([
+        # Variable-length input so length-bucketed batches (INPUT_PIPELINE=tfdata) aren't re-padded
+        Input(shape=(None,), dtype='int32'),
         # Load GloVe weights into Embedding layer
         Embedding(max_words, 100, weights=[embedding_matrix], trainable=False),
         
@@ -62,9 +49,14 @@ mlflow.set_experiment("Emotion_BiLSTM_GloVe")
 
 with mlflow.start_run(run_name="BiLSTM_with_GloVe_v1"):
     model = build_bilstm()
-    history = model.fit(X_seq, y, epochs=10, batch_size=64, validation_split=0.2)
+    # Same last-20% hold-out as validation_split=0.2, made explicit so it also works with tf.data
+    cut = int(len(X_seq) * 0.8)
+    history = InputPipeline.fit(model, X_seq[:cut], y[:cut], (X_seq[cut:], y[cut:]), epochs=10, batch_size=64)
     
-    # Log metrics
+    # Log metrics and the exact tokenizer the model was trained with
+    mlflow.log_param("dataset_hash", data.dataset_hash)
     mlflow.log_metric("final_val_accuracy", history.history['val_accuracy'][-1])
+    for artifact in ('tokenizer.pickle', 'label_encoder.pickle', 'vocab.json'):
+        mlflow.log_artifact(os.path.join(data.path, artifact), "preprocessing")
     mlflow.keras.log_model(model, "bilstm_glove_model")
     print(f"Training Complete. Val Accuracy: {history.history['val_accuracy'][-1]}")
\ No newline at end of file
@@ -1,5 +1,11 @@
 import pandas as pd
+import argparse
+import hashlib
+import json
+import os
 import re
+import shutil
+import time
 
 def clean_text(text):
     if not isinstance(text, str): return ""
@@ -8,6 +14,25 @@ def clean_text(text):
     text = re.sub(r"[^\w\s]", "", text) 
     return text.strip()
 
+# Both clean_text passes folded into one pattern. URL/mention matches are tried first at
+# every position, so they are found exactly where the first pass would find them, and any
+# other non-word character is dropped just like in the second pass.
+_CLEAN_RE = re.compile(r"http\S+|www\S+|@\w+|[^\w\s]")
+
+def clean_texts(texts):
+    """
+    Batch version of clean_text for a list or pandas Series.
+    Output matches [clean_text(t) for t in texts] exactly; a Series keeps its index.
+    """
+    if isinstance(texts, pd.Series):
+        is_str = texts.map(type) == str
+        cleaned = texts.where(is_str, "").astype(object)
+        cleaned = cleaned.str.lower().str.replace(_CLEAN_RE, "", regex=True).str.strip()
+        return cleaned.where(is_str, "")
+
+    sub = _CLEAN_RE.sub
+    return [sub("", t.lower()).strip() if isinstance(t, str) else "" for t in texts]
+
 mapping = {
     'admiration': 'joy', 'amusement': 'joy', 'approval': 'joy', 'excitement': 'joy', 
     'gratitude': 'joy', 'joy': 'joy', 'love': 'joy', 'optimism': 'joy', 'pride': 'joy',
@@ -19,47 +44,297 @@ mapping = {
     'shame': 'sadness', 'guilt': 'sadness', 'disgust': 'disgust'
 }
 
+LABELS = sorted(set(mapping.values()))
+CHUNK_SIZE = 50000
+MASTER_CSV = 'Dataset/master_dataset.csv'
+MASTER_PARQUET_DIR = 'Dataset/master_dataset'
+SHARD_DIR = 'Dataset/shards'
+MANIFEST_PATH = 'Dataset/etl_manifest.json'
+# Which master dataset copy the training / monitoring scripts read: 'csv', 'parquet', or
+# 'auto' (whichever was written last, so a newer CSV from a plain run or `dvc pull` wins)
+MASTER_DATASET_FORMAT = os.environ.get('MASTER_DATASET_FORMAT', 'auto')
+
+# Bump when standardize/clean_texts change so every cached shard is rebuilt
+ETL_VERSION = 1
+
+def _read_chunks(path, chunksize, **kwargs):
+    if chunksize is None:
+        yield pd.read_csv(path, **kwargs)
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, **kwargs)
+
+# Each reader yields raw (text, label) frames, one per chunk
+def read_twitter(chunksize=None, path='Dataset/twitter.csv'):
+    for tw in _read_chunks(path, chunksize, encoding='latin-1'):
+        yield tw[['text', 'sentiment']].rename(columns={'sentiment': 'label'})
+
+def read_isear(chunksize=None, path='Dataset/isear.csv'):
+    for isear in _read_chunks(path, chunksize, sep='|', on_bad_lines='skip'):
+        isear = isear.iloc[:, [0, -1]]
+        isear.columns = ['label', 'text']
+        yield isear
+
+def read_goemotions(chunksize=None, path='Dataset/goemotions_1.csv'):
+    for go_raw in _read_chunks(path, chunksize):
+        # Identify the emotion columns
+        emotion_cols = [col for col in go_raw.columns if col in mapping.keys()]
+
+        # idxmax(axis=1)
+        go_raw['label'] = go_raw[emotion_cols].idxmax(axis=1)
+        yield go_raw[['text', 'label']]
+
+SOURCES = {
+    'twitter': (read_twitter, 'Dataset/twitter.csv'),
+    'isear': (read_isear, 'Dataset/isear.csv'),
+    'goemotions_1': (read_goemotions, 'Dataset/goemotions_1.csv'),
+    'goemotions_2': (read_goemotions, 'Dataset/goemotions_2.csv'),
+    'goemotions_3': (read_goemotions, 'Dataset/goemotions_3.csv'),
+}
+
+def standardize(df):
+    """Maps labels to the 7 classes, drops incomplete rows and cleans the text."""
+    df = df.assign(label=df['label'].map(mapping))
+    df = df.dropna(subset=['label', 'text'])
+    df = df.assign(text=clean_texts(df['text']))
+    return df[df['text'] != ""]
+
+def iter_standardized(chunksize=CHUNK_SIZE):
+    """Yields (source name, standardized chunk) in master dataset order."""
+    for name, (reader, path) in SOURCES.items():
+        for chunk in reader(chunksize, path):
+            yield name, standardize(chunk)
+
 def load_and_standardize():
     print("--- Starting Data Setup ---")
-
-    # 1. Twitter
-    tw = pd.read_csv('Dataset/twitter.csv', encoding='latin-1')
-    tw = tw[['text', 'sentiment']].rename(columns={'sentiment': 'label'})
-
-    # 2. ISEAR
-    isear = pd.read_csv('Dataset/isear.csv', sep='|', on_bad_lines='skip')
-    isear = isear.iloc[:, [0, -1]]
-    isear.columns = ['label', 'text']
-
-    # 3. GoEmotions 
-    print("Processing GoEmotion...")
-    g1 = pd.read_csv('Dataset/goemotions_1.csv')
-    g2 = pd.read_csv('Dataset/goemotions_2.csv')
-    g3 = pd.read_csv('Dataset/goemotions_3.csv')
-    go_raw = pd.concat([g1, g2, g3], ignore_index=True)
-    
-    # Identify the emotion columns
-    emotion_cols = [col for col in go_raw.columns if col in mapping.keys()]
-    
-    # idxmax(axis=1)
-    go_raw['label'] = go_raw[emotion_cols].idxmax(axis=1)
-    go = go_raw[['text', 'label']]
-
-    # Merge All
-    print("Merging and Mapping...")
-    master_df = pd.concat([tw, isear, go], ignore_index=True)
-    master_df['label'] = master_df['label'].map(mapping)
-    
-    # Cleaning
-    master_df = master_df.dropna(subset=['label', 'text'])
-    master_df['text'] = master_df['text'].apply(clean_text)
-    master_df = master_df[master_df['text'] != ""]
-    
+    master_df = pd.concat([chunk for _, chunk in iter_standardized(chunksize=None)], ignore_index=True)
     return master_df
 
+def to_columnar(df, source):
+    """text as string, label and source as categoricals (stored as Parquet dictionaries)."""
+    return pd.DataFrame({
+        'text': df['text'].astype(str).values,
+        'label': pd.Categorical(df['label'].values, categories=LABELS),
+        'source': pd.Categorical([source] * len(df), categories=list(SOURCES)),
+    })
+
+def peak_rss_mb():
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def stream_standardize(out_dir=MASTER_PARQUET_DIR, chunksize=CHUNK_SIZE):
+    """
+    Streams every source in bounded-memory chunks and writes the master dataset as
+    numbered Parquet part files (row order matches master_dataset.csv).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    print(f"--- Streaming Data Setup (chunks of {chunksize} rows) ---")
+    start = time.perf_counter()
+    tmp_dir = out_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    rows_in = rows_out = 0
+    label_counts = pd.Series(0, index=LABELS)
+    for part, (source, chunk) in enumerate(iter_standardized(chunksize)):
+        table = pa.Table.from_pandas(to_columnar(chunk, source), preserve_index=False)
+        pq.write_table(table, os.path.join(tmp_dir, f'part-{part:05d}.parquet'))
+        rows_out += len(chunk)
+        label_counts = label_counts.add(chunk['label'].value_counts(), fill_value=0)
+
+    # Swap the finished dataset in so readers never see a half-written directory
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {rows_out} rows to {out_dir} in {elapsed:.1f}s ({rows_out / elapsed:,.0f} rows/sec)")
+    print(f"Peak RSS: {peak_rss_mb():.0f} MB")
+    return label_counts.astype(int).sort_values(ascending=False)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def pipeline_fingerprint():
+    return hashlib.sha256(json.dumps([ETL_VERSION, mapping], sort_keys=True).encode()).hexdigest()[:16]
+
+def _source_hash(path, previous):
+    # Re-hash only when size or mtime moved; a touched but identical file still matches
+    stat = os.stat(path)
+    if previous and previous.get('size') == stat.st_size and previous.get('mtime_ns') == stat.st_mtime_ns:
+        return previous['sha256'], stat
+    return file_sha256(path), stat
+
+def build_shard(name, out_path, chunksize=CHUNK_SIZE):
+    """Standardizes one source in chunks into a single cleaned Parquet shard."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    reader, path = SOURCES[name]
+    tmp_path = out_path + '.tmp'
+    writer = None
+    rows = 0
+    try:
+        for chunk in reader(chunksize, path):
+            table = pa.Table.from_pandas(to_columnar(standardize(chunk), name), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        pq.write_table(pa.Table.from_pandas(to_columnar(pd.DataFrame({'text': [], 'label': []}), name),
+                                            preserve_index=False), tmp_path)
+    os.replace(tmp_path, out_path)
+    return rows
+
+def incremental_build(write_csv=True, write_parquet=False, chunksize=CHUNK_SIZE):
+    """
+    Rebuilds only the sources whose content hash changed since the last run, then
+    assembles the master dataset from the cached per-source shards.
+    """
+    print("--- Incremental Data Setup ---")
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    manifest = {}
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH) as f:
+            manifest = json.load(f)
+    fingerprint = pipeline_fingerprint()
+    old_sources = manifest.get('sources', {}) if manifest.get('pipeline') == fingerprint else {}
+
+    sources = {}
+    changed = []
+    for name, (_, path) in SOURCES.items():
+        previous = old_sources.get(name)
+        sha256, stat = _source_hash(path, previous)
+        shard = os.path.join(SHARD_DIR, f'{name}.parquet')
+
+        if previous and previous['sha256'] == sha256 and os.path.exists(shard):
+            rows = previous['rows']
+            print(f"  {name:<14} unchanged ({rows} rows cached)")
+        else:
+            start = time.perf_counter()
+            rows = build_shard(name, shard, chunksize)
+            changed.append(name)
+            print(f"  {name:<14} rebuilt: {rows} rows in {time.perf_counter() - start:.1f}s")
+        sources[name] = {'path': path, 'sha256': sha256, 'size': stat.st_size,
+                         'mtime_ns': stat.st_mtime_ns, 'rows': rows, 'shard': shard}
+
+    outputs_exist = (not write_csv or os.path.exists(MASTER_CSV)) and \
+                    (not write_parquet or os.path.isdir(MASTER_PARQUET_DIR))
+    if changed or not outputs_exist:
+        assemble_master(list(sources), write_csv, write_parquet)
+    else:
+        print("No source changed; master dataset is up to date.")
+
+    manifest = {'pipeline': fingerprint, 'sources': sources}
+    with open(MANIFEST_PATH + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(MANIFEST_PATH + '.tmp', MANIFEST_PATH)
+    return changed
+
+def assemble_master(names, write_csv=True, write_parquet=False):
+    """Concatenates shards, in SOURCES order, into master_dataset.csv and/or the Parquet directory."""
+    shards = [os.path.join(SHARD_DIR, f'{name}.parquet') for name in names]
+
+    if write_parquet:
+        tmp_dir = MASTER_PARQUET_DIR + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        # Shards share the master dataset schema, so they become its part files as-is
+        for part, shard in enumerate(shards):
+            shutil.copyfile(shard, os.path.join(tmp_dir, f'part-{part:05d}.parquet'))
+        shutil.rmtree(MASTER_PARQUET_DIR, ignore_errors=True)
+        os.replace(tmp_dir, MASTER_PARQUET_DIR)
+        print(f"Assembled {MASTER_PARQUET_DIR}/ from {len(shards)} shards")
+
+    if write_csv:
+        tmp_csv = MASTER_CSV + '.tmp'
+        for i, shard in enumerate(shards):
+            df = pd.read_parquet(shard, columns=['text', 'label'])
+            df.to_csv(tmp_csv, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        os.replace(tmp_csv, MASTER_CSV)
+        print(f"Assembled {MASTER_CSV} from {len(shards)} shards (run 'dvc add {MASTER_CSV}' to version it)")
+
+def _parquet_mtime():
+    parts = [os.path.join(MASTER_PARQUET_DIR, name) for name in os.listdir(MASTER_PARQUET_DIR)]
+    return max((os.path.getmtime(p) for p in parts), default=os.path.getmtime(MASTER_PARQUET_DIR))
+
+def master_dataset_format():
+    """'parquet' or 'csv': MASTER_DATASET_FORMAT, or with 'auto' the copy that was written last."""
+    if MASTER_DATASET_FORMAT in ('csv', 'parquet'):
+        return MASTER_DATASET_FORMAT
+    if MASTER_DATASET_FORMAT != 'auto':
+        raise ValueError(f"MASTER_DATASET_FORMAT must be 'auto', 'csv' or 'parquet', got {MASTER_DATASET_FORMAT!r}")
+    if not os.path.isdir(MASTER_PARQUET_DIR):
+        return 'csv'
+    if not os.path.exists(MASTER_CSV):
+        return 'parquet'
+    if os.path.getmtime(MASTER_CSV) > _parquet_mtime():
+        print(f"Note: {MASTER_CSV} is newer than {MASTER_PARQUET_DIR}/, reading the CSV "
+              f"(set MASTER_DATASET_FORMAT=parquet to override)")
+        return 'csv'
+    return 'parquet'
+
+def load_master_dataset(columns=('text', 'label')):
+    """The master dataset from the copy master_dataset_format() picks."""
+    if master_dataset_format() == 'parquet':
+        return pd.read_parquet(MASTER_PARQUET_DIR, columns=list(columns))
+    return pd.read_csv(MASTER_CSV, usecols=list(columns))
+
+def benchmark_normalizer(repeats=3):
+    """Checks clean_texts against clean_text on the raw corpus and reports rows/sec."""
+    tw = pd.read_csv('Dataset/twitter.csv', encoding='latin-1')['text']
+    isear = pd.read_csv('Dataset/isear.csv', sep='|', on_bad_lines='skip').iloc[:, -1]
+    go = pd.concat([pd.read_csv(f'Dataset/goemotions_{i}.csv', usecols=['text'])['text'] for i in (1, 2, 3)])
+    raw = pd.concat([tw, isear, go], ignore_index=True)
+    raw_list = raw.tolist()
+    print(f"Benchmarking on {len(raw)} rows (best of {repeats})...")
+
+    def best(fn):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            out = fn()
+            times.append(time.perf_counter() - start)
+        return out, min(times)
+
+    expected, t_apply = best(lambda: raw.apply(clean_text))
+    series_out, t_series = best(lambda: clean_texts(raw))
+    list_out, t_list = best(lambda: clean_texts(raw_list))
+
+    assert series_out.tolist() == expected.tolist(), "clean_texts(Series) differs from clean_text"
+    assert list_out == expected.tolist(), "clean_texts(list) differs from clean_text"
+    print("Parity check passed: clean_texts == clean_text on every row.")
+
+    for name, t in [("Series.apply(clean_text)", t_apply), ("clean_texts(Series)", t_series), ("clean_texts(list)", t_list)]:
+        print(f"{name:<26} {t:8.3f}s  {len(raw) / t:12,.0f} rows/sec")
+
 if __name__ == "__main__":
-    df = load_and_standardize()
-    print("\n--- Final Dataset Statistics ---")
-    print(df['label'].value_counts())
-    df.to_csv('Dataset/master_dataset.csv', index=False)
-    print("\nSuccess! Combined dataset saved.")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the master dataset")
+    parser.add_argument('--benchmark', action='store_true', help="Check clean_texts parity and speed, then exit")
+    parser.add_argument('--parquet', action='store_true', help=f"Stream sources in chunks into {MASTER_PARQUET_DIR}/")
+    parser.add_argument('--incremental', action='store_true', help="Only re-process sources whose content changed")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_normalizer()
+    elif args.incremental:
+        incremental_build(write_parquet=args.parquet, chunksize=args.chunksize)
+    elif args.parquet:
+        counts = stream_standardize(chunksize=args.chunksize)
+        print("\n--- Final Dataset Statistics ---")
+        print(counts)
+    else:
+        df = load_and_standardize()
+        print("\n--- Final Dataset Statistics ---")
+        print(df['label'].value_counts())
+        df.to_csv(MASTER_CSV, index=False)
+        print("\nSuccess! Combined dataset saved.")
\ No newline at end of file
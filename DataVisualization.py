@@ -1,17 +1,222 @@
+import argparse
+import os
+import pickle
+import subprocess
+import sys
+import time
+import numpy as np
 import pandas as pd
-from ydata_profiling import ProfileReport
+from DataSetup import load_master_dataset
+from Preprocessing import dataset_hash
+from prediction_logger import LOG_DIR, LEGACY_CSV, closed_segments, read_segments
 
-train_df = pd.read_csv("Dataset/master_dataset.csv")
-logs_df = pd.read_csv("prediction_logs.csv")
+# Profiles the training data against the live prediction logs. Both sides are sampled to a
+# row budget (reservoir, or stratified by label) before profiling, the logs can be limited
+# to a date range, and the reference-side profile is cached per dataset hash / sample.
+#   python DataVisualization.py --budget 20000 --since 2026-10-01
+#   python DataVisualization.py --budget 0                 (everything, old behaviour)
+#   python DataVisualization.py --scaling 1000,5000,20000  (time / memory vs sample size)
+PROFILE_CACHE_DIR = 'profile_cache'
+DEFAULT_BUDGET = 20000
+CHUNK_ROWS = 100000
 
-profile = ProfileReport(train_df, minimal = True, title="Data Analysis Report")
 
-#profile.to_notebook_iframe()
+class Reservoir:
+    """Uniform sample of at most `k` rows from a stream of DataFrame chunks (Algorithm R, vectorized per chunk)."""
 
-train_report = ProfileReport(train_df, title="Train Data") 
-log_report = ProfileReport(logs_df, title="Live Logs")
+    def __init__(self, k, rng):
+        self.k = k
+        self.rng = rng
+        self.seen = 0
+        self.sample = None
 
-comparison_report = train_report.compare(log_report)
-comparison_report.to_file("comparison.html")
+    def add(self, chunk):
+        chunk = chunk.reset_index(drop=True)
+        fill = max(0, min(self.k - self.seen, len(chunk)))
+        if fill:
+            head = chunk.iloc[:fill]
+            self.sample = head.copy() if self.sample is None else pd.concat([self.sample, head], ignore_index=True)
+        if len(chunk) > fill:
+            # Row i of the stream replaces a random slot with probability k / (i + 1)
+            positions = self.seen + np.arange(fill, len(chunk))
+            slots = self.rng.integers(0, positions + 1)
+            hit = np.flatnonzero(slots < self.k)
+            # Later rows overwrite earlier ones drawn for the same slot, as in the sequential algorithm
+            last = dict(zip(slots[hit].tolist(), (hit + fill).tolist()))
+            if last:
+                self.sample.iloc[list(last)] = chunk.iloc[list(last.values())].to_numpy()
+        self.seen += len(chunk)
 
-profile.to_file("Data_report.html")
\ No newline at end of file
+    def frame(self):
+        return self.sample if self.sample is not None else pd.DataFrame()
+
+
+def allocate(counts, k):
+    """Splits a budget of `k` rows across labels in proportion to `counts` (largest remainder)."""
+    total = counts.sum()
+    if total <= k:
+        return counts.copy()
+    exact = counts * k / total
+    quotas = np.floor(exact).astype(np.int64)
+    for label in (exact - quotas).sort_values(ascending=False).index[:k - quotas.sum()]:
+        quotas[label] += 1
+    return quotas
+
+
+def sample_rows(make_chunks, budget, strategy='reservoir', seed=0, label_column='label'):
+    """
+    Samples `budget` rows from the chunks yielded by make_chunks() (budget 0 keeps all).
+    Returns (sample, rows_seen). 'stratified' needs a first, label-only pass to size the
+    per-label reservoirs.
+    """
+    rng = np.random.default_rng(seed)
+    if not budget:
+        frames = list(make_chunks())
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['text', label_column])
+        return df, len(df)
+    if strategy == 'reservoir':
+        reservoir = Reservoir(budget, rng)
+        for chunk in make_chunks():
+            reservoir.add(chunk)
+        return reservoir.frame(), reservoir.seen
+    if strategy != 'stratified':
+        raise ValueError(f"Unknown sampling strategy {strategy!r} (expected 'reservoir' or 'stratified')")
+
+    counts = pd.Series(dtype=np.int64)
+    for chunk in make_chunks(columns=[label_column]):
+        counts = counts.add(chunk[label_column].astype(str).value_counts(), fill_value=0)
+    quotas = allocate(counts.astype(np.int64), budget)
+    reservoirs = {label: Reservoir(int(q), rng) for label, q in quotas.items() if q > 0}
+    for chunk in make_chunks():
+        for label, rows in chunk.groupby(chunk[label_column].astype(str)):
+            if label in reservoirs:
+                reservoirs[label].add(rows)
+    frames = [r.frame() for r in reservoirs.values() if r.sample is not None]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['text', label_column])
+    # Shuffle so the profile's sample rows are not grouped by label
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True), int(counts.sum())
+
+
+def parse_bound(value, end=False):
+    """'YYYY-MM-DD' or an ISO timestamp as a UTC Timestamp; a bare end date includes that whole day."""
+    if not value:
+        return None
+    bound = pd.Timestamp(value)
+    bound = bound.tz_localize('UTC') if bound.tzinfo is None else bound.tz_convert('UTC')
+    if end and len(value) == 10:
+        bound += pd.Timedelta(days=1)
+    return bound
+
+
+def log_chunks(since=None, until=None, columns=('text', 'label')):
+    """Logged rows in [since, until), one segment at a time so sampling never holds the full log."""
+    columns = list(columns)
+    start, end = parse_bound(since), parse_bound(until, end=True)
+    paths = closed_segments(LOG_DIR, start.strftime('%Y-%m-%d') if start is not None else None,
+                            (end - pd.Timedelta(milliseconds=1)).strftime('%Y-%m-%d') if end is not None else None)
+    if not paths and os.path.exists(LEGACY_CSV):
+        if start is not None or end is not None:
+            print(f"Warning: {LEGACY_CSV} has no timestamps, the date range is ignored.")
+        yield from pd.read_csv(LEGACY_CSV, usecols=columns, chunksize=CHUNK_ROWS)
+        return
+    for path in paths:
+        df = read_segments([path], columns=sorted(set(columns) | {'timestamp'}))
+        timestamps = pd.to_datetime(df['timestamp'], utc=True)
+        keep = np.ones(len(df), dtype=bool)
+        if start is not None:
+            keep &= (timestamps >= start).to_numpy()
+        if end is not None:
+            keep &= (timestamps < end).to_numpy()
+        yield df.loc[keep, columns]
+
+
+def reference_description(budget, strategy, seed, use_cache=True):
+    """Profile description of the (sampled) master dataset, cached per dataset hash and sample settings."""
+    from ydata_profiling import ProfileReport
+
+    cache_path = os.path.join(PROFILE_CACHE_DIR, f"{dataset_hash()}-{strategy if budget else 'full'}-{budget}-{seed}.pickle")
+    if use_cache and os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            print(f"Reference profile loaded from {cache_path}")
+            return pickle.load(f)
+
+    train_df = load_master_dataset().dropna()
+    sample, seen = sample_rows(lambda columns=None: [train_df[columns] if columns else train_df], budget, strategy, seed)
+    print(f"Reference: profiling {len(sample)} of {seen} rows")
+    title = "Train Data" if len(sample) == seen else f"Train Data ({len(sample)}-row {strategy} sample)"
+    description = ProfileReport(sample, title=title).get_description()
+
+    profile = ProfileReport(sample, minimal=True, title="Data Analysis Report")
+    #profile.to_notebook_iframe()
+    profile.to_file("Data_report.html")
+
+    if use_cache:
+        os.makedirs(PROFILE_CACHE_DIR, exist_ok=True)
+        with open(cache_path + '.tmp', 'wb') as f:
+            pickle.dump(description, f)
+        os.replace(cache_path + '.tmp', cache_path)
+    return description
+
+
+def build_reports(budget=DEFAULT_BUDGET, strategy='reservoir', seed=0, since=None, until=None, use_cache=True,
+                  output="comparison.html"):
+    from ydata_profiling import ProfileReport, compare
+
+    reference = reference_description(budget, strategy, seed, use_cache)
+
+    logs_df, seen = sample_rows(lambda columns=('text', 'label'): log_chunks(since, until, columns), budget, strategy, seed)
+    if logs_df.empty:
+        raise SystemExit(f"No prediction logs in {LOG_DIR}/ for the selected date range.")
+    print(f"Logs: profiling {len(logs_df)} of {seen} rows")
+    title = "Live Logs" if len(logs_df) == seen else f"Live Logs ({len(logs_df)}-row {strategy} sample)"
+    log_report = ProfileReport(logs_df, title=title)
+
+    comparison_report = compare([reference, log_report.get_description()])
+    comparison_report.to_file(output)
+    return len(logs_df)
+
+
+_PROBE = """
+import resource, sys, time
+import DataVisualization
+import ydata_profiling
+# Imports (pandas, ydata-profiling) are the same at every size, so measure the growth on top of them
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+rows = DataVisualization.build_reports(int(sys.argv[1]), sys.argv[2], int(sys.argv[3]), sys.argv[4] or None,
+                                       sys.argv[5] or None, use_cache=False, output=sys.argv[6])
+print(rows, time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline)
+"""
+
+def benchmark_scaling(budgets, strategy, seed, since, until):
+    """Wall time and peak-RSS growth of an uncached run at each budget, each in a fresh process."""
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    print(f"{'budget':>8} {'rows':>9} {'seconds':>9} {'peak RSS':>11}")
+    for budget in budgets:
+        proc = subprocess.run([sys.executable, '-c', _PROBE, str(budget), strategy, str(seed), since or '', until or '',
+                               f'/tmp/comparison_{budget}.html'], capture_output=True, text=True, env=env)
+        if proc.returncode != 0:
+            raise SystemExit(proc.stderr)
+        rows, elapsed, maxrss_kb = proc.stdout.strip().splitlines()[-1].split()
+        print(f"{budget or 'all':>8} {int(rows):>9} {float(elapsed):>8.1f}s {int(maxrss_kb) / 1024:>8.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile the training data against the prediction logs")
+    parser.add_argument('--budget', type=int, default=DEFAULT_BUDGET, help="Rows per side (0 = profile everything)")
+    parser.add_argument('--strategy', choices=['reservoir', 'stratified'], default='reservoir',
+                        help="Uniform reservoir sample, or stratified by label")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--since', default=None, help="First log day/time (UTC, e.g. 2026-10-01)")
+    parser.add_argument('--until', default=None, help="Last log day/time (UTC, inclusive for a bare date)")
+    parser.add_argument('--no-cache', action='store_true', help="Rebuild the reference profile")
+    parser.add_argument('--scaling', default=None, metavar='N,N,...',
+                        help="Report wall time and memory at each budget instead of writing the reports")
+    args = parser.parse_args()
+
+    if args.scaling:
+        benchmark_scaling([int(n) for n in args.scaling.split(',')], args.strategy, args.seed, args.since, args.until)
+    else:
+        start = time.perf_counter()
+        build_reports(args.budget, args.strategy, args.seed, args.since, args.until, use_cache=not args.no_cache)
+        print(f"Reports written in {time.perf_counter() - start:.1f}s")
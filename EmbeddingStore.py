@@ -0,0 +1,131 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+
+# One-time conversion of the GloVe text file into two memory-mappable arrays:
+#   <prefix>.npy        float32 (n_words, dim) vectors, rows sorted by word
+#   <prefix>.vocab.npy  fixed-width UTF-8 bytes (n_words,), sorted, for np.searchsorted
+GLOVE_TXT = 'Dataset/glove.6B.100d.txt'
+
+def binary_prefix(txt_path):
+    return os.path.splitext(txt_path)[0]
+
+def convert_glove(txt_path=GLOVE_TXT):
+    start = time.perf_counter()
+    words = []
+    with open(txt_path, encoding='utf-8') as f:
+        dim = len(f.readline().split()) - 1
+        n_lines = 1 + sum(1 for _ in f)
+
+    vectors = np.empty((n_lines, dim), dtype=np.float32)
+    with open(txt_path, encoding='utf-8') as f:
+        for row, line in enumerate(f):
+            values = line.split()
+            words.append(values[0].encode('utf-8'))
+            vectors[row] = values[1:]
+
+    vocab = np.array(words)
+    # Stable sort, then keep the last occurrence of duplicated words (what a dict build keeps)
+    order = np.argsort(vocab, kind='stable')
+    sorted_vocab = vocab[order]
+    keep = np.append(sorted_vocab[1:] != sorted_vocab[:-1], True)
+
+    prefix = binary_prefix(txt_path)
+    np.save(prefix + '.npy', vectors[order[keep]])
+    np.save(prefix + '.vocab.npy', sorted_vocab[keep])
+    print(f"Converted {keep.sum()} x {dim} GloVe vectors to {prefix}.npy in {time.perf_counter() - start:.1f}s")
+
+def load_glove(txt_path=GLOVE_TXT):
+    """Memory-mapped (vocab, vectors); converts the text file on first use."""
+    prefix = binary_prefix(txt_path)
+    if not (os.path.exists(prefix + '.npy') and os.path.exists(prefix + '.vocab.npy')):
+        convert_glove(txt_path)
+    return np.load(prefix + '.vocab.npy', mmap_mode='r'), np.load(prefix + '.npy', mmap_mode='r')
+
+def build_embedding_matrix(word_index, max_words, txt_path=GLOVE_TXT):
+    """
+    Same matrix as looking every word with index < max_words up in a GloVe dict,
+    built as a single vectorized gather: rows of words without a vector stay zero.
+    """
+    vocab, vectors = load_glove(txt_path)
+    items = [(w.encode('utf-8'), i) for w, i in word_index.items() if i < max_words]
+    embedding_matrix = np.zeros((max_words, vectors.shape[1]), dtype=np.float32)
+    if not items:
+        return embedding_matrix
+
+    words = np.array([w for w, _ in items])
+    ids = np.array([i for _, i in items])
+    # Words longer than the stored width can't be in the vocabulary (and would be truncated below)
+    fits = np.char.str_len(words) <= vocab.dtype.itemsize
+    query = words.astype(vocab.dtype)
+
+    pos = np.minimum(np.searchsorted(vocab, query), len(vocab) - 1)
+    found = fits & (vocab[pos] == query)
+    embedding_matrix[ids[found]] = vectors[pos[found]]
+    print(f"Embedding matrix: {found.sum()} / {len(items)} words found in GloVe")
+    return embedding_matrix
+
+def build_embedding_matrix_text(word_index, max_words, txt_path=GLOVE_TXT):
+    """The original BiLSTM.py text parse, kept as the benchmark baseline."""
+    embeddings_index = {}
+    with open(txt_path, encoding='utf-8') as f:
+        for line in f:
+            values = line.split()
+            word = values[0]
+            embeddings_index[word] = np.asarray(values[1:], dtype='float32')
+
+    embedding_matrix = np.zeros((max_words, 100))
+    for word, i in word_index.items():
+        if i < max_words:
+            embedding_vector = embeddings_index.get(word)
+            if embedding_vector is not None:
+                embedding_matrix[i] = embedding_vector
+    return embedding_matrix
+
+_PROBE = """
+import pickle, resource, sys, time
+import numpy as np
+import EmbeddingStore
+with open(sys.argv[2], 'rb') as handle:
+    word_index = pickle.load(handle).word_index
+# Unpickling the tokenizer imports keras, so measure the growth on top of that
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+fn = getattr(EmbeddingStore, sys.argv[1])
+matrix = fn(word_index, 20000, sys.argv[3])
+elapsed = time.perf_counter() - start
+np.save(sys.argv[4], matrix)
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline)
+"""
+
+def benchmark(txt_path=GLOVE_TXT, tokenizer_path='tokenizer.pickle'):
+    """Build time and peak-RSS growth of the text parse vs the memory-mapped gather, each in a fresh process."""
+    load_glove(txt_path)
+    results = {}
+    for fn in ('build_embedding_matrix_text', 'build_embedding_matrix'):
+        out = f'/tmp/{fn}.npy'
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+        proc = subprocess.run([sys.executable, '-c', _PROBE, fn, tokenizer_path, txt_path, out],
+                              capture_output=True, text=True, env=env)
+        if proc.returncode != 0:
+            raise SystemExit(proc.stderr)
+        elapsed, maxrss_kb = proc.stdout.strip().splitlines()[-1].split()
+        results[fn] = np.load(out)
+        print(f"{fn:<28} {float(elapsed):7.2f}s   peak RSS +{int(maxrss_kb) / 1024:8.1f} MB")
+
+    same = np.array_equal(results['build_embedding_matrix_text'].astype(np.float32), results['build_embedding_matrix'])
+    print(f"Matrices identical: {same}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Binary GloVe store for BiLSTM.py")
+    parser.add_argument('--glove', default=GLOVE_TXT)
+    parser.add_argument('--benchmark', action='store_true', help="Compare against the text parse")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.glove)
+    else:
+        convert_glove(args.glove)
@@ -0,0 +1,213 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import mlflow
+import optuna
+from optuna_integration.mlflow import MLflowCallback
+from Preprocessing import load_preprocessed
+from Train import _init_worker
+
+# Architecture search over the BiLSTM.py / Train.py model family.
+#   python HyperparamSearch.py --trials 40 --workers 4 --target 0.80
+# Trials share a local SQLite study (resumable, safe for parallel workers), are pruned per epoch
+# against the median of earlier trials, and each one is an MLflow run in Emotion_Architecture_Search.
+# Default objective: seconds of training until val_accuracy >= --target (lower is better), so a
+# cheap model that gets there beats a big one that gets there slower; --objective accuracy
+# maximizes the best val_accuracy instead.
+STUDY_NAME = "Emotion_Architecture_Search"
+STORAGE = 'sqlite:///optuna.db'
+max_words = 20000
+max_len = 100
+# Trials that never reach the target rank after every trial that does, ordered by accuracy
+UNREACHED_PENALTY = 1e6
+
+# The current BiLSTM.py model, evaluated first so every search has the baseline to beat
+BASELINE = {'embedding': 'glove', 'cell': 'LSTM', 'bidirectional': True, 'units': 128, 'second_units': 64,
+            'dropout': 0.3, 'dense_units': 64, 'learning_rate': 1e-3, 'batch_size': 64}
+
+_data = None
+_glove = None
+
+def load_data():
+    global _data
+    if _data is None:
+        _data = load_preprocessed(num_words=max_words, max_len=max_len)
+    return _data
+
+def glove_matrix():
+    global _glove
+    if _glove is None:
+        from EmbeddingStore import build_embedding_matrix
+        _glove = build_embedding_matrix(load_data().tokenizer.word_index, max_words)
+    return _glove
+
+def build_model(params, num_classes):
+    from tensorflow.keras.models import Sequential #type:ignore
+    from tensorflow.keras.layers import Input, Embedding, LSTM, GRU, Bidirectional, Dense, Dropout, BatchNormalization #type:ignore
+    from tensorflow.keras.optimizers import Adam #type:ignore
+
+    cell = LSTM if params['cell'] == 'LSTM' else GRU
+    wrap = Bidirectional if params['bidirectional'] else (lambda layer: layer)
+    layers = [Input(shape=(None,), dtype='int32')]
+    if params['embedding'] == 'glove':
+        layers.append(Embedding(max_words, 100, weights=[glove_matrix()], trainable=False))
+    else:
+        layers.append(Embedding(max_words, 128))
+
+    if params['second_units']:
+        layers += [wrap(cell(params['units'], return_sequences=True)), BatchNormalization(), Dropout(params['dropout']),
+                   wrap(cell(params['second_units']))]
+    else:
+        layers.append(wrap(cell(params['units'])))
+    layers.append(Dropout(params['dropout']))
+    if params['dense_units']:
+        layers.append(Dense(params['dense_units'], activation='relu'))
+    layers.append(Dense(num_classes, activation='softmax'))
+
+    model = Sequential(layers)
+    model.compile(optimizer=Adam(learning_rate=params['learning_rate']),
+                  loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+def suggest_params(trial):
+    return {
+        'embedding': trial.suggest_categorical('embedding', ['glove', 'learned']),
+        'cell': trial.suggest_categorical('cell', ['LSTM', 'GRU']),
+        'bidirectional': trial.suggest_categorical('bidirectional', [True, False]),
+        'units': trial.suggest_categorical('units', [32, 64, 128]),
+        'second_units': trial.suggest_categorical('second_units', [0, 32, 64]),
+        'dropout': trial.suggest_float('dropout', 0.0, 0.5),
+        'dense_units': trial.suggest_categorical('dense_units', [0, 64]),
+        'learning_rate': trial.suggest_float('learning_rate', 1e-4, 3e-3, log=True),
+        'batch_size': trial.suggest_categorical('batch_size', [32, 64, 128]),
+    }
+
+def make_callback():
+    import tensorflow as tf
+
+    class EpochReporter(tf.keras.callbacks.Callback):
+        """Reports val_accuracy to the trial every epoch, prunes, and records time-to-target."""
+
+        def __init__(self, trial, target, objective):
+            super().__init__()
+            self.trial, self.target, self.objective = trial, target, objective
+            self.best_accuracy = 0.0
+            self.time_to_target = None
+            self.epochs_to_target = None
+
+        def on_train_begin(self, logs=None):
+            self._start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            accuracy = logs['val_accuracy']
+            self.best_accuracy = max(self.best_accuracy, accuracy)
+            if self.time_to_target is None and accuracy >= self.target:
+                self.time_to_target = time.perf_counter() - self._start
+                self.epochs_to_target = epoch + 1
+                if self.objective == 'time':
+                    # Nothing left to win on this trial
+                    self.model.stop_training = True
+                    return
+
+            # Intermediate values follow the study direction: validation error when minimizing time
+            self.trial.report(1.0 - accuracy if self.objective == 'time' else accuracy, epoch)
+            if self.trial.should_prune():
+                raise optuna.TrialPruned(f"val_accuracy {accuracy:.4f} below median at epoch {epoch + 1}")
+
+    return EpochReporter
+
+def make_pruner():
+    # Pruner settings aren't persisted in the storage, so every worker builds the same one
+    return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=1)
+
+def make_storage(url):
+    # Parallel workers write to the same SQLite file; wait on its lock instead of failing
+    return optuna.storages.RDBStorage(url, engine_kwargs={"connect_args": {"timeout": 60}})
+
+def make_mlflow_callback(objective):
+    return MLflowCallback(metric_name='time_to_target_sec' if objective == 'time' else 'best_val_accuracy',
+                          create_experiment=True)
+
+def make_objective(args, mlflow_callback):
+    import InputPipeline
+
+    @mlflow_callback.track_in_mlflow()
+    def objective(trial):
+        data = load_data()
+        params = suggest_params(trial)
+        cut = int(len(data.X_seq) * 0.8)
+        model = build_model(params, len(data.label_encoder.classes_))
+
+        reporter = make_callback()(trial, args.target, args.objective)
+        mlflow.log_param("dataset_hash", data.dataset_hash)
+        InputPipeline.fit(model, data.X_seq[:cut], data.y[:cut], (data.X_seq[cut:], data.y[cut:]),
+                          epochs=args.max_epochs, batch_size=params['batch_size'], callbacks=[reporter], verbose=2)
+
+        trial.set_user_attr('best_val_accuracy', reporter.best_accuracy)
+        trial.set_user_attr('epochs_to_target', reporter.epochs_to_target)
+        trial.set_user_attr('time_to_target_sec', reporter.time_to_target)
+        trial.set_user_attr('params_count', model.count_params())
+        mlflow.log_metrics({"best_val_accuracy": reporter.best_accuracy, "params_count": model.count_params()})
+
+        if args.objective == 'accuracy':
+            return reporter.best_accuracy
+        if reporter.time_to_target is None:
+            return UNREACHED_PENALTY + (1.0 - reporter.best_accuracy)
+        return reporter.time_to_target
+
+    return objective
+
+def create_study(args):
+    return optuna.create_study(
+        study_name=STUDY_NAME, storage=make_storage(args.storage), load_if_exists=True,
+        direction='minimize' if args.objective == 'time' else 'maximize',
+        sampler=optuna.samplers.TPESampler(), pruner=make_pruner(),
+    )
+
+def run_worker(args, n_trials):
+    """One search process: load the shared study and run `n_trials` trials against it."""
+    load_data()
+    mlflow_callback = make_mlflow_callback(args.objective)
+    study = optuna.load_study(study_name=STUDY_NAME, storage=make_storage(args.storage),
+                              sampler=optuna.samplers.TPESampler(), pruner=make_pruner())
+    study.optimize(make_objective(args, mlflow_callback), n_trials=n_trials, callbacks=[mlflow_callback])
+    return n_trials
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optuna architecture search for the emotion classifier")
+    parser.add_argument('--trials', type=int, default=20, help="Total trials across all workers")
+    parser.add_argument('--workers', type=int, default=1, help="Parallel trial processes")
+    parser.add_argument('--threads', type=int, default=None, help="TF / BLAS threads per worker (default: cores / workers)")
+    parser.add_argument('--max-epochs', type=int, default=10)
+    parser.add_argument('--target', type=float, default=0.80, help="val_accuracy that counts as 'reached'")
+    parser.add_argument('--objective', choices=('time', 'accuracy'), default='time')
+    parser.add_argument('--storage', default=STORAGE)
+    args = parser.parse_args()
+
+    # Build the shared preprocessed store once, before any worker memory-maps it
+    load_data()
+    study = create_study(args)
+    if not study.trials:
+        study.enqueue_trial(BASELINE)
+
+    per_worker = [args.trials // args.workers + (i < args.trials % args.workers) for i in range(args.workers)]
+    threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+    print(f"Running {args.trials} trials on {args.workers} worker(s) x {threads} thread(s), study {STUDY_NAME} ({args.storage})")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(threads,)) as pool:
+        for future in [pool.submit(run_worker, args, n) for n in per_worker if n]:
+            future.result()
+
+    study = optuna.load_study(study_name=STUDY_NAME, storage=make_storage(args.storage))
+    states = [t.state.name for t in study.trials]
+    print(f"\nSearch finished in {time.perf_counter() - start:.0f}s: "
+          f"{states.count('COMPLETE')} complete, {states.count('PRUNED')} pruned, {states.count('FAIL')} failed")
+    best = study.best_trial
+    print(f"Best trial #{best.number}: value {best.value:.4f}, "
+          f"val_accuracy {best.user_attrs.get('best_val_accuracy', float('nan')):.4f}, "
+          f"epochs to target {best.user_attrs.get('epochs_to_target')}")
+    for name, value in best.params.items():
+        print(f"  {name}: {value}")
@@ -0,0 +1,115 @@
+import os
+import time
+import numpy as np
+import mlflow
+import tensorflow as tf
+
+# Shared tf.data input pipeline for BiLSTM.py, Train.py and TuneModel.py.
+# INPUT_PIPELINE=tfdata streams length-bucketed batches from the preprocessed store;
+# INPUT_PIPELINE=arrays keeps the original fixed-shape NumPy arrays (for comparison).
+INPUT_PIPELINE = os.environ.get('INPUT_PIPELINE', 'arrays')
+BUCKET_BOUNDARIES = (16, 32, 64)
+GATHER_CHUNK = 4096
+
+def _strip_reversed(x, y):
+    # Drop the pre-padding (keeping at least one token) and reverse, so that the
+    # end-padding added by bucketing turns back into pre-padding after a second reverse
+    length = tf.maximum(tf.math.count_nonzero(x, dtype=tf.int32), 1)
+    return tf.reverse(x[-length:], axis=[0]), y
+
+def _restore_pre_padding(x, y):
+    return tf.reverse(x, axis=[1]), y
+
+def make_dataset(X_seq, y, batch_size=64, shuffle=True, bucket_boundaries=BUCKET_BOUNDARIES,
+                 sampling_weights=None, seed=None):
+    """
+    Batches of pre-padded sequences grouped by length, streamed from (memory-mapped) arrays.
+
+    `sampling_weights` ({class: weight}, e.g. the class_weight_dict from compute_class_weight)
+    switches to class-weighted sampling: every batch is drawn with class probabilities
+    proportional to count * weight, as an alternative to class_weight in model.fit.
+    Returns (dataset, steps_per_epoch); steps_per_epoch is None for a finite dataset.
+    """
+    n = len(X_seq)
+    steps_per_epoch = None
+
+    if sampling_weights is None:
+        indices = tf.data.Dataset.range(n)
+        if shuffle:
+            indices = indices.shuffle(n, seed=seed, reshuffle_each_iteration=True)
+    else:
+        labels = np.asarray(y)
+        classes = np.unique(labels)
+        counts = np.array([(labels == c).sum() for c in classes], dtype=np.float64)
+        probs = counts * np.array([sampling_weights[int(c)] for c in classes])
+        per_class = [
+            tf.data.Dataset.from_tensor_slices(np.flatnonzero(labels == c).astype(np.int64))
+            .shuffle(int(count), seed=seed).repeat()
+            for c, count in zip(classes, counts)
+        ]
+        indices = tf.data.Dataset.sample_from_datasets(per_class, weights=(probs / probs.sum()).tolist(), seed=seed)
+        steps_per_epoch = int(np.ceil(n / batch_size))
+
+    # Gather rows in chunks straight from the arrays instead of copying them into the graph
+    def gather(idx):
+        return X_seq[idx].astype(np.int32), np.asarray(y)[idx]
+
+    y_sample = np.asarray(y[:1])
+    y_dtype = tf.as_dtype(y_sample.dtype)
+
+    def gather_chunk(idx):
+        x_chunk, y_chunk = tf.numpy_function(gather, [idx], (tf.int32, y_dtype))
+        x_chunk.set_shape([None, X_seq.shape[1]])
+        y_chunk.set_shape([None, *y_sample.shape[1:]])
+        return x_chunk, y_chunk
+
+    ds = indices.batch(GATHER_CHUNK).map(gather_chunk, num_parallel_calls=tf.data.AUTOTUNE).unbatch()
+    ds = ds.map(_strip_reversed, num_parallel_calls=tf.data.AUTOTUNE)
+    ds = ds.bucket_by_sequence_length(
+        element_length_func=lambda x, _: tf.shape(x)[0],
+        bucket_boundaries=[b + 1 for b in bucket_boundaries],
+        bucket_batch_sizes=[batch_size] * (len(bucket_boundaries) + 1),
+    )
+    ds = ds.map(_restore_pre_padding, num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE), steps_per_epoch
+
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    """Logs epoch wall time and training steps/sec to the active MLflow run."""
+
+    def __init__(self, prefix=''):
+        super().__init__()
+        self.prefix = prefix
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+        self._steps = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._steps += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self._start
+        mlflow.log_metrics({
+            f"{self.prefix}epoch_time_sec": elapsed,
+            f"{self.prefix}steps_per_sec": self._steps / elapsed,
+        }, step=epoch)
+
+def fit(model, X_train, y_train, validation_data, epochs, batch_size=64, class_weight=None,
+        balanced_sampling=False, **kwargs):
+    """
+    model.fit over either the fixed-shape arrays or the tf.data pipeline, depending on
+    INPUT_PIPELINE, always logging throughput. With balanced_sampling the class weights
+    drive the sampler instead of weighting the loss.
+    """
+    callbacks = kwargs.pop('callbacks', []) + [ThroughputLogger()]
+    mlflow.log_param("input_pipeline", INPUT_PIPELINE)
+
+    if INPUT_PIPELINE != 'tfdata':
+        return model.fit(X_train, y_train, epochs=epochs, batch_size=batch_size, validation_data=validation_data,
+                         class_weight=class_weight, callbacks=callbacks, **kwargs)
+
+    sampling_weights = class_weight if balanced_sampling else None
+    train_ds, steps = make_dataset(X_train, y_train, batch_size, sampling_weights=sampling_weights)
+    val_ds, _ = make_dataset(*validation_data, batch_size=batch_size, shuffle=False)
+    return model.fit(train_ds, epochs=epochs, steps_per_epoch=steps, validation_data=val_ds,
+                     class_weight=None if balanced_sampling else class_weight, callbacks=callbacks, **kwargs)
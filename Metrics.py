@@ -1,62 +1,136 @@
+import os
+import time
 import pandas as pd
+from DataSetup import load_master_dataset
 import numpy as np
 import mlflow.keras
-from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.metrics import classification_report, confusion_matrix, f1_score
 from sklearn.preprocessing import LabelEncoder
 import seaborn as sns
 import matplotlib.pyplot as plt
-from tensorflow.keras.preprocessing.text import Tokenizer #type:ignore
-from tensorflow.keras.preprocessing.sequence import pad_sequences #type:ignore
-
-# --- 1. SETUP DATA ---
-print("Preparing data for evaluation...")
-df = pd.read_csv('Dataset/master_dataset.csv').dropna()
-le = LabelEncoder()
-df['label_encoded'] = le.fit_transform(df['label'])
+from Preprocessing import load_preprocessed
+from cascade import FAST_MODEL_PATH, FastTier, confident_rows
 
 max_words = 20000
 max_len = 100
-tokenizer = Tokenizer(num_words=max_words)
-tokenizer.fit_on_texts(df['text'])
+RUN_ID = "8102a5fc3958413bbbdbbd62db0b6a37"
+CASCADE_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95)
 
-X_seq = pad_sequences(tokenizer.texts_to_sequences(df['text']), maxlen=max_len)
-y = df['label_encoded'].values
+def load_validation_data():
+    """Last 20% of the master dataset: (all texts, validation texts, encoded labels, label encoder)."""
+    df = load_master_dataset().dropna()
+    le = LabelEncoder()
+    df['label_encoded'] = le.fit_transform(df['label'])
 
-# Split
-val_idx = int(len(X_seq) * 0.8)
-X_val = X_seq[val_idx:]
-y_val = y[val_idx:]
+    val_idx = int(len(df) * 0.8)
+    return df['text'], df['text'].iloc[val_idx:].tolist(), df['label_encoded'].values[val_idx:], le
 
-# --- 2. LOAD MODEL FROM MLFLOW ---
-RUN_ID = "8102a5fc3958413bbbdbbd62db0b6a37"
-model_uri = f"runs:/{RUN_ID}/bilstm_glove_model"
-
-print(f"Loading model from: {model_uri}")
-try:
-    model = mlflow.keras.load_model(model_uri)
-    print("Model loaded successfully!")
-except Exception as e:
-    print(f"Standard load failed, attempting direct path... Error: {e}")
-    direct_path = rf"D:\SentimentAnalysis\mlruns\6\{RUN_ID}\artifacts\bilstm_glove_model"
-    model = mlflow.keras.load_model(direct_path)
-
-# --- 3. GENERATE PREDICTIONS & METRICS ---
-print("Generating predictions...")
-y_pred_probs = model.predict(X_val)
-y_pred = np.argmax(y_pred_probs, axis=1)
-
-# Generate Text Report
-print("\n" + "="*40)
-print("CLASSIFICATION REPORT")
-print("="*40)
-# This report helps identify which emotions have low recall or precision
-print(classification_report(y_val, y_pred, target_names=le.classes_))
-
-# --- 4. PLOT CONFUSION MATRIX ---
-plt.figure(figsize=(12,10))
-sns.heatmap(confusion_matrix(y_val, y_pred), annot=True, fmt='d', cmap='Blues',
-            xticklabels=le.classes_, yticklabels=le.classes_)
-plt.xlabel('Predicted Labels')
-plt.ylabel('True Labels')
-plt.title('Emotion Classification Confusion Matrix')
-plt.show()
\ No newline at end of file
+def classification_summary(y_true, y_pred, class_names, title="CLASSIFICATION REPORT"):
+    """Prints the classification report and returns it as a dict (macro avg F1 under ['macro avg']['f1-score'])."""
+    print("\n" + "="*40)
+    print(title)
+    print("="*40)
+    # This report helps identify which emotions have low recall or precision
+    print(classification_report(y_true, y_pred, labels=range(len(class_names)), target_names=class_names))
+    return classification_report(y_true, y_pred, labels=range(len(class_names)), target_names=class_names,
+                                 output_dict=True, zero_division=0)
+
+def evaluate_cascade(val_texts, y_val, bilstm_probs, bilstm_seconds, fast_tier, thresholds=CASCADE_THRESHOLDS):
+    """
+    Accuracy, macro-F1, escalation rate and texts/sec of the TF-IDF -> BiLSTM cascade per
+    threshold. Throughput comes from the measured batched cost of each tier: every text
+    pays the TF-IDF tier, escalated texts also pay the BiLSTM.
+    """
+    start = time.perf_counter()
+    fast_probs = fast_tier.predict_proba(val_texts)
+    fast_seconds = time.perf_counter() - start
+    fast_pred, slow_pred = fast_probs.argmax(axis=1), bilstm_probs.argmax(axis=1)
+    n = len(y_val)
+
+    rows = [("TF-IDF only", fast_pred, 0.0), ("BiLSTM only", slow_pred, 1.0)]
+    for threshold in thresholds:
+        confident = confident_rows(fast_probs, threshold)
+        rows.append((f"cascade @ {threshold:.2f}", np.where(confident, fast_pred, slow_pred), 1.0 - confident.mean()))
+
+    print("\n" + "="*40)
+    print("CASCADE EVALUATION")
+    print("="*40)
+    print(f"{'':<18} {'accuracy':>9} {'macro-F1':>9} {'escalated':>10} {'texts/sec':>11}")
+    results = []
+    for name, pred, escalated in rows:
+        fast_share = 0.0 if name == "BiLSTM only" else fast_seconds
+        texts_per_sec = n / (fast_share + escalated * bilstm_seconds)
+        accuracy = float((pred == y_val).mean())
+        macro_f1 = f1_score(y_val, pred, average='macro', zero_division=0)
+        print(f"{name:<18} {accuracy:9.4f} {macro_f1:9.4f} {escalated:10.1%} {texts_per_sec:11.0f}")
+        results.append({"name": name, "accuracy": accuracy, "macro_f1": macro_f1,
+                        "escalated_fraction": escalated, "texts_per_sec": texts_per_sec})
+    return results
+
+def cascade_rows(fast_tier, val_idx, n_rows):
+    """
+    Positions in the BiLSTM hold-out (rows val_idx:) that the TF-IDF tier was not trained
+    on either, using the split Train.py saved with it. Train.py splits at random while
+    BiLSTM.py holds out the last 20%, so only rows held out by both are unseen.
+    """
+    positions = np.arange(n_rows - val_idx)
+    if fast_tier.holdout is None or fast_tier.n_rows != n_rows:
+        print(f"Warning: {FAST_MODEL_PATH} has no hold-out for this dataset (retrain it with Train.py); "
+              f"the cascade is evaluated on rows the TF-IDF tier may have been trained on.")
+        return positions
+    rows = positions[np.isin(positions + val_idx, fast_tier.holdout)]
+    print(f"Cascade evaluated on the {len(rows)} of {len(positions)} BiLSTM hold-out rows the TF-IDF tier did not see")
+    return rows
+
+def plot_confusion_matrix(y_true, y_pred, class_names):
+    plt.figure(figsize=(12,10))
+    sns.heatmap(confusion_matrix(y_true, y_pred), annot=True, fmt='d', cmap='Blues',
+                xticklabels=class_names, yticklabels=class_names)
+    plt.xlabel('Predicted Labels')
+    plt.ylabel('True Labels')
+    plt.title('Emotion Classification Confusion Matrix')
+    plt.show()
+
+if __name__ == "__main__":
+    # --- 1. SETUP DATA ---
+    print("Preparing data for evaluation...")
+    # Same stored tokenizer and sequences the model was trained on (see Preprocessing.py)
+    data = load_preprocessed(num_words=max_words, max_len=max_len)
+    val_idx = int(len(data.X_seq) * 0.8)
+    X_val = data.X_seq[val_idx:]
+    y_val = data.y[val_idx:]
+    le = data.label_encoder
+
+    # --- 2. LOAD MODEL FROM MLFLOW ---
+    model_uri = f"runs:/{RUN_ID}/bilstm_glove_model"
+
+    print(f"Loading model from: {model_uri}")
+    try:
+        model = mlflow.keras.load_model(model_uri)
+        print("Model loaded successfully!")
+    except Exception as e:
+        print(f"Standard load failed, attempting direct path... Error: {e}")
+        direct_path = rf"D:\SentimentAnalysis\mlruns\6\{RUN_ID}\artifacts\bilstm_glove_model"
+        model = mlflow.keras.load_model(direct_path)
+
+    # --- 3. GENERATE PREDICTIONS & METRICS ---
+    print("Generating predictions...")
+    start = time.perf_counter()
+    y_pred_probs = model.predict(X_val)
+    bilstm_seconds = time.perf_counter() - start
+    y_pred = np.argmax(y_pred_probs, axis=1)
+
+    # Generate Text Report
+    classification_summary(y_val, y_pred, le.classes_)
+
+    # --- 4. CASCADE (TF-IDF tier saved by Train.py) ---
+    if os.path.exists(FAST_MODEL_PATH):
+        _, val_texts, _, _ = load_validation_data()
+        fast_tier = FastTier.load(FAST_MODEL_PATH)
+        rows = cascade_rows(fast_tier, val_idx, len(data.y))
+        if len(rows):
+            evaluate_cascade([val_texts[i] for i in rows], y_val[rows], y_pred_probs[rows],
+                             bilstm_seconds * len(rows) / len(y_val), fast_tier)
+
+    # --- 5. PLOT CONFUSION MATRIX ---
+    plot_confusion_matrix(y_val, y_pred, le.classes_)
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+from collections import namedtuple
+import numpy as np
+from sklearn.preprocessing import LabelEncoder
+from DataSetup import MASTER_CSV, MASTER_PARQUET_DIR, file_sha256, load_master_dataset, master_dataset_format
+from fast_tokenizer import export_tokenizer
+
+# Tokenize once, reuse everywhere: the fitted tokenizer, padded int32 sequences and
+# encoded labels are stored per (dataset hash, num_words, max_len) and memory-mapped
+# by every training / evaluation script.
+STORE_DIR = 'Dataset/preprocessed'
+
+Preprocessed = namedtuple('Preprocessed', ['tokenizer', 'X_seq', 'y', 'label_encoder', 'path', 'dataset_hash'])
+
+def dataset_hash():
+    """Content hash of the master dataset that load_master_dataset() would read."""
+    if master_dataset_format() == 'parquet':
+        digest = hashlib.sha256()
+        for name in sorted(os.listdir(MASTER_PARQUET_DIR)):
+            digest.update(file_sha256(os.path.join(MASTER_PARQUET_DIR, name)).encode())
+        return digest.hexdigest()[:16]
+    return file_sha256(MASTER_CSV)[:16]
+
+def _build(path, num_words, max_len):
+    from tensorflow.keras.preprocessing.text import Tokenizer #type:ignore
+    from tensorflow.keras.preprocessing.sequence import pad_sequences #type:ignore
+
+    print(f"Building preprocessing artifacts in {path}...")
+    start = time.perf_counter()
+    df = load_master_dataset().dropna()
+
+    le = LabelEncoder()
+    y = le.fit_transform(df['label']).astype(np.int32)
+
+    tokenizer = Tokenizer(num_words=num_words)
+    tokenizer.fit_on_texts(df['text'])
+    X_seq = pad_sequences(tokenizer.texts_to_sequences(df['text']), maxlen=max_len).astype(np.int32)
+
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, 'X_seq.npy'), X_seq)
+    np.save(os.path.join(tmp_path, 'y.npy'), y)
+    with open(os.path.join(tmp_path, 'tokenizer.pickle'), 'wb') as handle:
+        pickle.dump(tokenizer, handle)
+    with open(os.path.join(tmp_path, 'label_encoder.pickle'), 'wb') as handle:
+        pickle.dump(le, handle)
+    # Same vocabulary in the serving format, so a model trained here ships with its tokenizer
+    export_tokenizer(tokenizer, os.path.join(tmp_path, 'vocab.json'), num_words=num_words)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump({'rows': len(y), 'num_words': num_words, 'max_len': max_len,
+                   'classes': le.classes_.tolist()}, f, indent=2)
+    os.replace(tmp_path, path)
+    print(f"Preprocessed {len(y)} rows in {time.perf_counter() - start:.1f}s")
+
+def load_preprocessed(num_words=20000, max_len=100):
+    """Loads (building on first use) the artifacts for the current master dataset."""
+    start = time.perf_counter()
+    data_hash = dataset_hash()
+    path = os.path.join(STORE_DIR, f'{data_hash}_w{num_words}_l{max_len}')
+    if not os.path.isdir(path):
+        os.makedirs(STORE_DIR, exist_ok=True)
+        _build(path, num_words, max_len)
+
+    X_seq = np.load(os.path.join(path, 'X_seq.npy'), mmap_mode='r')
+    y = np.load(os.path.join(path, 'y.npy'))
+    with open(os.path.join(path, 'tokenizer.pickle'), 'rb') as handle:
+        tokenizer = pickle.load(handle)
+    with open(os.path.join(path, 'label_encoder.pickle'), 'rb') as handle:
+        le = pickle.load(handle)
+    print(f"Loaded preprocessed data {path} ({X_seq.shape[0]} rows) in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return Preprocessed(tokenizer, X_seq, y, le, path, data_hash)
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import shutil
+import numpy as np
+import mlflow
+from fast_tokenizer import FastTokenizer
+from numpy_runtime import NumpyModel, quantize_bundle, prune_vocabulary
+from Metrics import load_validation_data, classification_summary
+
+# Produces smaller inference variants of the exported NumPy bundle and only promotes
+# the ones whose macro-F1 stays within --tolerance of the float32 model.
+#   python numpy_runtime.py export model model_numpy.npz   (once)
+#   python QuantizeModel.py --vocab-size 15000 --tolerance 0.01
+# Promoted variants are served with MODEL_VARIANT=<name> (see inference.py).
+
+BASE_MODEL = 'model_numpy.npz'
+BASE_VOCAB = 'vocab.json'
+STAGING_DIR = 'variants'
+max_len = 100
+
+def variant_paths(name, root='.'):
+    """(bundle, vocab) file names of a variant; pruned variants ship their own vocabulary."""
+    bundle = os.path.join(root, f'model_numpy_{name}.npz')
+    if name.startswith('pruned'):
+        return bundle, os.path.join(root, f'vocab_{name}.json')
+    return bundle, BASE_VOCAB
+
+def build_variants(vocab_size=None):
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    names = ['int8']
+
+    bundle, _ = variant_paths('int8', STAGING_DIR)
+    quantize_bundle(BASE_MODEL, bundle)
+
+    if vocab_size:
+        bundle, vocab = variant_paths('pruned', STAGING_DIR)
+        prune_vocabulary(BASE_MODEL, bundle, BASE_VOCAB, vocab, vocab_size)
+        shutil.copy(vocab, variant_paths('pruned_int8', STAGING_DIR)[1])
+        quantize_bundle(bundle, variant_paths('pruned_int8', STAGING_DIR)[0])
+        names += ['pruned', 'pruned_int8']
+    return names
+
+def evaluate(bundle_path, vocab_path, val_texts, y_val, class_names, title):
+    model = NumpyModel.load(bundle_path)
+    X_val = FastTokenizer.load(vocab_path).texts_to_padded(val_texts, max_len)
+    probs = np.concatenate([model.predict(X_val[i:i + 1024]) for i in range(0, len(X_val), 1024)])
+    report = classification_summary(y_val, probs.argmax(axis=1), class_names, title=title)
+    return report['macro avg']['f1-score']
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and gate quantized / reduced-vocabulary variants")
+    parser.add_argument('--vocab-size', type=int, default=None, help="Also build a variant keeping only the top N tokenizer ids")
+    parser.add_argument('--tolerance', type=float, default=0.01, help="Max allowed macro-F1 drop versus float32")
+    args = parser.parse_args()
+
+    print("Loading validation data...")
+    _, val_texts, y_val, le = load_validation_data()
+
+    names = build_variants(args.vocab_size)
+
+    mlflow.set_experiment("Emotion_BiLSTM_Quantization")
+    with mlflow.start_run(run_name="Quantize_and_Prune"):
+        mlflow.log_params({"vocab_size": args.vocab_size, "tolerance": args.tolerance})
+        base_f1 = evaluate(BASE_MODEL, BASE_VOCAB, val_texts, y_val, le.classes_, "FLOAT32 (BASELINE)")
+        mlflow.log_metric("macro_f1_fp32", base_f1)
+
+        promoted = {}
+        for name in names:
+            bundle, vocab = variant_paths(name, STAGING_DIR)
+            f1 = evaluate(bundle, vocab, val_texts, y_val, le.classes_, f"VARIANT: {name.upper()}")
+            size_mb = os.path.getsize(bundle) / 1e6
+            mlflow.log_metrics({f"macro_f1_{name}": f1, f"size_mb_{name}": size_mb})
+
+            passed = base_f1 - f1 <= args.tolerance
+            print(f"{name}: macro-F1 {f1:.4f} (fp32 {base_f1:.4f}), {size_mb:.1f} MB -> {'PROMOTED' if passed else 'REJECTED'}")
+            if passed:
+                for src, dst in zip((bundle, vocab), variant_paths(name)):
+                    if src != dst:
+                        shutil.copy(src, dst)
+                promoted[name] = {"macro_f1": f1, "fp32_macro_f1": base_f1, "size_mb": size_mb}
+
+        with open(os.path.join(STAGING_DIR, 'promoted.json'), 'w') as f:
+            json.dump(promoted, f, indent=2)
+        mlflow.log_artifact(os.path.join(STAGING_DIR, 'promoted.json'))
+
+    print(f"Promoted variants: {', '.join(promoted) or 'none'}")
@@ -1,71 +1,144 @@
-import pandas as pd
+import argparse
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import mlflow
-import mlflow.keras
-import mlflow.sklearn
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score
-from sklearn.preprocessing import LabelEncoder
-from tensorflow.keras.preprocessing.text import Tokenizer #type:ignore 
-from tensorflow.keras.preprocessing.sequence import pad_sequences #type:ignore
-from tensorflow.keras.models import Sequential #type:ignore
-from tensorflow.keras.layers import Embedding, LSTM, GRU, Dense, Dropout #type:ignore
-
-# Load and Split Data
-df = pd.read_csv('Dataset/master_dataset.csv').dropna()
-le = LabelEncoder()
-df['label_encoded'] = le.fit_transform(df['label'])
-
-num_classes = len(le.classes_) 
-print(f"Total unique emotions: {num_classes}")
-
-X_train_raw, X_test_raw, y_train, y_test = train_test_split(
-    df['text'], df['label_encoded'], test_size=0.2, stratify=df['label_encoded']
-)
-
-mlflow.set_experiment("Emotion_Model_Comparison")
-
-# --- MODEL 1: Logistic Regression ---
-with mlflow.start_run(run_name="Logistic_Regression"):
+from Preprocessing import load_preprocessed
+from cascade import FAST_MODEL_PATH, save_fast_model
+
+# Model comparison runner: every candidate trains in its own worker process with a bounded
+# TF / BLAS thread budget, reading the same memory-mapped preprocessed features.
+#   python Train.py                      (all candidates in parallel)
+#   python Train.py --workers 1          (one after another)
+#   python Train.py --compare            (both, then a wall-clock comparison)
+num_words = 10000
+max_len = 100
+CANDIDATES = ('Logistic_Regression', 'LSTM_Model', 'GRU_Model')
+
+def _init_worker(threads):
+    # Must run before TensorFlow / NumPy spin up their thread pools in this process
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                'TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS'):
+        os.environ[var] = str(threads)
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(max(1, threads // 2))
+
+def train_lr(data, idx_train, idx_test):
+    import mlflow.sklearn
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from DataSetup import load_master_dataset
+
+    # Same rows, in the same order, the preprocessed store was built from
+    texts = load_master_dataset().dropna()['text']
+    X_train_raw, X_test_raw = texts.iloc[idx_train], texts.iloc[idx_test]
+    y_train, y_test = data.y[idx_train], data.y[idx_test]
+
     tfidf = TfidfVectorizer(max_features=5000)
     X_train_tfidf = tfidf.fit_transform(X_train_raw)
     X_test_tfidf = tfidf.transform(X_test_raw)
-    
+
     lr = LogisticRegression(max_iter=1000)
     lr.fit(X_train_tfidf, y_train)
-    
+
     # Log Metrics
     train_acc = lr.score(X_train_tfidf, y_train)
     test_acc = lr.score(X_test_tfidf, y_test)
-    mlflow.log_metrics({"train_acc": train_acc, "test_acc": test_acc})
     mlflow.sklearn.log_model(lr, "model")
 
-# --- Prep for DL (LSTM & GRU) ---
-tokenizer = Tokenizer(num_words=10000)
-tokenizer.fit_on_texts(X_train_raw)
-X_train_seq = pad_sequences(tokenizer.texts_to_sequences(X_train_raw), maxlen=100)
-X_test_seq = pad_sequences(tokenizer.texts_to_sequences(X_test_raw), maxlen=100)
-
-def train_dl(name, layer):
-    with mlflow.start_run(run_name=name):
-        model = Sequential([
-            Embedding(10000, 128, input_length=100),
-            layer(64),
-            Dense(num_classes, activation='softmax')
-        ])
-        model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
-        
-        # Train and Log
-        history = model.fit(X_train_seq, y_train, epochs=5, validation_data=(X_test_seq, y_test))
-        
-        # Log final metrics
-        mlflow.log_metrics({
-            "train_acc": history.history['accuracy'][-1],
-            "test_acc": history.history['val_accuracy'][-1]
-        })
-        mlflow.keras.log_model(model, "model")
-
-train_dl("LSTM_Model", LSTM)
-train_dl("GRU_Model", GRU)
\ No newline at end of file
+    # Kept as the first serving tier (CASCADE_THRESHOLD in inference.py),
+    # with its test rows, so Metrics.py can keep the cascade evaluation to rows it never saw
+    save_fast_model(tfidf, lr, data.label_encoder.classes_, FAST_MODEL_PATH, holdout=idx_test, n_rows=len(data.y))
+    mlflow.log_artifact(FAST_MODEL_PATH)
+    return {"train_acc": train_acc, "test_acc": test_acc}
+
+def train_dl(data, idx_train, idx_test, layer):
+    import mlflow.keras
+    from tensorflow.keras.models import Sequential #type:ignore
+    from tensorflow.keras.layers import Input, Embedding, Dense #type:ignore
+    import InputPipeline
+
+    num_classes = len(data.label_encoder.classes_)
+    X_train_seq, X_test_seq = data.X_seq[idx_train], data.X_seq[idx_test]
+    y_train, y_test = data.y[idx_train], data.y[idx_test]
+
+    model = Sequential([
+        Input(shape=(None,), dtype='int32'),
+        Embedding(num_words, 128),
+        layer(64),
+        Dense(num_classes, activation='softmax')
+    ])
+    model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+
+    # Train and Log
+    history = InputPipeline.fit(model, X_train_seq, y_train, (X_test_seq, y_test), epochs=5, batch_size=32, verbose=2)
+    mlflow.keras.log_model(model, "model")
+    return {
+        "train_acc": history.history['accuracy'][-1],
+        "test_acc": history.history['val_accuracy'][-1]
+    }
+
+def run_candidate(name, idx_train, idx_test, threads, mode, experiment_id):
+    """Trains one candidate in its own MLflow run; returns (name, seconds, metrics)."""
+    start = time.perf_counter()
+    data = load_preprocessed(num_words=num_words, max_len=max_len)
+    with mlflow.start_run(run_name=name, experiment_id=experiment_id):
+        mlflow.log_params({"threads": threads, "runner_mode": mode, "dataset_hash": data.dataset_hash})
+        if name == 'Logistic_Regression':
+            metrics = train_lr(data, idx_train, idx_test)
+        else:
+            from tensorflow.keras.layers import LSTM, GRU #type:ignore
+            metrics = train_dl(data, idx_train, idx_test, LSTM if name == 'LSTM_Model' else GRU)
+        elapsed = time.perf_counter() - start
+        mlflow.log_metrics({**metrics, "train_seconds": elapsed})
+    return name, elapsed, metrics
+
+def run_all(names, idx_train, idx_test, workers, threads=None):
+    """Trains `names` on `workers` processes, splitting the cores between them unless `threads` is given."""
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    mode = 'serial' if workers == 1 else 'parallel'
+    print(f"Training {len(names)} candidates on {workers} worker(s) x {threads} thread(s)...")
+    # Created (or looked up) once here: workers creating it concurrently on a fresh tracking store race
+    experiment_id = mlflow.set_experiment("Emotion_Model_Comparison").experiment_id
+    start = time.perf_counter()
+    # spawn: a forked child would inherit the parent's (possibly initialised) TF runtime
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(threads,)) as pool:
+        futures = [pool.submit(run_candidate, name, idx_train, idx_test, threads, mode, experiment_id) for name in names]
+        results = {}
+        for future in as_completed(futures):
+            name, elapsed, metrics = future.result()
+            results[name] = elapsed
+            print(f"  {name:<20} {elapsed:7.1f}s  test_acc {metrics['test_acc']:.4f}")
+    return time.perf_counter() - start, results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train and compare the candidate emotion models")
+    parser.add_argument('--models', nargs='+', default=list(CANDIDATES), choices=CANDIDATES)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per model)")
+    parser.add_argument('--threads', type=int, default=None, help="TF / BLAS threads per worker (default: cores / workers)")
+    parser.add_argument('--compare', action='store_true', help="Run serially and in parallel and compare wall-clock time")
+    args = parser.parse_args()
+
+    # Build the shared store up front so workers only memory-map it
+    data = load_preprocessed(num_words=num_words, max_len=max_len)
+    print(f"Total unique emotions: {len(data.label_encoder.classes_)}")
+
+    # Split row indices once so every candidate (TF-IDF and sequence models) sees the same split
+    idx_train, idx_test = train_test_split(np.arange(len(data.y)), test_size=0.2, stratify=data.y)
+
+    workers = args.workers or len(args.models)
+    if not args.compare:
+        wall, _ = run_all(args.models, idx_train, idx_test, workers, args.threads)
+        print(f"Wall-clock: {wall:.1f}s")
+    else:
+        serial_wall, serial = run_all(args.models, idx_train, idx_test, 1, args.threads)
+        parallel_wall, parallel = run_all(args.models, idx_train, idx_test, max(workers, 2), args.threads)
+        print(f"\n{'model':<20} {'serial':>9} {'parallel':>9}")
+        for name in args.models:
+            print(f"{name:<20} {serial[name]:8.1f}s {parallel[name]:8.1f}s")
+        print(f"{'wall-clock':<20} {serial_wall:8.1f}s {parallel_wall:8.1f}s   speedup x{serial_wall / parallel_wall:.2f}")
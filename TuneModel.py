@@ -1,31 +1,24 @@
+import os
 import numpy as np
-import pandas as pd
 import mlflow
 import mlflow.keras
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
 from sklearn.utils import class_weight
-from tensorflow.keras.preprocessing.text import Tokenizer
-from tensorflow.keras.preprocessing.sequence import pad_sequences
 from tensorflow.keras.optimizers import Adam
+from Preprocessing import load_preprocessed
+import InputPipeline
 
 # --- 1. DATA PREPARATION (Defines the missing variables) ---
 print("Loading data for fine-tuning...")
-df = pd.read_csv('Dataset/master_dataset.csv').dropna()
-
-# Encode labels
-le = LabelEncoder()
-df['label_encoded'] = le.fit_transform(df['label'])
-num_classes = len(le.classes_)
-
-# Tokenize text (Ensure parameters match your original training)
+# Encoded labels and tokenized text from the shared store (same tokenizer as BiLSTM.py)
 max_words = 20000
 max_len = 100
-tokenizer = Tokenizer(num_words=max_words)
-tokenizer.fit_on_texts(df['text'])
+data = load_preprocessed(num_words=max_words, max_len=max_len)
+le = data.label_encoder
+num_classes = len(le.classes_)
 
-X_seq = pad_sequences(tokenizer.texts_to_sequences(df['text']), maxlen=max_len)
-y = df['label_encoded'].values
+X_seq = data.X_seq
+y = data.y
 
 # Split data - This defines y_train and X_train_seq
 X_train_seq, X_val_seq, y_train, y_val = train_test_split(X_seq, y, test_size=0.2, stratify=y)
@@ -50,12 +43,14 @@ model.compile(optimizer=Adam(learning_rate=1e-5), loss='sparse_categorical_cross
 
 mlflow.set_experiment("Emotion_BiLSTM_FineTuning")
 with mlflow.start_run(run_name="FineTuning_Unfrozen_GloVe"):
-    history = model.fit(
-        X_train_seq, y_train, 
+    # BALANCED_SAMPLING=1 (with INPUT_PIPELINE=tfdata) samples batches by these weights instead
+    history = InputPipeline.fit(
+        model, X_train_seq, y_train,
+        (X_val_seq, y_val),
         epochs=5, 
         batch_size=64, 
-        validation_data=(X_val_seq, y_val),
-        class_weight=class_weight_dict # Apply weights to fix 'Joy' bias
+        class_weight=class_weight_dict, # Apply weights to fix 'Joy' bias
+        balanced_sampling=os.environ.get('BALANCED_SAMPLING') == '1'
     )
     mlflow.keras.log_model(model, "fine_tuned_bilstm_model")
 
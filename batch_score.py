@@ -0,0 +1,185 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from DataSetup import CHUNK_SIZE, clean_texts
+from fast_tokenizer import load_tokenizer, texts_to_padded
+
+# Offline scoring of CSV / Parquet files with the serving model (same runtime, variant,
+# vocabulary and length buckets as inference.py, selected by the same env vars):
+#   python batch_score.py prediction_logs.csv rescored_logs/
+#   python batch_score.py prediction_logs/ rescored_logs/ --workers 4
+#   python batch_score.py comments.parquet scored/ --text-column body --id-column comment_id
+# The input is read --chunk-size rows at a time; a spawn process pool cleans and tokenizes
+# upcoming chunks while this process runs the model over --batch-size rows per forward pass.
+# Every chunk becomes one Parquet part (row, id, label, prob_<class>..., model_version) in the
+# output directory, so a rerun of an interrupted job skips the parts that are already written.
+STATE_FILE = '_batch_score.json'
+
+# Per-worker tokenizer, set by _init_worker
+_tokenizer = None
+_max_len = None
+
+
+def _init_worker(vocab_path, max_len):
+    global _tokenizer, _max_len
+    _tokenizer = load_tokenizer(vocab_path)
+    _max_len = max_len
+
+
+def prepare(texts):
+    """Raw texts -> pre-padded token ids, exactly as inference.py does it (runs in the workers)."""
+    return texts_to_padded(_tokenizer, clean_texts(texts), _max_len)
+
+
+def input_files(path):
+    """The file itself, or every Parquet / CSV file below a directory (e.g. prediction_logs/) in name order."""
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(p for pattern in ('*.parquet', '*.csv', '*.csv.gz')
+                  for p in glob.glob(os.path.join(path, '**', pattern), recursive=True))
+
+
+def read_chunks(paths, columns, chunk_size):
+    for path in paths:
+        if path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+
+
+def run_fingerprint(paths, args, model_version):
+    """Everything that decides which rows land in which part; a resumed run must match it."""
+    return {
+        'inputs': [[p, os.path.getsize(p), os.stat(p).st_mtime_ns] for p in paths],
+        'chunk_size': args.chunk_size,
+        'text_column': args.text_column,
+        'id_column': args.id_column,
+        'keep_text': args.keep_text,
+        'model_version': model_version,
+    }
+
+
+def part_path(out_dir, index):
+    return os.path.join(out_dir, f'part-{index:05d}.parquet')
+
+
+def score(args):
+    # Loads the model, vocabulary and label classes exactly like the server
+    import inference
+    if inference.load_error:
+        raise SystemExit(inference.load_error)
+
+    paths = input_files(args.input)
+    if not paths:
+        raise SystemExit(f"No CSV or Parquet files in {args.input}")
+    fingerprint = run_fingerprint(paths, args, inference.model_version)
+    state_path = os.path.join(args.output, STATE_FILE)
+    if args.overwrite:
+        shutil.rmtree(args.output, ignore_errors=True)
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            if json.load(f) != fingerprint:
+                raise SystemExit(f"{args.output} holds a run with different inputs, settings or model; "
+                                 f"use --overwrite or another output directory")
+    os.makedirs(args.output, exist_ok=True)
+    with open(state_path, 'w') as f:
+        json.dump(fingerprint, f, indent=1)
+
+    classes = [str(c) for c in inference.classes]
+    columns = [args.text_column] + ([args.id_column] if args.id_column else [])
+    totals = {'rows': 0, 'skipped': 0, 'prep_wait': 0.0, 'model': 0.0, 'write': 0.0}
+    ctx = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(args.workers, mp_context=ctx, initializer=_init_worker,
+                               initargs=(inference.VOCAB_PATH, inference.max_len)) if args.workers else None
+    if pool is None:
+        _init_worker(inference.VOCAB_PATH, inference.max_len)
+    start = time.perf_counter()
+
+    def finish(index, first_row, chunk, futures):
+        t0 = time.perf_counter()
+        padded = np.concatenate([f.result() for f in futures]) if pool else prepare(chunk[args.text_column].tolist())
+        t1 = time.perf_counter()
+        probs = np.concatenate([inference.forward(padded[i:i + args.batch_size])
+                                for i in range(0, len(padded), args.batch_size)]) if len(padded) else \
+            np.zeros((0, len(classes)), dtype=np.float32)
+        t2 = time.perf_counter()
+
+        out = pd.DataFrame({'row': np.arange(first_row, first_row + len(chunk), dtype=np.int64)})
+        if args.id_column:
+            out['id'] = chunk[args.id_column].to_numpy()
+        if args.keep_text:
+            out['text'] = chunk[args.text_column].astype('string').to_numpy()
+        out['label'] = pd.Categorical(np.asarray(classes)[probs.argmax(axis=1)] if len(probs) else [], categories=classes)
+        for j, name in enumerate(classes):
+            out[f'prob_{name}'] = probs[:, j].astype(np.float32)
+        out['model_version'] = inference.model_version
+        # Dot-prefixed while being written, so readers of the directory never pick up a partial part
+        path = part_path(args.output, index)
+        tmp_path = os.path.join(args.output, '.' + os.path.basename(path))
+        out.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        t3 = time.perf_counter()
+
+        totals['rows'] += len(chunk)
+        totals['prep_wait'] += t1 - t0
+        totals['model'] += t2 - t1
+        totals['write'] += t3 - t2
+        print(f"part {index:5d}: {len(chunk):7d} rows | waited {t1 - t0:6.2f}s for tokens, model {t2 - t1:6.2f}s | "
+              f"{totals['rows'] / (time.perf_counter() - start):,.0f} rows/sec so far", flush=True)
+
+    try:
+        pending = deque()
+        first_row = 0
+        for index, chunk in enumerate(read_chunks(paths, columns, args.chunk_size)):
+            chunk_start, first_row = first_row, first_row + len(chunk)
+            if os.path.exists(part_path(args.output, index)):
+                totals['skipped'] += len(chunk)
+                continue
+            futures = []
+            if pool:
+                # One slice per worker, so a single chunk is already tokenized in parallel
+                texts = chunk[args.text_column].tolist()
+                step = max(1, -(-len(texts) // args.workers))
+                futures = [pool.submit(prepare, texts[i:i + step]) for i in range(0, len(texts), step)]
+            pending.append((index, chunk_start, chunk, futures))
+            # Keep the workers --prefetch chunks ahead of the model
+            if len(pending) > args.prefetch:
+                finish(*pending.popleft())
+        while pending:
+            finish(*pending.popleft())
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"\nScored {totals['rows']} rows in {elapsed:.1f}s ({totals['rows'] / elapsed:,.0f} rows/sec)"
+          + (f", {totals['skipped']} rows already done" if totals['skipped'] else ""))
+    print(f"  waiting for tokens {totals['prep_wait']:.1f}s, model {totals['model']:.1f}s, writing {totals['write']:.1f}s")
+    print(f"Predictions in {args.output}/ (pd.read_parquet('{args.output}'))")
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV / Parquet file or directory with the serving model")
+    parser.add_argument('input', help="CSV (.csv, .csv.gz) or Parquet file, or a directory of them")
+    parser.add_argument('output', help="Output directory of Parquet parts")
+    parser.add_argument('--text-column', default='text')
+    parser.add_argument('--id-column', default=None, help="Column copied to the output as 'id'")
+    parser.add_argument('--keep-text', action='store_true', help="Also write the raw text")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows per chunk / output part")
+    parser.add_argument('--batch-size', type=int, default=1024, help="Rows per forward pass")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="Tokenization processes (0 = tokenize in this process)")
+    parser.add_argument('--prefetch', type=int, default=2, help="Chunks tokenized ahead of the model")
+    parser.add_argument('--overwrite', action='store_true', help="Discard an existing output directory")
+    score(parser.parse_args())
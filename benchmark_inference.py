@@ -0,0 +1,404 @@
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+import urllib3
+from DataSetup import clean_texts, load_master_dataset
+from proxy_load_test import closed_loop, http_sender, latency_summary
+
+# The suite measures the model path, so repeated texts must not come from the prediction cache
+os.environ.setdefault('PREDICTION_CACHE', 'off')
+
+# Importing inference loads the model with the runtime selected by INFERENCE_RUNTIME
+import inference
+
+# Benchmarks for inference.py. Without --suite: fixed padding vs length bucketing (below).
+# --suite runs a matrix of batch sizes x text-length distributions x client concurrency:
+#   stages     per-stage timings of the request path, no HTTP
+#   inprocess  the Flask app through its test client (micro-batcher, cascade, JSON)
+#   http       the app under gunicorn (or --url for a server that is already running)
+# and writes the results to JSON; --compare flags regressions against an earlier run.
+#   python benchmark_inference.py --suite --output bench_new.json --compare bench_main.json
+DISTRIBUTIONS = ('short', 'typical', 'long')
+CANNED_TEXTS = ["first", "love this video", "this is the worst thing i have ever seen honestly",
+                "lol", "i cried so much at the end of this song it reminds me of my childhood"]
+
+
+def load_text_pools(n, seed=0):
+    """
+    `n` raw texts per length distribution drawn from the master dataset: 'short' and 'long'
+    are the bottom and top quartile by word count, 'typical' is a plain sample.
+    Falls back to canned texts.
+    """
+    rng = np.random.default_rng(seed)
+    try:
+        texts = load_master_dataset(columns=('text',))['text'].dropna().astype(str)
+    except FileNotFoundError as e:
+        print(f"{e}, using canned texts")
+        return {name: rng.choice(CANNED_TEXTS, size=n).tolist() for name in DISTRIBUTIONS}
+    words = texts.str.split().str.len()
+    pools = {'short': texts[words <= words.quantile(0.25)], 'typical': texts, 'long': texts[words >= words.quantile(0.75)]}
+    return {name: pool.sample(n, random_state=seed, replace=len(pool) < n).tolist() for name, pool in pools.items()}
+
+
+def load_sample_texts(n, seed=0):
+    """Real comment lengths from the training set, cleaned; falls back to canned texts."""
+    return clean_texts(load_text_pools(n, seed)['typical'])
+
+
+def _time(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - start)
+    return out, float(np.median(times))
+
+
+def benchmark_bucketing(texts, batch_sizes, buckets, repeats=5):
+    """Fixed max_len padding vs length bucketing: latency, then (label agreement, max probability difference)."""
+    padded = inference.tokenize(texts)
+    lengths = np.count_nonzero(padded, axis=1)
+    print(f"{len(texts)} texts, median length {np.median(lengths):.0f}, p95 {np.percentile(lengths, 95):.0f} tokens")
+    print(f"Buckets: {buckets}\n")
+
+    # Warm up every shape once so tracing is not counted
+    inference.forward(padded[:max(batch_sizes)], buckets=[])
+    inference.forward(padded[:max(batch_sizes)], buckets=buckets)
+
+    print(f"{'batch':>6} {'fixed ms':>10} {'bucketed ms':>12} {'speedup':>8}")
+    for batch_size in batch_sizes:
+        batch = padded[:batch_size]
+        _, t_fixed = _time(lambda: inference.forward(batch, buckets=[]), repeats)
+        _, t_bucketed = _time(lambda: inference.forward(batch, buckets=buckets), repeats)
+        print(f"{batch_size:>6} {t_fixed * 1000:>10.1f} {t_bucketed * 1000:>12.1f} {t_fixed / t_bucketed:>7.2f}x")
+
+    # The model has no masking, so fewer leading pad steps can move probabilities and labels
+    fixed = inference.forward(padded, buckets=[])
+    bucketed = inference.forward(padded, buckets=buckets)
+    agreement = float((fixed.argmax(axis=1) == bucketed.argmax(axis=1)).mean())
+    max_diff = float(np.abs(fixed - bucketed).max())
+    print(f"\nLabel agreement with fixed padding: {agreement:.4%}")
+    print(f"Max probability difference: {max_diff:.2e}")
+    return agreement, max_diff
+
+
+def stage_timings(raw_texts, repeats=5):
+    """Median ms of each step inference.py runs for one request, in order."""
+    stages = {}
+    cleaned, stages['clean_text'] = _time(lambda: clean_texts(raw_texts), repeats)
+    if isinstance(inference.tokenizer, inference.FastTokenizer):
+        # The compact vocabulary tokenizes straight into the padded array
+        padded, stages['texts_to_padded'] = _time(lambda: inference.tokenize(cleaned), repeats)
+    else:
+        from tensorflow.keras.preprocessing.sequence import pad_sequences #type:ignore
+        sequences, stages['texts_to_sequences'] = _time(lambda: inference.tokenizer.texts_to_sequences(cleaned), repeats)
+        padded, stages['pad_sequences'] = _time(lambda: pad_sequences(sequences, maxlen=inference.max_len), repeats)
+    probs, stages['model.predict'] = _time(lambda: inference.forward(padded), repeats)
+    _, stages['inverse_transform'] = _time(lambda: inference.classes[np.argmax(probs, axis=1)].tolist(), repeats)
+    return {name: round(seconds * 1000, 3) for name, seconds in stages.items()}
+
+
+def inprocess_sender():
+    local = threading.local()
+
+    def send(texts):
+        if not hasattr(local, 'client'):
+            local.client = inference.app.test_client()
+        response = local.client.post('/invocations', json={'text': texts})
+        if response.status_code != 200:
+            return f"HTTP {response.status_code}: {response.data[:200]!r}"
+        if len(response.get_json()['predictions']) != len(texts):
+            return "wrong number of predictions"
+        return None
+    return send
+
+
+# What the Dockerfile ran before gunicorn.conf.py: one gthread worker, 8 threads, nothing derived from the CPUs
+LEGACY_GUNICORN_ARGS = ['--timeout', '120', '--worker-class', 'gthread', '--threads', '8']
+GUNICORN_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+
+
+@contextlib.contextmanager
+def gunicorn_server(port, gunicorn_args=None, env=None, startup_timeout=300):
+    """
+    inference:app under gunicorn (gunicorn.conf.py unless `gunicorn_args` are given); yields
+    (base URL, master pid) once /ping is healthy, i.e. after the warm-up.
+    """
+    url = f'http://127.0.0.1:{port}'
+    cmd = [sys.executable, '-m', 'gunicorn', *(gunicorn_args or ['-c', GUNICORN_CONFIG]),
+           '-b', f'127.0.0.1:{port}', 'inference:app']
+    with open('gunicorn_benchmark.log', 'w') as log:
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, env=dict(os.environ, **(env or {})))
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if proc.poll() is not None:
+                raise SystemExit(f"gunicorn exited with {proc.returncode}, see gunicorn_benchmark.log")
+            try:
+                if urllib3.request('GET', url + '/ping', timeout=2, retries=False).status == 200:
+                    break
+            except Exception:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit(f"gunicorn did not answer /ping within {startup_timeout}s")
+            time.sleep(0.5)
+        yield url, proc.pid
+    finally:
+        # Quick shutdown: a graceful one waits out the clients' keep-alive connections
+        proc.send_signal(signal.SIGQUIT)
+        try:
+            proc.wait(30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def gunicorn_env(args):
+    env = {}
+    if args.workers:
+        env['GUNICORN_WORKERS'] = str(args.workers)
+    if args.threads:
+        env['GUNICORN_THREADS'] = str(args.threads)
+    return env
+
+
+def process_memory(pid):
+    """RSS, PSS and USS (private) in MB from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {'rss_mb': round(fields['Rss'], 1), 'pss_mb': round(fields['Pss'], 1),
+            'uss_mb': round(fields['Private_Clean'] + fields['Private_Dirty'], 1)}
+
+
+def worker_pids(master_pid):
+    pids = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # ppid is the 2nd field after the ")" closing the command name
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == master_pid:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return sorted(pids)
+
+
+def compare_serving(args, pools):
+    """
+    Throughput, latency and memory per process of the old gunicorn command line vs
+    gunicorn.conf.py, under the same load. PSS splits shared (copy-on-write) pages
+    between the processes that map them, so the PSS total is the real footprint.
+    """
+    batch_size = int(args.batch_sizes.split(',')[0])
+    concurrency = max(int(c) for c in args.concurrency.split(','))
+    pool = pools['typical']
+    payloads = [[pool[(i * batch_size + k) % len(pool)] for k in range(batch_size)] for i in range(args.requests)]
+    setups = [('current', LEGACY_GUNICORN_ARGS, {}), ('tuned', None, gunicorn_env(args))]
+    results = []
+    print(f"\n{len(payloads)} requests x {batch_size} text(s), {concurrency} clients")
+    print(f"{'setup':>8} {'workers':>8} {'req/s':>9} {'texts/s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'master PSS':>11} {'worker RSS':>11} {'worker USS':>11} {'total PSS':>10}")
+    for name, gunicorn_args, env in setups:
+        with gunicorn_server(args.port, gunicorn_args, env) as (url, master_pid):
+            send = http_sender(url, concurrency)
+            closed_loop(send, payloads[:concurrency], concurrency)  # warm-up
+            wall, latencies, errors = closed_loop(send, payloads, concurrency)
+            master = process_memory(master_pid)
+            workers = [process_memory(pid) for pid in worker_pids(master_pid)]
+        row = {'kind': f'serving-{name}', 'distribution': 'typical', 'batch_size': batch_size, 'concurrency': concurrency,
+               'requests': len(latencies), 'errors': len(errors), 'wall_s': round(wall, 3),
+               'requests_per_sec': round(len(latencies) / wall, 2),
+               'texts_per_sec': round(len(latencies) * batch_size / wall, 1), **latency_summary(latencies),
+               'workers': len(workers), 'master_memory': master, 'worker_memory': workers,
+               'total_pss_mb': round(master['pss_mb'] + sum(w['pss_mb'] for w in workers), 1)}
+        results.append(row)
+        mean = lambda key: np.mean([w[key] for w in workers]) if workers else 0.0
+        print(f"{name:>8} {len(workers):>8} {row['requests_per_sec']:>9.1f} {row['texts_per_sec']:>10.1f} "
+              f"{row['p50_ms'] or 0:>8.1f} {row['p99_ms'] or 0:>8.1f} {master['pss_mb']:>8.1f} MB "
+              f"{mean('rss_mb'):>8.1f} MB {mean('uss_mb'):>8.1f} MB {row['total_pss_mb']:>7.1f} MB")
+    return results
+
+
+def run_suite(args, pools):
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',')]
+    concurrencies = [int(c) for c in args.concurrency.split(',')]
+    kinds = args.kinds.split(',')
+    results = []
+
+    if 'stages' in kinds:
+        print(f"\n{'dist':>8} {'batch':>6}  stage ms")
+        for dist in args.distributions.split(','):
+            for batch_size in batch_sizes:
+                texts = pools[dist][:batch_size]
+                stage_timings(texts, 1)  # warm-up: traces this batch shape once
+                stages = stage_timings(texts, args.repeats)
+                total = sum(stages.values())
+                results.append({'kind': 'stages', 'distribution': dist, 'batch_size': batch_size, 'concurrency': None,
+                                'stages_ms': stages, 'total_ms': round(total, 3),
+                                'texts_per_sec': round(batch_size / total * 1000, 1)})
+                print(f"{dist:>8} {batch_size:>6}  " + "  ".join(f"{k} {v:.2f}" for k, v in stages.items()))
+
+    for kind in [k for k in kinds if k in ('inprocess', 'http')]:
+        with contextlib.ExitStack() as stack:
+            if kind == 'inprocess':
+                make_sender = lambda concurrency: inprocess_sender()
+            else:
+                url = args.url or stack.enter_context(gunicorn_server(args.port, env=gunicorn_env(args)))[0]
+                make_sender = lambda concurrency: http_sender(url, concurrency)
+            print(f"\n{kind}: {'dist':>8} {'batch':>6} {'clients':>8} {'req/s':>9} {'texts/s':>10} "
+                  f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+            for dist in args.distributions.split(','):
+                pool = pools[dist]
+                for batch_size in batch_sizes:
+                    for concurrency in concurrencies:
+                        n_requests = max(2 * concurrency, min(args.requests, args.max_texts // batch_size))
+                        payloads = [[pool[(i * batch_size + k) % len(pool)] for k in range(batch_size)]
+                                    for i in range(n_requests)]
+                        send = make_sender(concurrency)
+                        closed_loop(send, payloads[:concurrency], concurrency)  # warm-up
+                        wall, latencies, errors = closed_loop(send, payloads, concurrency)
+                        row = {'kind': kind, 'distribution': dist, 'batch_size': batch_size, 'concurrency': concurrency,
+                               'requests': len(latencies), 'errors': len(errors), 'wall_s': round(wall, 3),
+                               'requests_per_sec': round(len(latencies) / wall, 2),
+                               'texts_per_sec': round(len(latencies) * batch_size / wall, 1),
+                               **latency_summary(latencies)}
+                        if errors:
+                            row['first_error'] = errors[0]
+                        results.append(row)
+                        print(f"{'':>{len(kind) + 1}} {dist:>8} {batch_size:>6} {concurrency:>8} {row['requests_per_sec']:>9.1f} "
+                              f"{row['texts_per_sec']:>10.1f} {row['p50_ms'] or 0:>8.1f} {row['p95_ms'] or 0:>8.1f} "
+                              f"{row['p99_ms'] or 0:>8.1f} {len(errors):>7}")
+    return results
+
+
+def run_metadata(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'model_version': inference.model_version,
+        'runtime': inference.INFERENCE_RUNTIME,
+        'model_variant': inference.MODEL_VARIANT,
+        'length_buckets': inference.length_buckets,
+        'micro_batching': inference.MICRO_BATCHING,
+        'max_batch_size': inference.MAX_BATCH_SIZE,
+        'max_batch_wait_ms': inference.MAX_BATCH_WAIT_MS,
+        'prediction_cache': inference.PREDICTION_CACHE,
+        'cascade_threshold': inference.CASCADE_THRESHOLD,
+        'gunicorn': None if args.url else {'workers': args.workers, 'threads': args.threads},
+        'url': args.url,
+        'repeats': args.repeats,
+        'seed': args.seed,
+    }
+
+
+# metric -> True when higher is better
+REGRESSION_METRICS = {'texts_per_sec': True, 'p50_ms': False, 'p95_ms': False, 'p99_ms': False}
+
+def compare_results(baseline, current, tolerance):
+    """Matched rows whose throughput dropped or latency grew by more than `tolerance` (relative)."""
+    key = lambda r: (r['kind'], r['distribution'], r['batch_size'], r['concurrency'])
+    before = {key(r): r for r in baseline['results']}
+    for field in ('runtime', 'model_variant', 'length_buckets', 'micro_batching', 'cpu_count', 'gunicorn'):
+        if baseline['meta'].get(field) != current['meta'].get(field):
+            print(f"Note: {field} differs ({baseline['meta'].get(field)} -> {current['meta'].get(field)})")
+
+    regressions = []
+    for row in current['results']:
+        old = before.get(key(row))
+        if old is None:
+            continue
+        for metric, higher_is_better in REGRESSION_METRICS.items():
+            if not old.get(metric) or row.get(metric) is None:
+                continue
+            change = row[metric] / old[metric] - 1
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append((key(row), metric, old[metric], row[metric], change))
+
+    print(f"\nCompared {sum(key(r) in before for r in current['results'])} rows "
+          f"against {baseline['meta'].get('git_commit')} ({baseline['meta'].get('timestamp')}), tolerance {tolerance:.0%}")
+    for (kind, dist, batch_size, concurrency), metric, old, new, change in regressions:
+        clients = f" x{concurrency}" if concurrency else ""
+        print(f"  REGRESSION {kind:<9} {dist:<8} batch {batch_size:<4}{clients:<5} {metric:<13} {old:>10} -> {new:>10} ({change:+.1%})")
+    if not regressions:
+        print("  no regressions")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serving-path benchmarks for inference.py")
+    parser.add_argument('--texts', type=int, default=2048, help="Texts per length distribution")
+    parser.add_argument('--batch-sizes', default='1,8,32,128,512')
+    parser.add_argument('--buckets', default='16,32,64,100')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--parity-atol', type=float, default=1e-4,
+                        help="Largest probability difference bucketing may introduce before the run fails")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--suite', action='store_true', help="Run the benchmark matrix and write --output")
+    parser.add_argument('--kinds', default='stages,inprocess,http', help="Any of stages, inprocess, http")
+    parser.add_argument('--distributions', default=','.join(DISTRIBUTIONS))
+    parser.add_argument('--concurrency', default='1,8,32', help="Client concurrency levels")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per cell")
+    parser.add_argument('--max-texts', type=int, default=20000, help="Caps requests x batch size per cell")
+    parser.add_argument('--url', default=None, help="Benchmark a running server instead of starting gunicorn")
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--workers', type=int, default=None, help="Overrides gunicorn.conf.py")
+    parser.add_argument('--threads', type=int, default=None, help="Overrides gunicorn.conf.py")
+    parser.add_argument('--serving-compare', action='store_true',
+                        help="Old gunicorn command line vs gunicorn.conf.py: throughput and memory per worker")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', default=None, metavar='BASELINE_JSON',
+                        help="Flag regressions of --output (after --suite, the new run) against this file")
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args()
+
+    if inference.load_error:
+        raise SystemExit(inference.load_error)
+
+    if args.suite or args.serving_compare:
+        pools = load_text_pools(args.texts, args.seed)
+        results = run_suite(args, pools) if args.suite else []
+        if args.serving_compare:
+            results += compare_serving(args, pools)
+        run = {'meta': run_metadata(args), 'results': results}
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=1)
+        print(f"\nResults written to {args.output}")
+    elif args.compare:
+        with open(args.output) as f:
+            run = json.load(f)
+    else:
+        texts = load_sample_texts(args.texts, args.seed)
+        batch_sizes = [int(b) for b in args.batch_sizes.split(',')]
+        agreement, max_diff = benchmark_bucketing(texts, batch_sizes, inference.parse_buckets(args.buckets, inference.max_len),
+                                                  args.repeats)
+        if agreement < 1.0 or max_diff > args.parity_atol:
+            print(f"FAIL: bucketing changes predictions (label agreement {agreement:.4%}, "
+                  f"max probability difference {max_diff:.2e} > {args.parity_atol:.0e}); keep LENGTH_BUCKETS empty")
+            sys.exit(1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare_results(baseline, run, args.tolerance):
+            sys.exit(1)
@@ -0,0 +1,105 @@
+import codecs
+import csv
+import json
+
+# Streaming bulk scoring for /invocations: the request body (NDJSON or CSV) is read a block at
+# a time, scored in fixed-size chunks and answered as NDJSON while the rest is still being
+# read, so memory is bounded by one chunk and the first results arrive after the first chunk.
+NDJSON_TYPES = ('application/x-ndjson', 'application/jsonlines', 'application/x-jsonlines', 'application/json-lines')
+CSV_TYPES = ('text/csv',)
+READ_BLOCK_BYTES = 64 * 1024
+
+
+def is_bulk_content_type(content_type):
+    return (content_type or '').split(';')[0].strip().lower() in NDJSON_TYPES + CSV_TYPES
+
+
+def iter_lines(stream, block_size=READ_BLOCK_BYTES):
+    """Decoded lines (keeping their newline) from a binary stream, reading `block_size` bytes at a time."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    pending = ''
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        pending += decoder.decode(block)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def ndjson_records(lines, text_field='text'):
+    """
+    (id, text, error) per non-empty line. A line is a JSON object with a `text_field`
+    (and optionally an "id") or a bare JSON string; ids default to the 0-based line number.
+    """
+    for line_no, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            doc = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(doc, str):
+            yield line_no, doc, None
+        elif isinstance(doc, dict) and isinstance(doc.get(text_field), str):
+            yield doc.get('id', line_no), doc[text_field], None
+        else:
+            yield doc.get('id', line_no) if isinstance(doc, dict) else line_no, None, f'Missing "{text_field}" string'
+
+
+def csv_records(lines, text_field='text'):
+    """
+    (id, text, None) per CSV row; an "id" column is passed through. The header is read
+    right away, so a missing `text_field` column raises ValueError before any scoring.
+    """
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None or text_field not in reader.fieldnames:
+        raise ValueError(f'CSV header must contain a "{text_field}" column (got {reader.fieldnames})')
+    return ((row.get('id', row_no), row[text_field] or '', None) for row_no, row in enumerate(reader))
+
+
+def read_records(stream, content_type, text_field='text'):
+    """Record iterator for the body; raises ValueError for a CSV body without the text column."""
+    lines = iter_lines(stream)
+    if content_type.split(';')[0].strip().lower() in CSV_TYPES:
+        return csv_records(lines, text_field)
+    return ndjson_records(lines, text_field)
+
+
+def chunked(records, chunk_size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def score_stream(records, predict_fn, chunk_size=256):
+    """
+    NDJSON result lines, one per record in input order, produced chunk by chunk.
+    `predict_fn` takes a list of raw texts and returns one label per text. A failure
+    ends the stream with an {"error": ...} line, since the status code is already sent.
+    """
+    done = 0
+    try:
+        for chunk in chunked(records, chunk_size):
+            texts = [text for _, text, error in chunk if error is None]
+            labels = iter(predict_fn(texts) if texts else [])
+            lines = []
+            for record_id, _, error in chunk:
+                result = {"id": record_id, "error": error} if error else {"id": record_id, "prediction": next(labels)}
+                lines.append(json.dumps(result) + '\n')
+            done += len(chunk)
+            yield ''.join(lines)
+    except Exception as e:
+        print(f"Bulk scoring failed after {done} records: {e}", flush=True)
+        yield json.dumps({"error": f"Bulk scoring failed after {done} records: {str(e)}"}) + '\n'
@@ -0,0 +1,109 @@
+import pickle
+import threading
+import time
+import numpy as np
+
+# Two-tier serving: the TF-IDF + LogisticRegression baseline from Train.py answers every text
+# whose top-class probability reaches the threshold; only the rest are escalated to the BiLSTM.
+FAST_MODEL_PATH = 'tfidf_lr.pickle'
+
+
+def save_fast_model(vectorizer, classifier, classes, out_path=FAST_MODEL_PATH, holdout=None, n_rows=None):
+    """
+    Pickles the fitted vectorizer + classifier with the label names of its integer classes.
+    `holdout` (master dataset row indices it was not trained on, out of `n_rows`) lets
+    Metrics.py evaluate the cascade on rows neither tier has seen.
+    """
+    bundle = {'vectorizer': vectorizer, 'classifier': classifier, 'classes': np.asarray(classes)}
+    if holdout is not None:
+        bundle.update(holdout=np.sort(np.asarray(holdout, dtype=np.int64)), n_rows=n_rows)
+    with open(out_path, 'wb') as handle:
+        pickle.dump(bundle, handle)
+
+
+class FastTier:
+    """Sparse TF-IDF matmul + softmax; microseconds per text, no TensorFlow."""
+
+    def __init__(self, vectorizer, classifier, classes, holdout=None, n_rows=None):
+        self.vectorizer = vectorizer
+        self.classifier = classifier
+        self.classes = np.asarray(classes)
+        self.holdout = holdout
+        self.n_rows = n_rows
+        # The classifier only knows the labels present in its training split
+        self._columns = np.asarray(classifier.classes_, dtype=np.int64)
+
+    @classmethod
+    def load(cls, path=FAST_MODEL_PATH):
+        with open(path, 'rb') as handle:
+            bundle = pickle.load(handle)
+        return cls(bundle['vectorizer'], bundle['classifier'], bundle['classes'], bundle.get('holdout'), bundle.get('n_rows'))
+
+    def predict_proba(self, cleaned_texts):
+        """(n, len(classes)) probabilities in label-encoder order."""
+        out = self.classifier.predict_proba(self.vectorizer.transform(cleaned_texts))
+        probs = np.zeros((out.shape[0], len(self.classes)), dtype=np.float64)
+        probs[:, self._columns] = out
+        return probs
+
+
+def confident_rows(probs, threshold):
+    """Mask of rows the fast tier may answer on its own."""
+    return probs.max(axis=1) >= threshold
+
+
+class CascadeStats:
+    """Thread-safe counts of texts served by each tier."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.texts = 0
+            self.fast = 0
+            self.escalated = 0
+            self.fast_ms_total = 0.0
+            self.escalated_ms_total = 0.0
+
+    def record(self, n_fast, n_escalated, fast_ms, escalated_ms):
+        with self._lock:
+            self.texts += n_fast + n_escalated
+            self.fast += n_fast
+            self.escalated += n_escalated
+            self.fast_ms_total += fast_ms
+            self.escalated_ms_total += escalated_ms
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "texts": self.texts,
+                "fast_tier": self.fast,
+                "escalated": self.escalated,
+                "fast_tier_fraction": self.fast / self.texts if self.texts else None,
+                "escalated_fraction": self.escalated / self.texts if self.texts else None,
+                "fast_tier_ms_total": round(self.fast_ms_total, 3),
+                "escalated_ms_total": round(self.escalated_ms_total, 3),
+            }
+
+
+def cascade_predict(cleaned_texts, fast_tier, threshold, slow_predict, stats=None):
+    """
+    Labels for `cleaned_texts`: fast-tier labels where it is confident, `slow_predict`
+    (list of texts -> list of labels) for the rest, in the original order.
+    """
+    start = time.perf_counter()
+    probs = fast_tier.predict_proba(cleaned_texts)
+    results = fast_tier.classes[probs.argmax(axis=1)].tolist()
+    escalate = np.flatnonzero(~confident_rows(probs, threshold))
+    fast_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    if len(escalate):
+        slow = slow_predict([cleaned_texts[i] for i in escalate])
+        for i, label in zip(escalate, slow):
+            results[i] = label
+    if stats is not None:
+        stats.record(len(results) - len(escalate), len(escalate), fast_ms, (time.perf_counter() - start) * 1000)
+    return results
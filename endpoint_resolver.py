@@ -0,0 +1,149 @@
+import threading
+import time
+from fork_safe import ForkSafeStarter
+
+
+def find_latest_endpoint(sm_client, name_contains='sentiment-analysis'):
+    """Newest InService endpoint whose name contains `name_contains`, or None. Raises on API errors."""
+    response = sm_client.list_endpoints(
+        SortBy='CreationTime',
+        SortOrder='Descending',
+        NameContains=name_contains
+    )
+    for ep in response.get('Endpoints', []):
+        if ep['EndpointStatus'] == 'InService':
+            return ep['EndpointName']
+    return None
+
+
+class EndpointResolver:
+    """
+    Caches the endpoint found by find_latest_endpoint() so requests don't each make a
+    list_endpoints call.
+
+    A background thread refreshes the entry every `ttl_seconds`. If a refresh fails
+    (throttling, network), the last known-good endpoint keeps being served. invalidate()
+    (call it when an upstream invocation fails) makes the next resolve() look the
+    endpoint up again right away. Concurrent callers share that single lookup.
+    While refreshes keep failing they are retried at most every `retry_seconds`.
+    `sm_client` only needs a list_endpoints method, so a stub works in tests.
+    """
+
+    def __init__(self, sm_client, name_contains='sentiment-analysis', ttl_seconds=30.0, retry_seconds=5.0,
+                 background=True):
+        self.sm_client = sm_client
+        self.name_contains = name_contains
+        self.ttl = ttl_seconds
+        self.retry = min(retry_seconds, ttl_seconds)
+        self.background = background
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._starter = ForkSafeStarter(self._start_refresher)
+        self._endpoint = None
+        self._fetched_at = None
+        self._attempted_at = None
+        self._completed_at = None
+        self._invalidated_at = None
+        self._valid = False
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.resolutions = 0
+            self.hits = 0
+            self.refreshes = 0
+            self.refresh_failures = 0
+            self.invalidations = 0
+            self.resolve_ms_total = 0.0
+            self.resolve_ms_max = 0.0
+            self.last_refresh_ms = None
+            self.last_error = None
+
+    def _start_refresher(self):
+        self._wake = threading.Event()
+        threading.Thread(target=self._run, name="endpoint-resolver", daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.ttl)
+            self._wake.clear()
+            self.refresh()
+
+    def refresh(self, requested_at=None):
+        """Looks the endpoint up now; returns False (keeping the old entry) if the lookup fails."""
+        with self._refresh_lock:
+            # Another caller finished a lookup while we waited for the lock (one that started
+            # after the last invalidate(), so it cannot hand back the endpoint that just failed)
+            if requested_at is not None and self._completed_at is not None and self._completed_at >= requested_at \
+                    and (self._invalidated_at is None or self._attempted_at > self._invalidated_at):
+                return self._valid
+            start = self._attempted_at = time.monotonic()
+            try:
+                endpoint = find_latest_endpoint(self.sm_client, self.name_contains)
+            except Exception as e:
+                with self._lock:
+                    self._completed_at = time.monotonic()
+                    self.refresh_failures += 1
+                    self.last_error = str(e)
+                print(f"Error fetching latest endpoint (serving last known: {self._endpoint}): {e}")
+                return False
+            with self._lock:
+                self._endpoint = endpoint
+                self._fetched_at = self._completed_at = time.monotonic()
+                self._valid = True
+                self.refreshes += 1
+                self.last_refresh_ms = (self._fetched_at - start) * 1000
+            return True
+
+    def resolve(self):
+        """Current endpoint name (or None if there is no InService endpoint)."""
+        start = time.monotonic()
+        if self.background:
+            self._starter.ensure_started()
+        with self._lock:
+            valid, endpoint = self._valid, self._endpoint
+            stale = valid and start - self._fetched_at > self.ttl
+            retry_due = (self._attempted_at is None or start - self._attempted_at > self.retry
+                         or (self._invalidated_at is not None and self._invalidated_at > self._attempted_at))
+
+        # Without a valid entry, a lookup already in flight is waited for rather than skipped
+        if (stale or not valid) and (retry_due or (not valid and self._refresh_lock.locked())):
+            if valid and self.background:
+                # The refresher is behind: serve what we have and nudge it
+                self._wake.set()
+            else:
+                self.refresh(requested_at=start)
+                with self._lock:
+                    endpoint = self._endpoint
+
+        elapsed_ms = (time.monotonic() - start) * 1000
+        with self._lock:
+            self.resolutions += 1
+            self.hits += valid and not stale
+            self.resolve_ms_total += elapsed_ms
+            self.resolve_ms_max = max(self.resolve_ms_max, elapsed_ms)
+        return endpoint
+
+    def invalidate(self):
+        """Forces the next resolve() to look the endpoint up again (the old name is kept as a fallback)."""
+        with self._lock:
+            self._valid = False
+            self._invalidated_at = time.monotonic()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "endpoint": self._endpoint,
+                "age_seconds": round(time.monotonic() - self._fetched_at, 3) if self._fetched_at else None,
+                "resolutions": self.resolutions,
+                "cache_hits": self.hits,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "invalidations": self.invalidations,
+                "avg_resolve_ms": round(self.resolve_ms_total / self.resolutions, 4) if self.resolutions else None,
+                "max_resolve_ms": round(self.resolve_ms_max, 3),
+                "last_refresh_ms": round(self.last_refresh_ms, 3) if self.last_refresh_ms is not None else None,
+                "last_error": self.last_error,
+            }
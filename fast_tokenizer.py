@@ -0,0 +1,131 @@
+import json
+import os
+import pickle
+import sys
+import numpy as np
+
+VOCAB_FORMAT_VERSION = 1
+
+
+def export_tokenizer(tokenizer, out_path, num_words=None):
+    """
+    Writes the part of a fitted Keras Tokenizer that texts_to_sequences actually uses:
+    the top `num_words` entries of word_index plus the text-splitting settings.
+    Word counts and document counts are dropped.
+    """
+    num_words = num_words or tokenizer.num_words or (len(tokenizer.word_index) + 1)
+
+    # Sorted string table: words[i] is the word with index i + 1
+    words = [None] * (num_words - 1)
+    for word, i in tokenizer.word_index.items():
+        if i < num_words:
+            words[i - 1] = word
+
+    oov_index = tokenizer.word_index.get(tokenizer.oov_token) if tokenizer.oov_token else None
+    vocab = {
+        "format": VOCAB_FORMAT_VERSION,
+        "num_words": num_words,
+        "filters": tokenizer.filters,
+        "lower": tokenizer.lower,
+        "split": tokenizer.split,
+        "oov_index": oov_index,
+        "words": words,
+    }
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(vocab, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"Exported {sum(w is not None for w in words)} words to {out_path}")
+
+
+class FastTokenizer:
+    """
+    Drop-in replacement for Keras Tokenizer.texts_to_sequences + pad_sequences
+    built from an exported vocabulary file.
+    """
+
+    def __init__(self, words, filters, lower=True, split=' ', oov_index=None, num_words=None, ids=None):
+        # Vocabularies rewritten by numpy_runtime.prune_vocabulary carry explicit ids
+        if ids is not None:
+            self.word_index = dict(zip(words, ids))
+        else:
+            self.word_index = {w: i for i, w in enumerate(words, 1) if w is not None}
+        self.num_words = num_words or len(words) + 1
+        self.lower = lower
+        self.split = split
+        self.oov_index = oov_index
+        self._table = str.maketrans({c: split for c in filters})
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            vocab = json.load(f)
+        return cls(vocab['words'], vocab['filters'], vocab['lower'], vocab['split'],
+                   vocab['oov_index'], vocab['num_words'], vocab.get('ids'))
+
+    def _encode(self, text):
+        # Same splitting as keras text_to_word_sequence
+        if self.lower:
+            text = text.lower()
+        get = self.word_index.get
+        oov = self.oov_index
+        ids = (get(w, oov) for w in text.translate(self._table).split(self.split) if w)
+        return [i for i in ids if i is not None]
+
+    def texts_to_sequences(self, texts):
+        return [self._encode(t) for t in texts]
+
+    def texts_to_padded(self, texts, max_len, return_lengths=False):
+        """
+        Tokenizes straight into an int32 (n, max_len) array with pad_sequences' defaults:
+        zeros at the front, and the last max_len tokens kept when a text is longer.
+        """
+        padded = np.zeros((len(texts), max_len), dtype=np.int32)
+        lengths = np.zeros(len(texts), dtype=np.int32)
+        for row, text in enumerate(texts):
+            seq = self._encode(text)[-max_len:]
+            n = len(seq)
+            if n:
+                padded[row, max_len - n:] = seq
+                lengths[row] = n
+        if return_lengths:
+            return padded, lengths
+        return padded
+
+
+def load_tokenizer(vocab_path='vocab.json', pickle_path='tokenizer.pickle'):
+    """The exported vocabulary when it exists, otherwise the pickled Keras Tokenizer."""
+    if os.path.exists(vocab_path):
+        return FastTokenizer.load(vocab_path)
+    with open(pickle_path, 'rb') as handle:
+        return pickle.load(handle)
+
+
+def texts_to_padded(tokenizer, texts, max_len):
+    """Pre-padded int32 (n, max_len) token ids from either kind of tokenizer."""
+    if isinstance(tokenizer, FastTokenizer):
+        return tokenizer.texts_to_padded(texts, max_len)
+    from tensorflow.keras.preprocessing.sequence import pad_sequences #type:ignore
+    return pad_sequences(tokenizer.texts_to_sequences(texts), maxlen=max_len)
+
+
+def verify(tokenizer, fast_tokenizer, texts, max_len=100):
+    """Compares FastTokenizer output with the Keras tokenizer on `texts`."""
+    from tensorflow.keras.preprocessing.sequence import pad_sequences #type:ignore
+    expected = pad_sequences(tokenizer.texts_to_sequences(texts), maxlen=max_len)
+    actual = fast_tokenizer.texts_to_padded(texts, max_len)
+    mismatches = int((expected != actual).any(axis=1).sum())
+    print(f"Verified {len(texts)} texts: {mismatches} mismatching rows")
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    # Usage: python fast_tokenizer.py [tokenizer.pickle] [vocab.json]
+    src = sys.argv[1] if len(sys.argv) > 1 else 'tokenizer.pickle'
+    dst = sys.argv[2] if len(sys.argv) > 2 else 'vocab.json'
+
+    with open(src, 'rb') as handle:
+        keras_tokenizer = pickle.load(handle)
+    export_tokenizer(keras_tokenizer, dst, num_words=keras_tokenizer.num_words or 20000)
+
+    sample = ["this is so good i love it", "worst video ever", "first", "", "hello_world 2024 ok"]
+    if not verify(keras_tokenizer, FastTokenizer.load(dst), sample):
+        sys.exit(1)
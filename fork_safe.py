@@ -0,0 +1,32 @@
+import os
+import threading
+
+
+class ForkSafeStarter:
+    """
+    Runs `start` once per process. Threads do not survive fork(), so a background thread
+    started in the gunicorn master (or before any other fork) is missing in the children:
+    objects call ensure_started() on use and every process starts its own threads.
+
+    `start` sets up the per-process state (queues, locks, event loops) and starts the
+    threads. If it raises, the next ensure_started() tries again.
+    """
+
+    def __init__(self, start):
+        self._start = start
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._start()
+            # Set last: other threads skip the lock as soon as they see it
+            self._pid = os.getpid()
+
+    def started(self):
+        """True once `start` has run in this process."""
+        return self._pid == os.getpid()
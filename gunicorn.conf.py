@@ -0,0 +1,64 @@
+import gc
+import math
+import os
+
+# Production gunicorn settings for inference.py (gunicorn -c gunicorn.conf.py inference:app),
+# derived from the CPUs this container may actually use:
+#   keras runtime: a single worker holds the only TensorFlow model and serves requests on
+#     gthread threads; the micro-batcher turns concurrent requests into one predict call and
+#     TensorFlow's own thread pools use every core. TensorFlow is not fork-safe once it has
+#     initialised, so the app is not preloaded.
+#   numpy runtime: the model, vocabulary and fast tier are loaded and warmed once in the master
+#     (preload_app) and shared copy-on-write with one worker per CPU, each with single-threaded BLAS.
+# GUNICORN_WORKERS / GUNICORN_THREADS / GUNICORN_PRELOAD and the *_NUM_THREADS variables override.
+
+def available_cpus():
+    """CPUs in our affinity mask, capped by the cgroup (docker --cpus) quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+CPUS = available_cpus()
+RUNTIME = os.environ.get('INFERENCE_RUNTIME') or ('keras' if os.environ.get('MODEL_VARIANT', 'fp32') == 'fp32' else 'numpy')
+
+if RUNTIME == 'numpy':
+    workers = int(os.environ.get('GUNICORN_WORKERS', CPUS))
+    threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+    preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+    intra_op = inter_op = 1
+else:
+    workers = int(os.environ.get('GUNICORN_WORKERS', '1'))
+    threads = int(os.environ.get('GUNICORN_THREADS', max(8, 2 * CPUS)))
+    preload_app = os.environ.get('GUNICORN_PRELOAD', '0') == '1'
+    intra_op = max(1, CPUS // workers)
+    inter_op = min(2, intra_op)
+
+# Read by TensorFlow / NumPy when their thread pools start, which happens after this file runs
+# (in the master with preload_app, otherwise in each worker)
+for var, value in (('TF_NUM_INTRAOP_THREADS', intra_op), ('TF_NUM_INTEROP_THREADS', inter_op),
+                   ('OMP_NUM_THREADS', intra_op), ('OPENBLAS_NUM_THREADS', intra_op), ('MKL_NUM_THREADS', intra_op)):
+    os.environ.setdefault(var, str(value))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+worker_class = 'gthread'
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    server.log.info(f"{RUNTIME} runtime on {CPUS} CPUs: {workers} worker(s) x {threads} threads, preload={preload_app}, "
+                    f"TF intra/inter-op {os.environ['TF_NUM_INTRAOP_THREADS']}/{os.environ['TF_NUM_INTEROP_THREADS']}")
+    if preload_app:
+        # Everything loaded so far lives as long as the master; moving it out of the GC's reach keeps
+        # collections in the workers from writing to (and so copying) the shared pages
+        gc.freeze()
@@ -1,30 +1,120 @@
+import hmac
 import json
 import flask
-import pandas as pd
-import tensorflow as tf
-import mlflow.keras
 import os
 import pickle
+import threading
+import time
 import numpy as np
-from tensorflow.keras.preprocessing.sequence import pad_sequences
-from DataSetup import clean_text
+from DataSetup import clean_texts
+from fork_safe import ForkSafeStarter
+from micro_batcher import BatchStats, MicroBatcher
+from fast_tokenizer import FastTokenizer, load_tokenizer, texts_to_padded
+from prediction_cache import PredictionCache, SharedPredictionCache, model_version_hash
+from numpy_runtime import NumpyModel
+from cascade import FastTier, CascadeStats, cascade_predict
+from bulk_scoring import is_bulk_content_type, read_records, score_stream
 
 app = flask.Flask(__name__)
 
-# Load Model and Artifacts Global Variables
+# Micro-batching: concurrent requests are coalesced into one model.predict call
+MICRO_BATCHING = os.environ.get('MICRO_BATCHING', '1') == '1'
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '64'))
+MAX_BATCH_WAIT_MS = float(os.environ.get('MAX_BATCH_WAIT_MS', '5'))
+
+# Model variant promoted by QuantizeModel.py: 'fp32', 'int8', 'pruned' or 'pruned_int8'.
+# Variants only exist as NumPy bundles.
+MODEL_VARIANT = os.environ.get('MODEL_VARIANT', 'fp32')
+_variant_suffix = '' if MODEL_VARIANT == 'fp32' else f'_{MODEL_VARIANT}'
+
+# 'keras' loads the MLflow model with TensorFlow; 'numpy' runs the exported weight bundle
+# (see numpy_runtime.py) and never imports tensorflow or mlflow.
+INFERENCE_RUNTIME = os.environ.get('INFERENCE_RUNTIME', 'keras' if MODEL_VARIANT == 'fp32' else 'numpy')
+NUMPY_MODEL_PATH = os.environ.get('NUMPY_MODEL_PATH', f'model_numpy{_variant_suffix}.npz')
+
+# Length bucketing, e.g. "16,32,64,100": each input runs at the smallest bucket that fits it
+# instead of always at max_len. Empty disables it (fixed padding). The BiLSTM has no masking,
+# so dropping leading pad steps changes its outputs (the backward LSTM runs through fewer
+# pad steps): bucketing is approximate. Check a model with `python benchmark_inference.py`
+# (non-zero exit when labels or probabilities differ) before enabling it.
+LENGTH_BUCKETS = os.environ.get('LENGTH_BUCKETS', '')
+
+# Compact vocabulary exported by fast_tokenizer.py; tokenizer.pickle is the fallback
+VOCAB_PATH = os.environ.get('VOCAB_PATH', f'vocab{_variant_suffix}.json' if MODEL_VARIANT.startswith('pruned') else 'vocab.json')
+
+# Prediction cache: 'memory' (per worker), 'shared' (all workers on the host) or 'off'
+PREDICTION_CACHE = os.environ.get('PREDICTION_CACHE', 'memory')
+PREDICTION_CACHE_MB = float(os.environ.get('PREDICTION_CACHE_MB', '64'))
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', '3600'))
+PREDICTION_CACHE_PATH = os.environ.get('PREDICTION_CACHE_PATH', '/dev/shm/sentiment_prediction_cache.sqlite')
+
+# Cascade: the TF-IDF + LogisticRegression tier from Train.py answers texts whose top-class
+# probability is >= CASCADE_THRESHOLD (e.g. 0.9) and escalates the rest to the BiLSTM.
+# Empty disables it (every text goes to the BiLSTM).
+CASCADE_THRESHOLD = os.environ.get('CASCADE_THRESHOLD', '')
+FAST_MODEL_PATH = os.environ.get('FAST_MODEL_PATH', 'tfidf_lr.pickle')
+
+# Bulk scoring: NDJSON (application/x-ndjson, application/jsonlines) or CSV (text/csv) bodies
+# on /invocations are scored BULK_CHUNK_SIZE texts at a time and streamed back as NDJSON
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', '256'))
+
+# Run every batch shape once at startup (in the gunicorn master when preloading); /ping
+# reports unhealthy until it has finished
+WARMUP = os.environ.get('WARMUP', '1') == '1'
+
+# Hot model swap. A candidate directory holds the same files the image ships with (the MLflow
+# model as model/ or, for the numpy runtime, the .npz bundle, plus tokenizer.pickle,
+# label_encoder.pickle and optionally vocab.json / tfidf_lr.pickle / golden_set.jsonl). It is
+# loaded next to the serving model, warmed up and checked against the golden set before it
+# replaces it; requests already running finish on the model they started with.
+#  - file watch: copy the files to MODEL_WATCH_DIR/<name>/, then write <name> to
+#    MODEL_WATCH_DIR/current. Every worker process swaps itself.
+#  - admin endpoint (only with ADMIN_TOKEN set): POST /admin/reload {"model_dir": ...}
+#    swaps the worker that receives it.
+MODEL_WATCH_DIR = os.environ.get('MODEL_WATCH_DIR', '')
+MODEL_WATCH_SECONDS = float(os.environ.get('MODEL_WATCH_SECONDS', '10'))
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+# JSON lines of {"text": ..., "label": ...}; without one the candidate only has to give finite
+# probabilities over its own classes for the canned warm-up texts
+GOLDEN_SET_PATH = os.environ.get('GOLDEN_SET_PATH', 'golden_set.jsonl')
+SWAP_MIN_AGREEMENT = float(os.environ.get('SWAP_MIN_AGREEMENT', '0.95'))
+
+CANNED_TEXTS = [
+    "I can't believe how good this video is",
+    "this is the worst thing I have seen all week",
+    "wow, did not expect that ending at all",
+    "I'm honestly scared of what comes next",
+    "this made me so sad, rest in peace",
+    "ugh that is disgusting, why would you eat that",
+    "meh, it was fine I guess",
+    "thank you so much for making this, it made my day",
+]
+
+# Load Model and Artifacts Global Variables. `active` is the ServingModel answering requests;
+# the other names mirror it for scripts that import this module.
+active = None
 model = None
 tokenizer = None
-le = None
+classes = None
 max_len = 100
 load_error = None
+model_version = None
+fast_tier = None
+ready = False
 
-def load_artifacts():
-    global model, tokenizer, le, load_error
-    
-    print("STARTING LOADING ARTIFACTS...", flush=True)
-    
-    # 1. Load Model
-    
+def parse_buckets(spec, max_len):
+    """Sorted bucket widths capped at max_len, always ending with max_len."""
+    widths = sorted({min(int(w), max_len) for w in spec.split(',') if w.strip()})
+    if widths and widths[-1] != max_len:
+        widths.append(max_len)
+    return widths
+
+length_buckets = parse_buckets(LENGTH_BUCKETS, max_len)
+if length_buckets:
+    print(f"WARNING: LENGTH_BUCKETS={LENGTH_BUCKETS} trims leading padding; predictions of the unmasked "
+          f"BiLSTM can differ from fixed max_len padding", flush=True)
+
+def find_model_dir():
     possible_paths = ['model', '/app/model', '/opt/ml/model']
     model_path = None
     
@@ -36,42 +126,344 @@ def load_artifacts():
     if not model_path:
         print(f"Error: Could not find model in {possible_paths}", flush=True)
         model_path = 'model'
+    return model_path
+
+def load_keras_model(model_path):
+    import mlflow.keras
 
-    print(f"Loading model from: {model_path}", flush=True)
-    
     # DEBUG: Print versions
     import keras
     import tensorflow
     print(f"Runtime Keras Version: {keras.__version__}", flush=True)
     print(f"Runtime TensorFlow Version: {tensorflow.__version__}", flush=True)
 
+    # Thread pools sized by gunicorn.conf.py; must be set before the first op runs
+    # (a hot swap loads into the already running runtime, where they cannot change any more)
+    try:
+        if os.environ.get('TF_NUM_INTRAOP_THREADS'):
+            tensorflow.config.threading.set_intra_op_parallelism_threads(int(os.environ['TF_NUM_INTRAOP_THREADS']))
+        if os.environ.get('TF_NUM_INTEROP_THREADS'):
+            tensorflow.config.threading.set_inter_op_parallelism_threads(int(os.environ['TF_NUM_INTEROP_THREADS']))
+    except RuntimeError:
+        pass
+
+    # Check if directory exists
+    if not os.path.exists(model_path):
+         raise Exception(f"Model directory {model_path} does not exist.")
+    return mlflow.keras.load_model(model_path)
+
+
+def artifact_paths(root=None):
+    """Model, vocabulary, tokenizer, label-encoder and fast-tier paths: the image's own, or those inside `root`."""
+    if root is None:
+        model_path = NUMPY_MODEL_PATH if INFERENCE_RUNTIME == 'numpy' else find_model_dir()
+        return {'model': model_path, 'vocab': VOCAB_PATH, 'tokenizer': 'tokenizer.pickle',
+                'label_encoder': 'label_encoder.pickle', 'fast': FAST_MODEL_PATH}
+    if INFERENCE_RUNTIME == 'numpy':
+        model_path = os.path.join(root, os.path.basename(NUMPY_MODEL_PATH))
+    else:
+        model_path = os.path.join(root, 'model') if os.path.isdir(os.path.join(root, 'model')) else root
+    return {'model': model_path, 'vocab': os.path.join(root, os.path.basename(VOCAB_PATH)),
+            'tokenizer': os.path.join(root, 'tokenizer.pickle'),
+            'label_encoder': os.path.join(root, 'label_encoder.pickle'),
+            'fast': os.path.join(root, os.path.basename(FAST_MODEL_PATH))}
+
+class ServingModel:
+    """
+    Everything one model version serves with. Requests take the active instance once and
+    use it to the end, so a hot swap never mixes the model of one version with the
+    tokenizer, labels or fast tier of another. Each version has its own micro-batcher.
+    """
+
+    def __init__(self, model, tokenizer, classes, fast_tier, version, source):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.classes = classes
+        self.fast_tier = fast_tier
+        self.version = version
+        self.source = source
+        self.loaded_at = time.time()
+        self.batcher = MicroBatcher(lambda texts: predict_labels(texts, self), MAX_BATCH_SIZE, MAX_BATCH_WAIT_MS,
+                                    batch_stats) if MICRO_BATCHING else None
+
+def load_serving_model(root=None):
+    """Loads the artifacts in `root` (default: the image's own); raises if the model or a pickle fails to load."""
+    paths = artifact_paths(root)
+    print(f"Loading {INFERENCE_RUNTIME} model from: {paths['model']}", flush=True)
+
+    # 1. Load Model
+    labels = None
+    if INFERENCE_RUNTIME != 'numpy' and MODEL_VARIANT != 'fp32':
+        raise Exception(f"MODEL_VARIANT={MODEL_VARIANT} requires INFERENCE_RUNTIME=numpy")
     try:
-        # Check if directory exists
-        if not os.path.exists(model_path):
-             raise Exception(f"Model directory {model_path} does not exist.")
-             
-        model = mlflow.keras.load_model(model_path)
-        print("Model loaded successfully!", flush=True)
+        if INFERENCE_RUNTIME == 'numpy':
+            loaded_model = NumpyModel.load(paths['model'])
+            labels = loaded_model.classes
+        else:
+            loaded_model = load_keras_model(paths['model'])
     except Exception as e:
-        load_error = f"Model Load Error: {str(e)}"
-        print(load_error, flush=True)
+        raise Exception(f"Model Load Error: {str(e)}")
+    print("Model loaded successfully!", flush=True)
 
     # 2. Load Tokenizer & Encoder
     try:
-        with open('tokenizer.pickle', 'rb') as handle:
-            tokenizer = pickle.load(handle)
-        with open('label_encoder.pickle', 'rb') as handle:
-            le = pickle.load(handle)
-        print("Pickles loaded successfully!", flush=True)
+        loaded_tokenizer = load_tokenizer(paths['vocab'], paths['tokenizer'])
+        if isinstance(loaded_tokenizer, FastTokenizer):
+            print(f"Vocabulary loaded from {paths['vocab']}", flush=True)
+        if labels is None:
+            with open(paths['label_encoder'], 'rb') as handle:
+                labels = pickle.load(handle).classes_
     except Exception as e:
-        if not load_error:
-            load_error = f"Pickle Load Error: {str(e)}"
-        print(f"Pickle Load Error: {str(e)}", flush=True)
+        raise Exception(f"Pickle Load Error: {str(e)}")
+    print("Pickles loaded successfully!", flush=True)
+
+    # 3. Fast tier (optional: without it every text goes to the BiLSTM)
+    loaded_fast_tier = None
+    if CASCADE_THRESHOLD:
+        try:
+            loaded_fast_tier = FastTier.load(paths['fast'])
+            print(f"Cascade enabled: {paths['fast']} answers texts with confidence >= {CASCADE_THRESHOLD}", flush=True)
+        except Exception as e:
+            print(f"Fast tier Load Error (cascade disabled): {str(e)}", flush=True)
+
+    # 4. Version used to key cached predictions and reported with every response
+    version_paths = [paths['model'], paths['vocab'], paths['tokenizer'], paths['label_encoder']]
+    version = model_version_hash(version_paths + [paths['fast']] if loaded_fast_tier else version_paths)
+    if loaded_fast_tier:
+        version += f"-c{CASCADE_THRESHOLD}"
+    print(f"Model version: {version} (variant: {MODEL_VARIANT})", flush=True)
+    return ServingModel(loaded_model, loaded_tokenizer, labels, loaded_fast_tier, version, root)
+
+def activate(serving):
+    """Makes `serving` answer new requests (a single reference assignment, so it is atomic)."""
+    global active, model, tokenizer, classes, fast_tier, model_version
+    active = serving
+    model, tokenizer, classes, fast_tier, model_version = (serving.model, serving.tokenizer, serving.classes,
+                                                           serving.fast_tier, serving.version)
+
+def watched_model_dir():
+    """MODEL_WATCH_DIR/<name> named by MODEL_WATCH_DIR/current, if there is one."""
+    try:
+        with open(os.path.join(MODEL_WATCH_DIR, 'current')) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(MODEL_WATCH_DIR, name) if name else None
+
+def load_artifacts():
+    global load_error
+
+    print("STARTING LOADING ARTIFACTS...", flush=True)
+    try:
+        # A model deployed through the watch directory outlives restarts
+        activate(load_serving_model(watched_model_dir() if MODEL_WATCH_DIR else None))
+    except Exception as e:
+        load_error = str(e)
+        print(load_error, flush=True)
+
+batch_stats = BatchStats()
 
 load_artifacts()
 
+def tokenize(cleaned_texts, serving=None):
+    """Cleaned texts -> pre-padded int32 (n, max_len) token ids."""
+    serving = serving or active
+    if not serving or not serving.tokenizer:
+         raise Exception("Tokenizer not loaded")
+
+    return texts_to_padded(serving.tokenizer, cleaned_texts, max_len)
+
+def forward(padded, buckets=None, serving=None):
+    """
+    Class probabilities for a pre-padded batch. With buckets, rows are grouped by
+    token count and each group is cut down to its bucket width, keeping the
+    pre-padding; results come back in the original row order.
+    """
+    predict = (serving or active).model.predict
+    buckets = length_buckets if buckets is None else buckets
+    if not buckets or len(padded) == 0:
+        return predict(padded, verbose=0)
+
+    # Token ids start at 1, so the non-zero count is the (truncated) sequence length
+    lengths = np.count_nonzero(padded, axis=1)
+    bucket_ids = np.searchsorted(buckets, lengths)
+    probs = None
+    for b in np.unique(bucket_ids):
+        rows = np.flatnonzero(bucket_ids == b)
+        out = predict(padded[rows, padded.shape[1] - buckets[b]:], verbose=0)
+        if probs is None:
+            probs = np.empty((len(padded), out.shape[1]), dtype=out.dtype)
+        probs[rows] = out
+    return probs
+
+def predict_labels(cleaned_texts, serving=None):
+    """Tokenize, pad and run one forward pass over a list of cleaned texts."""
+    serving = serving or active
+    padded = tokenize(cleaned_texts, serving)
+    print(f"Input shape for prediction: {padded.shape}", flush=True)
+
+    preds = forward(padded, serving=serving)
+    pred_indices = np.argmax(preds, axis=1)
+
+    # Same as LabelEncoder.inverse_transform
+    if serving.classes is not None:
+        return serving.classes[pred_indices].tolist()
+    return pred_indices.tolist()
+
+if PREDICTION_CACHE == 'shared':
+    cache = SharedPredictionCache(PREDICTION_CACHE_PATH, int(PREDICTION_CACHE_MB * 1024 * 1024), PREDICTION_CACHE_TTL)
+elif PREDICTION_CACHE == 'memory':
+    cache = PredictionCache(int(PREDICTION_CACHE_MB * 1024 * 1024), PREDICTION_CACHE_TTL)
+else:
+    cache = None
+
+cascade_stats = CascadeStats()
+
+def warm_up(serving):
+    """One forward pass per bucket width at batch sizes 1 and MAX_BATCH_SIZE, so no request pays for tracing."""
+    start = time.perf_counter()
+    for batch_size in sorted({1, MAX_BATCH_SIZE}):
+        for width in length_buckets or [max_len]:
+            padded = np.zeros((batch_size, max_len), dtype=np.int32)
+            padded[:, max_len - width:] = 1
+            probs = forward(padded, serving=serving)
+            if probs.shape != (batch_size, len(serving.classes)) or not np.isfinite(probs).all():
+                raise Exception(f"Warm-up Error: bad output {probs.shape} for {len(serving.classes)} classes")
+    predict_labels(clean_texts(CANNED_TEXTS), serving)
+    if serving.fast_tier:
+        serving.fast_tier.predict_proba(clean_texts(CANNED_TEXTS))
+    print(f"Warm-up done in {time.perf_counter() - start:.2f}s", flush=True)
+
+if active and WARMUP:
+    try:
+        warm_up(active)
+    except Exception as e:
+        load_error = f"Warm-up Error: {str(e)}"
+        print(load_error, flush=True)
+ready = load_error is None
+
+def golden_agreement(serving, root=None):
+    """
+    Share of the golden set (root/golden_set.jsonl, else GOLDEN_SET_PATH) that `serving`
+    labels as expected. None if there is no golden set.
+    """
+    candidates = [os.path.join(root, os.path.basename(GOLDEN_SET_PATH))] if root else []
+    path = next((p for p in candidates + [GOLDEN_SET_PATH] if os.path.exists(p)), None)
+    if not path:
+        return None
+    with open(path, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    if not rows:
+        return None
+    got = predict_labels(clean_texts([r['text'] for r in rows]), serving)
+    return float(np.mean([str(a) == str(r['label']) for a, r in zip(got, rows)]))
+
+def sanity_check(serving):
+    """
+    Check for a candidate without a golden set: the canned texts must get one row of
+    finite probabilities per text over its own classes (so every label is one of them).
+    A retrained model may disagree with the serving one, so it is not compared with it.
+    """
+    probs = forward(tokenize(clean_texts(CANNED_TEXTS), serving), serving=serving)
+    if probs.shape != (len(CANNED_TEXTS), len(serving.classes)) or not np.isfinite(probs).all():
+        raise Exception(f"Sanity check failed: output {probs.shape} for {len(CANNED_TEXTS)} texts "
+                        f"and {len(serving.classes)} classes")
+
+swap_lock = threading.Lock()
+swap_status = {"state": "idle"}
+
+def swap_model(root):
+    """
+    Loads the model in `root` next to the active one, warms it up, checks it against the
+    golden set (or sanity-checks it without one) and then activates it. Returns the swap
+    status; never raises.
+    """
+    global swap_status, load_error, ready
+    if not swap_lock.acquire(blocking=False):
+        return dict(swap_status, error="another swap is in progress")
+    start = time.perf_counter()
+    status = {"state": "loading", "model_dir": root, "started_at": time.time()}
+    swap_status = status
+    try:
+        candidate = load_serving_model(root)
+        if active and candidate.version == active.version:
+            status.update(state="unchanged", model_version=candidate.version)
+            return status
+        status["state"] = "warming_up"
+        warm_up(candidate)
+        agreement = golden_agreement(candidate, root)
+        if agreement is None:
+            sanity_check(candidate)
+        elif agreement < SWAP_MIN_AGREEMENT:
+            raise Exception(f"Golden set agreement {agreement:.3f} < {SWAP_MIN_AGREEMENT}")
+
+        previous = active
+        activate(candidate)
+        load_error = None
+        ready = True
+        # In-flight requests still hold `previous`; its batcher drains them and exits
+        if previous and previous.batcher:
+            previous.batcher.close()
+        status.update(state="swapped", model_version=candidate.version, golden_agreement=agreement,
+                      previous_version=previous.version if previous else None)
+        print(f"Swapped to model {candidate.version} from {root} in {time.perf_counter() - start:.1f}s", flush=True)
+    except Exception as e:
+        status.update(state="failed", error=str(e))
+        print(f"Model swap from {root} failed (still serving {model_version}): {e}", flush=True)
+    finally:
+        status["seconds"] = round(time.perf_counter() - start, 3)
+        swap_lock.release()
+    return status
+
+def _watch_models():
+    tried = None
+    while True:
+        root = watched_model_dir()
+        # A candidate that failed is not retried until `current` names another directory
+        if root and root != tried and not (active and active.source == root):
+            tried = root
+            swap_model(root)
+        time.sleep(MODEL_WATCH_SECONDS)
+
+def _start_model_watcher():
+    threading.Thread(target=_watch_models, name="model-watcher", daemon=True).start()
+
+model_watcher = ForkSafeStarter(_start_model_watcher)
+
+@app.before_request
+def ensure_model_watcher():
+    if MODEL_WATCH_DIR:
+        model_watcher.ensure_started()
+
+def predict_bilstm(cleaned_texts, serving):
+    if serving.batcher:
+        return serving.batcher.submit(cleaned_texts)
+    return predict_labels(cleaned_texts, serving)
+
+def predict_uncached(cleaned_texts, serving):
+    if serving.fast_tier is None:
+        return predict_bilstm(cleaned_texts, serving)
+    return cascade_predict(cleaned_texts, serving.fast_tier, float(CASCADE_THRESHOLD),
+                           lambda texts: predict_bilstm(texts, serving), cascade_stats)
+
+def predict_cached(cleaned_texts, serving=None):
+    """Serves repeated texts from the cache; only misses reach tokenization and the model."""
+    serving = serving or active
+    if not cache:
+        return predict_uncached(cleaned_texts, serving)
+
+    results = cache.get_many([(serving.version, t) for t in cleaned_texts])
+    misses = list(dict.fromkeys(t for t, r in zip(cleaned_texts, results) if r is None))
+    if misses:
+        fresh = dict(zip(misses, predict_uncached(misses, serving)))
+        cache.put_many([((serving.version, t), label) for t, label in fresh.items()])
+        results = [fresh[t] if r is None else r for t, r in zip(cleaned_texts, results)]
+    return results
+
 @app.route('/ping', methods=['GET'])
 def ping():
+    if load_error or not ready:
+        return flask.Response(response=json.dumps({"error": load_error or "warming up"}), status=503, mimetype='application/json')
     return flask.Response(response='\n', status=200, mimetype='application/json')
 
 @app.route('/invocations', methods=['POST'])
@@ -82,43 +474,33 @@ def transformation():
     if load_error:
          return flask.Response(response=json.dumps({"error": load_error}), status=500, mimetype='application/json')
 
+    # The whole request is answered by the model that is active now, even if a swap completes meanwhile
+    serving = active
+    if is_bulk_content_type(flask.request.content_type):
+        return bulk_transformation(serving)
     if flask.request.content_type == 'application/json':
         data = flask.request.get_json()
         input_text = data.get('text')
     else:
-        return flask.Response(response='This predictor only supports application/json data', status=415, mimetype='text/plain')
+        return flask.Response(response='This predictor only supports application/json, application/x-ndjson and text/csv data',
+                              status=415, mimetype='text/plain')
 
     if input_text is None:
         return flask.Response(response='Missing "text" field in JSON', status=400, mimetype='text/plain')
-    
+    if isinstance(input_text, str):
+        input_text = [input_text]
+    if not isinstance(input_text, list) or not all(isinstance(t, str) for t in input_text):
+        return flask.Response(response='"text" must be a string or a list of strings', status=400, mimetype='text/plain')
+
     try:
-        # Preprocess
-        if isinstance(input_text, str):
-            input_text = [input_text]
-        
         print(f"Processing {len(input_text)} texts...", flush=True)
-        cleaned_texts = [clean_text(t) for t in input_text]
-        
-        # Tokenize
-        if not tokenizer:
-             raise Exception("Tokenizer not loaded")
-             
-        sequences = tokenizer.texts_to_sequences(cleaned_texts)
-        padded = pad_sequences(sequences, maxlen=max_len)
-        print(f"Input shape for prediction: {padded.shape}", flush=True)
+        cleaned_texts = clean_texts(input_text)
         
-        # Predict
-        print("Starting prediction...", flush=True)
-        preds = model.predict(padded)
-        print("Prediction successful!", flush=True)
-        pred_indices = np.argmax(preds, axis=1)
-        
-        if le:
-            results = le.inverse_transform(pred_indices).tolist()
-        else:
-            results = pred_indices.tolist()
+        # Tokenize + Predict (cache misses only, shared with concurrent requests when micro-batching)
+        results = predict_cached(cleaned_texts, serving)
             
-        return flask.Response(response=json.dumps({"predictions": results}), status=200, mimetype='application/json')
+        return flask.Response(response=json.dumps({"predictions": results, "model_version": serving.version}),
+                              status=200, mimetype='application/json', headers={'X-Model-Version': serving.version})
         
     except Exception as e:
         import traceback
@@ -126,5 +508,80 @@ def transformation():
         print(err_msg, flush=True)
         return flask.Response(response=json.dumps({"error": err_msg}), status=500, mimetype='application/json')
 
+def bulk_transformation(serving):
+    """
+    Streams one NDJSON result line per input record ({"id": ..., "prediction": ...}) while
+    the body is still being read; ?text_field= names the text field / CSV column.
+    """
+    text_field = flask.request.args.get('text_field', 'text')
+    try:
+        records = read_records(flask.request.stream, flask.request.content_type, text_field)
+    except ValueError as e:
+        return flask.Response(response=str(e), status=400, mimetype='text/plain')
+
+    def predict(texts):
+        print(f"Processing bulk chunk of {len(texts)} texts...", flush=True)
+        return predict_cached(clean_texts(texts), serving)
+
+    results = score_stream(records, predict, BULK_CHUNK_SIZE)
+    return flask.Response(flask.stream_with_context(results), status=200, mimetype='application/x-ndjson',
+                          headers={'X-Model-Version': serving.version})
+
+def admin_denied():
+    """None if the request carries ADMIN_TOKEN, else the response to send (404 while admin is disabled)."""
+    if not ADMIN_TOKEN:
+        return flask.Response(response='Not Found', status=404, mimetype='text/plain')
+    if not hmac.compare_digest(flask.request.headers.get('X-Admin-Token', '').encode(), ADMIN_TOKEN.encode()):
+        return flask.Response(response='Forbidden', status=403, mimetype='text/plain')
+    return None
+
+def model_status():
+    return {
+        "model_version": active.version if active else None,
+        "model_dir": active.source if active else None,
+        "loaded_at": active.loaded_at if active else None,
+        "swap": swap_status,
+    }
+
+@app.route('/admin/model', methods=['GET'])
+def admin_model():
+    denied = admin_denied()
+    if denied:
+        return denied
+    return flask.Response(response=json.dumps(model_status()), status=200, mimetype='application/json')
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """Starts a hot swap to {"model_dir": ...}; with "wait": true, answers once it is done."""
+    denied = admin_denied()
+    if denied:
+        return denied
+    data = flask.request.get_json(silent=True) or {}
+    root = data.get('model_dir')
+    if not root or not os.path.isdir(root):
+        return flask.Response(response=json.dumps({"error": f"model_dir {root!r} is not a directory"}), status=400,
+                              mimetype='application/json')
+    if swap_lock.locked():
+        return flask.Response(response=json.dumps(dict(model_status(), error="another swap is in progress")),
+                              status=409, mimetype='application/json')
+    if data.get('wait'):
+        status = swap_model(root)
+        code = 200 if status['state'] in ('swapped', 'unchanged') else 422
+        return flask.Response(response=json.dumps(dict(model_status(), swap=status)), status=code, mimetype='application/json')
+    threading.Thread(target=swap_model, args=(root,), name="model-swap", daemon=True).start()
+    return flask.Response(response=json.dumps(model_status()), status=202, mimetype='application/json')
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Batching histograms and cache hit rates for tuning the serving knobs."""
+    body = {
+        "model_version": model_version,
+        "model_swap": swap_status,
+        "micro_batching": batch_stats.snapshot() if MICRO_BATCHING else None,
+        "prediction_cache": cache.snapshot() if cache else None,
+        "cascade": cascade_stats.snapshot() if CASCADE_THRESHOLD else None,
+    }
+    return flask.Response(response=json.dumps(body), status=200, mimetype='application/json')
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8080)
@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from fork_safe import ForkSafeStarter
+
+# Upper bounds (inclusive) of the histogram buckets. The last bucket catches everything above.
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+QUEUE_WAIT_MS_BUCKETS = [0.5, 1, 2, 5, 10, 20, 50, 100, 250]
+
+
+class BatchStats:
+    """Thread-safe counters for batch sizes and queue waits."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.batches = 0
+            self.requests = 0
+            self.texts = 0
+            self.batch_size_hist = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+            self.queue_wait_hist = [0] * (len(QUEUE_WAIT_MS_BUCKETS) + 1)
+            self.forward_ms_total = 0.0
+
+    @staticmethod
+    def _bucket(value, bounds):
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                return i
+        return len(bounds)
+
+    def record_batch(self, n_texts, n_requests, waits_ms, forward_ms):
+        with self._lock:
+            self.batches += 1
+            self.requests += n_requests
+            self.texts += n_texts
+            self.batch_size_hist[self._bucket(n_texts, BATCH_SIZE_BUCKETS)] += 1
+            for w in waits_ms:
+                self.queue_wait_hist[self._bucket(w, QUEUE_WAIT_MS_BUCKETS)] += 1
+            self.forward_ms_total += forward_ms
+
+    def snapshot(self):
+        with self._lock:
+            labels = [f"<={b}" for b in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+            wait_labels = [f"<={b}ms" for b in QUEUE_WAIT_MS_BUCKETS] + [f">{QUEUE_WAIT_MS_BUCKETS[-1]}ms"]
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "texts": self.texts,
+                "avg_batch_size": self.texts / self.batches if self.batches else 0.0,
+                "avg_forward_ms": self.forward_ms_total / self.batches if self.batches else 0.0,
+                "batch_size_hist": dict(zip(labels, self.batch_size_hist)),
+                "queue_wait_hist": dict(zip(wait_labels, self.queue_wait_hist)),
+            }
+
+
+class MicroBatcher:
+    """
+    Collects texts from concurrent requests into one batch and runs a single
+    forward pass for all of them.
+
+    `predict_fn` takes a list of cleaned texts and returns one result per text.
+    A batch is dispatched as soon as it holds `max_batch_size` texts or the
+    oldest queued request has waited `max_wait_ms`. A single request larger
+    than `max_batch_size` is run on its own. Pass `stats` to share one BatchStats
+    between batchers (e.g. across model versions). A caller whose batch has not
+    been predicted after `timeout_s` gets a TimeoutError instead of waiting forever.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=5.0, stats=None, timeout_s=60.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.stats = stats or BatchStats()
+        self.timeout_s = timeout_s
+        self._starter = ForkSafeStarter(self._start_worker)
+        self._cond = None
+        self._pending = None
+        self._worker = None
+        self._closed = False
+
+    def _start_worker(self):
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, texts):
+        """Blocks until the batch containing `texts` has been predicted."""
+        if not texts:
+            return []
+        future = Future()
+        if not self._closed:
+            self._starter.ensure_started()
+            with self._cond:
+                queued = not self._closed
+                if queued:
+                    self._pending.append((list(texts), future, time.perf_counter()))
+                    self._cond.notify()
+            if queued:
+                return future.result(timeout=self.timeout_s)
+        # Closed (e.g. its model was swapped out): the worker thread may already be gone
+        return self.predict_fn(list(texts))
+
+    def close(self):
+        """Lets the worker thread exit once the queued requests are done; later submits run inline."""
+        if not self._starter.started():
+            self._closed = True
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _collect(self):
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+            deadline = self._pending[0][2] + self.max_wait
+            while sum(len(p[0]) for p in self._pending) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = [self._pending.popleft()]
+            size = len(batch[0][0])
+            while self._pending and size + len(self._pending[0][0]) <= self.max_batch_size:
+                item = self._pending.popleft()
+                size += len(item[0])
+                batch.append(item)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            dispatched = time.perf_counter()
+            texts = [t for item in batch for t in item[0]]
+            waits_ms = [(dispatched - item[2]) * 1000 for item in batch]
+
+            try:
+                results = self.predict_fn(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            self.stats.record_batch(len(texts), len(batch), waits_ms, (time.perf_counter() - dispatched) * 1000)
+
+            # Scatter results back to each caller in submission order
+            offset = 0
+            for item_texts, future, _ in batch:
+                future.set_result(results[offset:offset + len(item_texts)])
+                offset += len(item_texts)
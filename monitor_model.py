@@ -1,47 +1,226 @@
-import pandas as pd
+import argparse
+import datetime
+import json
 import os
-from evidently.legacy.report import Report
-from evidently.legacy.metric_preset import DataDriftPreset, TargetDriftPreset
+import time
+import zlib
+from collections import Counter
+import numpy as np
+import pandas as pd
+from DataSetup import LABELS, clean_texts, load_master_dataset
+from Preprocessing import dataset_hash
+from prediction_logger import LOG_DIR, LEGACY_CSV, LogCursor, closed_segments, load_prediction_logs, read_segments
+
+# Streaming drift monitor. The training data is summarised once into a compact reference
+# profile (label distribution, token-length histogram, hashed token-frequency sketch); each
+# run only folds *new* prediction-log segments into hourly buckets and scores the last
+# --window-hours against the reference. The full Evidently report is only built on demand
+# (--report) or when a score crosses its threshold.
+#   python monitor_model.py                 (one update + scores)
+#   python monitor_model.py --watch 300     (every 5 minutes)
+#   python monitor_model.py --report        (also write monitoring_report.html)
+MONITOR_DIR = 'monitoring'
+REFERENCE_PROFILE = os.path.join(MONITOR_DIR, 'reference_profile.json')
+WINDOW_STATE = os.path.join(MONITOR_DIR, 'window_state.json')
+CURSOR_STATE = os.path.join(MONITOR_DIR, 'log_cursor.json')
+SCORES_LOG = os.path.join(MONITOR_DIR, 'drift_scores.jsonl')
+REPORT_PATH = 'monitoring_report.html'
+
+LENGTH_BINS = [0, 1, 2, 4, 8, 12, 16, 24, 32, 48, 64, 100, np.inf]
+TOKEN_BUCKETS = 4096
+# label / token scores are Jensen-Shannon distances (0..1), length is the PSI
+DRIFT_THRESHOLDS = {'label_js': 0.15, 'length_psi': 0.25, 'token_js': 0.35}
+
+def text_stats(texts, labels):
+    """Additive summary of (text, label) rows; raw texts are cleaned like the training data."""
+    tokens = [t.split() for t in clean_texts([t if isinstance(t, str) else "" for t in texts])]
+    token_hist = np.zeros(TOKEN_BUCKETS, dtype=np.int64)
+    for token, count in Counter(tok for toks in tokens for tok in toks).items():
+        token_hist[zlib.crc32(token.encode('utf-8')) % TOKEN_BUCKETS] += count
+    label_counts = pd.Series(labels, dtype=object).value_counts().reindex(LABELS, fill_value=0)
+    return {
+        'n': len(tokens),
+        'label_counts': label_counts.to_numpy(dtype=np.int64),
+        'length_hist': np.histogram([len(toks) for toks in tokens], bins=LENGTH_BINS)[0],
+        'token_hist': token_hist,
+    }
+
+def merge_stats(parts):
+    merged = {'n': 0, 'label_counts': np.zeros(len(LABELS), dtype=np.int64),
+              'length_hist': np.zeros(len(LENGTH_BINS) - 1, dtype=np.int64),
+              'token_hist': np.zeros(TOKEN_BUCKETS, dtype=np.int64)}
+    for part in parts:
+        for key in merged:
+            merged[key] = merged[key] + np.asarray(part[key])
+    return merged
+
+def _to_json(stats):
+    return {k: (v.tolist() if isinstance(v, (np.ndarray, np.generic)) else v) for k, v in stats.items()}
+
+def build_reference_profile():
+    """Profile of the master dataset, rebuilt only when the dataset changes."""
+    data_hash = dataset_hash()
+    if os.path.exists(REFERENCE_PROFILE):
+        with open(REFERENCE_PROFILE) as f:
+            profile = json.load(f)
+        if profile['dataset_hash'] == data_hash:
+            return profile
+
+    print("Building reference profile from the master dataset...")
+    start = time.perf_counter()
+    df = load_master_dataset().dropna()
+    profile = {'dataset_hash': data_hash, **_to_json(text_stats(df['text'].tolist(), df['label'].astype(str)))}
+    os.makedirs(MONITOR_DIR, exist_ok=True)
+    with open(REFERENCE_PROFILE, 'w') as f:
+        json.dump(profile, f)
+    print(f"Reference profile ({profile['n']} rows) built in {time.perf_counter() - start:.1f}s")
+    return profile
+
+def js_distance(p, q):
+    p = np.asarray(p, dtype=np.float64) + 1e-12
+    q = np.asarray(q, dtype=np.float64) + 1e-12
+    p, q = p / p.sum(), q / q.sum()
+    m = (p + q) / 2
+    return float(np.sqrt(max(0.0, 0.5 * np.sum(p * np.log2(p / m)) + 0.5 * np.sum(q * np.log2(q / m)))))
+
+def psi(expected, actual, eps=1e-4):
+    e = np.asarray(expected, dtype=np.float64)
+    a = np.asarray(actual, dtype=np.float64)
+    e = np.clip(e / e.sum(), eps, None)
+    a = np.clip(a / a.sum(), eps, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+def drift_scores(reference, window):
+    return {
+        'label_js': js_distance(reference['label_counts'], window['label_counts']),
+        'length_psi': psi(reference['length_hist'], window['length_hist']),
+        'token_js': js_distance(reference['token_hist'], window['token_hist']),
+    }
+
+def load_window_state():
+    if os.path.exists(WINDOW_STATE):
+        with open(WINDOW_STATE) as f:
+            return json.load(f)
+    return {'buckets': {}}
+
+def update_window(state, retention_hours, cursor):
+    """Folds rows from newly closed log segments into hourly buckets; returns the number of new rows."""
+    new = cursor.read_new(columns=['timestamp', 'text', 'label'])
+    if len(new):
+        hours = pd.to_datetime(new['timestamp'], utc=True).dt.strftime('%Y-%m-%dT%H')
+        for hour, rows in new.groupby(hours):
+            bucket = text_stats(rows['text'].tolist(), rows['label'].astype(str))
+            if hour in state['buckets']:
+                bucket = merge_stats([state['buckets'][hour], bucket])
+            state['buckets'][hour] = _to_json(bucket)
+
+    cutoff = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=retention_hours)).strftime('%Y-%m-%dT%H')
+    state['buckets'] = {h: b for h, b in state['buckets'].items() if h >= cutoff}
+    return len(new)
+
+def window_stats(state, window_hours):
+    cutoff = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=window_hours)).strftime('%Y-%m-%dT%H')
+    return merge_stats([b for h, b in state['buckets'].items() if h >= cutoff])
+
+def window_rows(window_hours):
+    """Logged rows from the last `window_hours` (for the full report)."""
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=window_hours)
+    df = read_segments(closed_segments(LOG_DIR, start=since.strftime('%Y-%m-%d')), columns=['timestamp', 'text', 'label'])
+    return df[pd.to_datetime(df['timestamp'], utc=True) >= since][['text', 'label']]
+
+def run_once(args, reference):
+    os.makedirs(MONITOR_DIR, exist_ok=True)
+    state = load_window_state()
+    cursor = LogCursor(CURSOR_STATE)
+    new_rows = update_window(state, max(args.window_hours, 1), cursor)
+    window = window_stats(state, args.window_hours)
+
+    record = {'time': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+              'new_rows': new_rows, 'window_rows': int(window['n']), 'window_hours': args.window_hours}
+    if window['n'] < args.min_rows:
+        print(f"{record['time']}: {window['n']} rows in the last {args.window_hours}h (< {args.min_rows}), no scores yet")
+        drifted = []
+    else:
+        scores = drift_scores(reference, window)
+        drifted = [name for name, value in scores.items() if value > DRIFT_THRESHOLDS[name]]
+        record.update(scores=scores, drifted=drifted)
+        print(f"{record['time']}: window {window['n']} rows (+{new_rows}) | "
+              + "  ".join(f"{k} {v:.3f}{' DRIFT' if k in drifted else ''}" for k, v in scores.items()))
+    with open(SCORES_LOG, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+    # Only alert when a score newly crosses its threshold, not on every scheduled run while it stays there
+    newly_drifted = set(drifted) - set(state.get('drifted', []))
+    state['drifted'] = drifted
+    tmp_path = WINDOW_STATE + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, WINDOW_STATE)
+    # Only now are the new rows safely in the window; a crash before this re-reads them
+    cursor.commit()
+
+    if args.report or newly_drifted:
+        generate_monitoring_report(window_rows(args.window_hours) if window['n'] else None)
+
+def generate_monitoring_report(current_data=None):
+    """Full Evidently data + target drift report (slow: reads the whole reference dataset)."""
+    from evidently.legacy.report import Report
+    from evidently.legacy.metric_preset import DataDriftPreset, TargetDriftPreset
 
-def generate_monitoring_report():
     print("--- Starting Evidently AI Monitoring ---")
-    
-    reference_file = 'Dataset/master_dataset.csv'
-    current_file = 'prediction_logs.csv'
-    
+
     # 1. Load Reference Data (Original training data)
-    if not os.path.exists(reference_file):
-        print(f"Error: Reference data {reference_file} not found.")
+    try:
+        reference_data = load_master_dataset()
+    except FileNotFoundError as e:
+        print(f"Error: Reference data not found ({e}).")
         return
-    
-    reference_data = pd.read_csv(reference_file)
     print(f"Loaded {len(reference_data)} reference samples.")
-    
+
     # 2. Load Current Data (Logged predictions)
-    if not os.path.exists(current_file):
-        print(f"Warning: {current_file} not found. Creating a simulation for demonstration...")
+    if current_data is None and not closed_segments(LOG_DIR) and not os.path.exists(LEGACY_CSV):
+        print(f"Warning: no prediction logs in {LOG_DIR}/ or {LEGACY_CSV}. Creating a simulation for demonstration...")
         # Simulate some data if no logs exist yet
         current_data = reference_data.sample(min(500, len(reference_data)))
-        current_data.loc[current_data.index[:50], 'text'] = "This video is so bad and I hate it" 
+        current_data.loc[current_data.index[:50], 'text'] = "This video is so bad and I hate it"
         current_data.loc[current_data.index[:50], 'label'] = 'anger'
-    else:
-        current_data = pd.read_csv(current_file)
-        print(f"Loaded {len(current_data)} current prediction samples.")
-    
+    elif current_data is None:
+        current_data = load_prediction_logs(columns=['text', 'label'])
+    print(f"Loaded {len(current_data)} current prediction samples.")
+
     # 3. Create Evidently Report
     print("Generating Drift Report...")
     report = Report(metrics=[
-        DataDriftPreset(), 
+        DataDriftPreset(),
         TargetDriftPreset()
     ])
-    
+
     report.run(reference_data=reference_data, current_data=current_data)
-    
+
     # 4. Save to HTML
-    output_path = 'monitoring_report.html'
-    report.save_html(output_path)
-    
-    print(f"Reports saved to {output_path}")
+    report.save_html(REPORT_PATH)
+
+    print(f"Reports saved to {REPORT_PATH}")
 
 if __name__ == "__main__":
-    generate_monitoring_report()
+    parser = argparse.ArgumentParser(description="Windowed drift scores over the prediction logs")
+    parser.add_argument('--window-hours', type=float, default=24)
+    parser.add_argument('--min-rows', type=int, default=200, help="Minimum rows in the window before scoring")
+    parser.add_argument('--watch', type=float, default=None, metavar='SECONDS', help="Re-score every SECONDS")
+    parser.add_argument('--report', action='store_true', help="Always write the full Evidently report")
+    parser.add_argument('--full', action='store_true', help="Only the full Evidently report over all logs (old behaviour)")
+    args = parser.parse_args()
+
+    if args.full:
+        generate_monitoring_report()
+    else:
+        reference = build_reference_profile()
+        while True:
+            run_once(args, reference)
+            if not args.watch:
+                break
+            args.report = False
+            time.sleep(args.watch)
+            # Score against the current training data once the master dataset is rebuilt
+            if dataset_hash() != reference['dataset_hash']:
+                reference = build_reference_profile()
@@ -0,0 +1,302 @@
+import json
+import os
+import pickle
+import subprocess
+import sys
+import numpy as np
+
+# Layers that only matter during training
+_SKIPPED_LAYERS = ('Dropout', 'InputLayer', 'SpatialDropout1D', 'GaussianNoise')
+
+
+def _sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def _lstm_arrays(layer, prefix):
+    kernel, recurrent_kernel, bias = layer.get_weights()
+    if layer.activation.__name__ != 'tanh' or layer.recurrent_activation.__name__ != 'sigmoid':
+        raise ValueError(f"Unsupported LSTM activations in {layer.name}")
+    return {f"{prefix}_kernel": kernel, f"{prefix}_recurrent": recurrent_kernel, f"{prefix}_bias": bias}
+
+
+def export_model(model, classes, out_path):
+    """
+    Converts a trained Keras Sequential model (Embedding / LSTM / Bidirectional(LSTM) /
+    BatchNormalization / Dense) into one .npz weight bundle for NumpyModel.
+    """
+    spec = []
+    arrays = {}
+    for i, layer in enumerate(model.layers):
+        kind = type(layer).__name__
+        key = f"l{i}"
+        if kind in _SKIPPED_LAYERS:
+            continue
+        elif kind == 'Embedding':
+            arrays[f"{key}_embeddings"] = layer.get_weights()[0]
+            spec.append({"type": "embedding", "key": key})
+        elif kind == 'LSTM':
+            arrays.update(_lstm_arrays(layer, f"{key}_fw"))
+            spec.append({"type": "lstm", "key": key, "return_sequences": layer.return_sequences})
+        elif kind == 'Bidirectional':
+            if type(layer.forward_layer).__name__ != 'LSTM' or layer.merge_mode != 'concat':
+                raise ValueError(f"Only concat Bidirectional(LSTM) is supported, got {layer.name}")
+            arrays.update(_lstm_arrays(layer.forward_layer, f"{key}_fw"))
+            arrays.update(_lstm_arrays(layer.backward_layer, f"{key}_bw"))
+            spec.append({"type": "bilstm", "key": key, "return_sequences": layer.forward_layer.return_sequences})
+        elif kind == 'BatchNormalization':
+            # Fold the frozen statistics into a single scale and shift
+            dim = layer.moving_mean.shape[-1]
+            gamma = np.asarray(layer.gamma) if layer.scale else np.ones(dim, dtype=np.float32)
+            beta = np.asarray(layer.beta) if layer.center else np.zeros(dim, dtype=np.float32)
+            scale = gamma / np.sqrt(np.asarray(layer.moving_variance) + layer.epsilon)
+            arrays[f"{key}_scale"] = scale
+            arrays[f"{key}_shift"] = beta - np.asarray(layer.moving_mean) * scale
+            spec.append({"type": "batchnorm", "key": key})
+        elif kind == 'Dense':
+            kernel, bias = layer.get_weights()
+            arrays[f"{key}_kernel"] = kernel
+            arrays[f"{key}_bias"] = bias
+            spec.append({"type": "dense", "key": key, "activation": layer.activation.__name__})
+        else:
+            raise ValueError(f"Layer type {kind} is not supported by the NumPy runtime")
+
+    arrays = {k: np.asarray(v, dtype=np.float32) for k, v in arrays.items()}
+    print(f"Exporting {len(spec)} layers...")
+    _write_bundle(out_path, spec, arrays, np.asarray(classes).astype(str))
+
+
+def _quantize(w, axis):
+    """Symmetric int8 with one scale per slice along `axis` (per output channel / per embedding row)."""
+    scale = np.abs(w).max(axis=axis, keepdims=True) / 127.0
+    scale[scale == 0] = 1.0
+    q = np.clip(np.rint(w / scale), -127, 127).astype(np.int8)
+    return q, np.squeeze(scale, axis=axis).astype(np.float32)
+
+
+def _read_bundle(path):
+    with np.load(path, allow_pickle=False) as bundle:
+        arrays = {k: bundle[k] for k in bundle.files if k not in ('spec', 'classes')}
+        return json.loads(str(bundle['spec'])), arrays, bundle['classes']
+
+
+def _write_bundle(out_path, spec, arrays, classes):
+    np.savez(out_path, spec=np.array(json.dumps(spec)), classes=classes, **arrays)
+    print(f"Wrote {out_path} ({os.path.getsize(out_path) / 1e6:.1f} MB)")
+
+
+def quantize_bundle(in_path, out_path):
+    """
+    Weight-only int8 variant of a bundle. Embedding rows stay int8 in memory and
+    are dequantized per lookup; the small LSTM/Dense matrices are dequantized at load.
+    """
+    spec, arrays, classes = _read_bundle(in_path)
+    out = {}
+    for key, w in arrays.items():
+        if key.endswith('_embeddings'):
+            out[f"{key}__q"], out[f"{key}__scale"] = _quantize(w, axis=1)
+        elif key.endswith(('_kernel', '_recurrent')):
+            out[f"{key}__q"], out[f"{key}__scale"] = _quantize(w, axis=0)
+        else:
+            out[key] = w
+    _write_bundle(out_path, spec, out, classes)
+
+
+def prune_vocabulary(in_path, out_path, vocab_path, out_vocab_path, vocab_size):
+    """
+    Keeps only the `vocab_size` most frequent tokenizer ids in the embedding.
+    Words whose embedding row equals the padding row (e.g. frozen GloVe rows for
+    words without a vector) are mapped to id 0, which gives identical outputs.
+    Dropped words are skipped, as Keras does for ids >= num_words.
+    """
+    spec, arrays, classes = _read_bundle(in_path)
+    with open(vocab_path, encoding='utf-8') as f:
+        vocab = json.load(f)
+
+    emb_key = next(k for k in arrays if k.endswith('_embeddings'))
+    emb = arrays[emb_key]
+    ids = vocab.get('ids') or list(range(1, len(vocab['words']) + 1))
+
+    words, new_ids, rows = [], [], [emb[0]]
+    for word, old_id in zip(vocab['words'], ids):
+        if word is None or old_id >= vocab_size:
+            continue
+        if np.array_equal(emb[old_id], emb[0]):
+            words.append(word)
+            new_ids.append(0)
+        else:
+            words.append(word)
+            new_ids.append(len(rows))
+            rows.append(emb[old_id])
+
+    arrays[emb_key] = np.stack(rows).astype(np.float32)
+    vocab.update(words=words, ids=new_ids, num_words=len(rows))
+    with open(out_vocab_path, 'w', encoding='utf-8') as f:
+        json.dump(vocab, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"Embedding trimmed from {len(emb)} to {len(rows)} rows ({sum(i == 0 for i in new_ids)} words folded into padding)")
+    _write_bundle(out_path, spec, arrays, classes)
+
+
+class NumpyModel:
+    """Forward pass of the exported BiLSTM using only NumPy."""
+
+    def __init__(self, spec, arrays, classes):
+        self.spec = spec
+        self.classes = classes
+        self.arrays = {}
+        self.quantized_embeddings = {}
+        for key, value in arrays.items():
+            if key.endswith('__scale'):
+                continue
+            if key.endswith('__q'):
+                base = key[:-3]
+                scale = arrays[f"{base}__scale"]
+                if base.endswith('_embeddings'):
+                    self.quantized_embeddings[base] = (value, scale)
+                else:
+                    self.arrays[base] = value.astype(np.float32) * scale
+            else:
+                self.arrays[key] = value
+
+    @classmethod
+    def load(cls, path):
+        return cls(*_read_bundle(path))
+
+    def _embed(self, key, ids):
+        if key in self.quantized_embeddings:
+            q, scale = self.quantized_embeddings[key]
+            return q[ids].astype(np.float32) * scale[ids][..., None]
+        return self.arrays[key][ids]
+
+    def _lstm(self, x, prefix, return_sequences, reverse=False):
+        W = self.arrays[f"{prefix}_kernel"]
+        U = self.arrays[f"{prefix}_recurrent"]
+        b = self.arrays[f"{prefix}_bias"]
+        n, steps, _ = x.shape
+        units = U.shape[0]
+
+        # Input projection for every timestep in one matmul
+        xw = (x.reshape(n * steps, -1) @ W + b).reshape(n, steps, 4 * units)
+        h = np.zeros((n, units), dtype=np.float32)
+        c = np.zeros((n, units), dtype=np.float32)
+        outputs = np.empty((n, steps, units), dtype=np.float32) if return_sequences else None
+
+        order = range(steps - 1, -1, -1) if reverse else range(steps)
+        for t in order:
+            z = xw[:, t] + h @ U
+            i = _sigmoid(z[:, :units])
+            f = _sigmoid(z[:, units:2 * units])
+            g = np.tanh(z[:, 2 * units:3 * units])
+            o = _sigmoid(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            if return_sequences:
+                outputs[:, t] = h
+        return outputs if return_sequences else h
+
+    def predict(self, x, verbose=0):
+        """Returns class probabilities for an int (n, steps) array of token ids."""
+        out = np.asarray(x)
+        for layer in self.spec:
+            key = layer["key"]
+            kind = layer["type"]
+            if kind == "embedding":
+                out = self._embed(f"{key}_embeddings", out)
+            elif kind == "lstm":
+                out = self._lstm(out, f"{key}_fw", layer["return_sequences"])
+            elif kind == "bilstm":
+                fw = self._lstm(out, f"{key}_fw", layer["return_sequences"])
+                bw = self._lstm(out, f"{key}_bw", layer["return_sequences"], reverse=True)
+                out = np.concatenate([fw, bw], axis=-1)
+            elif kind == "batchnorm":
+                out = out * self.arrays[f"{key}_scale"] + self.arrays[f"{key}_shift"]
+            elif kind == "dense":
+                out = out @ self.arrays[f"{key}_kernel"] + self.arrays[f"{key}_bias"]
+                if layer["activation"] == "relu":
+                    out = np.maximum(out, 0)
+                elif layer["activation"] == "softmax":
+                    out = np.exp(out - out.max(axis=-1, keepdims=True))
+                    out /= out.sum(axis=-1, keepdims=True)
+                elif layer["activation"] != "linear":
+                    raise ValueError(f"Unsupported activation {layer['activation']}")
+        return out
+
+
+def verify(model, numpy_model, x, atol=1e-4):
+    """Checks the NumPy forward pass against Keras on the same inputs."""
+    expected = model.predict(x, verbose=0)
+    actual = numpy_model.predict(x)
+    max_diff = float(np.abs(expected - actual).max())
+    agreement = float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean())
+    print(f"Max |keras - numpy| = {max_diff:.2e}, argmax agreement = {agreement:.4%}")
+    return max_diff <= atol
+
+
+_STARTUP_PROBE = """
+import resource, sys, time
+start = time.perf_counter()
+import inference
+elapsed = time.perf_counter() - start
+if inference.load_error:
+    sys.exit(inference.load_error)
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def compare_runtimes(images=('sentiment-analysis-repo:latest', 'sentiment-analysis-repo:lite')):
+    """Reports cold start and peak RSS of `import inference` per runtime, plus image sizes."""
+    results = {}
+    for runtime in ('keras', 'numpy'):
+        env = dict(os.environ, INFERENCE_RUNTIME=runtime, MICRO_BATCHING='0')
+        out = subprocess.run([sys.executable, '-c', _STARTUP_PROBE], env=env, capture_output=True, text=True)
+        if out.returncode != 0:
+            print(f"{runtime}: failed to start\n{out.stderr or out.stdout}")
+            continue
+        elapsed, maxrss_kb = out.stdout.strip().splitlines()[-1].split()
+        results[runtime] = (float(elapsed), int(maxrss_kb) / 1024)
+        print(f"{runtime:<6} cold start {float(elapsed):6.2f}s   peak RSS {int(maxrss_kb) / 1024:8.1f} MB")
+
+    if len(results) == 2:
+        (k_t, k_rss), (n_t, n_rss) = results['keras'], results['numpy']
+        print(f"Cold start reduced by {k_t - n_t:.2f}s ({1 - n_t / k_t:.0%}), RSS by {k_rss - n_rss:.0f} MB ({1 - n_rss / k_rss:.0%})")
+
+    for image in images:
+        try:
+            size = subprocess.run(['docker', 'image', 'inspect', '-f', '{{.Size}}', image],
+                                  capture_output=True, text=True, check=True).stdout.strip()
+            print(f"Image {image}: {int(size) / 1e6:.0f} MB")
+        except (OSError, subprocess.CalledProcessError):
+            print(f"Image {image}: not available (build it to compare sizes)")
+
+
+if __name__ == "__main__":
+    # Usage:
+    #   python numpy_runtime.py export [model_dir] [out.npz]
+    #   python numpy_runtime.py compare
+    command = sys.argv[1] if len(sys.argv) > 1 else 'export'
+
+    if command == 'export':
+        import mlflow.keras
+        from fast_tokenizer import FastTokenizer
+
+        model_dir = sys.argv[2] if len(sys.argv) > 2 else 'model'
+        out_path = sys.argv[3] if len(sys.argv) > 3 else 'model_numpy.npz'
+
+        keras_model = mlflow.keras.load_model(model_dir)
+        with open('label_encoder.pickle', 'rb') as handle:
+            le = pickle.load(handle)
+        export_model(keras_model, le.classes_, out_path)
+
+        # Parity check on real tokenized text when available, random ids otherwise
+        rng = np.random.default_rng(0)
+        x = rng.integers(0, 20000, size=(64, 100)).astype(np.int32)
+        if os.path.exists('vocab.json') and os.path.exists('Dataset/master_dataset.csv'):
+            import pandas as pd
+            texts = pd.read_csv('Dataset/master_dataset.csv', nrows=512)['text'].fillna('').tolist()
+            x = FastTokenizer.load('vocab.json').texts_to_padded(texts, 100)
+        if not verify(keras_model, NumpyModel.load(out_path), x):
+            sys.exit("NumPy runtime output differs from Keras beyond tolerance")
+    elif command == 'compare':
+        compare_runtimes()
+    else:
+        sys.exit(f"Unknown command {command}")
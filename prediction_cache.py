@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Rough per-entry bookkeeping cost of the OrderedDict node, tuple and floats
+_ENTRY_OVERHEAD_BYTES = 120
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def snapshot(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+class PredictionCache:
+    """
+    In-process LRU cache with a TTL and an approximate memory budget.
+    Keys are (model_version, cleaned_text) tuples.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl_seconds=3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(key, value):
+        return sys.getsizeof(key[1]) + sys.getsizeof(value) + _ENTRY_OVERHEAD_BYTES
+
+    def get_many(self, keys):
+        """Returns one value per key, None for misses."""
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    results.append(None)
+                elif entry[1] < now:
+                    self._bytes -= entry[2]
+                    del self._entries[key]
+                    results.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    results.append(entry[0])
+        hits = sum(r is not None for r in results)
+        self.stats.record(hits, len(results) - hits)
+        return results
+
+    def put_many(self, items):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in items:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._bytes -= old[2]
+                size = self._size(key, value)
+                self._entries[key] = (value, expires, size)
+                self._bytes += size
+
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2]
+
+    def snapshot(self):
+        with self._lock:
+            info = {"backend": "memory", "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+        info.update(self.stats.snapshot())
+        return info
+
+
+class SharedPredictionCache:
+    """
+    Cache shared by every gunicorn worker on the host, stored in a SQLite file.
+    Put the file on tmpfs (e.g. /dev/shm) so it never touches disk.
+    Entries expire after the TTL. Once the file outgrows the memory budget,
+    the least recently used tenth of the entries is evicted.
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, ttl_seconds=3600, evict_every=256):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.evict_every = evict_every
+        self.stats = CacheStats()
+        self._local = threading.local()
+        self._puts = 0
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "key BLOB PRIMARY KEY, value TEXT, expires REAL, accessed REAL)"
+        )
+        self._conn().execute("CREATE INDEX IF NOT EXISTS predictions_accessed ON predictions(accessed)")
+
+    def _conn(self):
+        # One connection per thread and per process (connections must not cross fork())
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _key(key):
+        version, text = key
+        return hashlib.blake2b(f"{version}\x00{text}".encode('utf-8'), digest_size=16).digest()
+
+    def get_many(self, keys):
+        hashed = [self._key(k) for k in keys]
+        now = time.time()
+        found = {}
+        conn = self._conn()
+        for start in range(0, len(hashed), 500):
+            chunk = hashed[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT key, value FROM predictions WHERE expires > ? AND key IN ({marks})", [now, *chunk]
+            ).fetchall()
+            found.update(rows)
+        if found:
+            marks = ",".join("?" * len(found))
+            conn.execute(f"UPDATE predictions SET accessed = ? WHERE key IN ({marks})", [now, *found])
+
+        results = [json.loads(found[h]) if h in found else None for h in hashed]
+        hits = sum(r is not None for r in results)
+        self.stats.record(hits, len(results) - hits)
+        return results
+
+    def put_many(self, items):
+        now = time.time()
+        rows = [(self._key(k), json.dumps(v), now + self.ttl, now) for k, v in items]
+        conn = self._conn()
+        conn.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)", rows)
+
+        self._puts += 1
+        if self._puts % self.evict_every == 0:
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM predictions WHERE expires <= ?", (now,))
+        # Deleted rows go to the freelist and are reused, so only count pages in use
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        if (page_count - free_pages) * page_size > self.max_bytes:
+            conn.execute(
+                "DELETE FROM predictions WHERE key IN "
+                "(SELECT key FROM predictions ORDER BY accessed LIMIT (SELECT COUNT(*) / 10 FROM predictions))"
+            )
+
+    def snapshot(self):
+        entries = self._conn().execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        info = {"backend": "shared", "path": self.path, "entries": entries, "max_bytes": self.max_bytes}
+        info.update(self.stats.snapshot())
+        return info
+
+
+def model_version_hash(paths):
+    """Content hash over model/tokenizer/encoder files, so cached results never outlive a model change."""
+    digest = hashlib.sha256()
+    for root in paths:
+        if os.path.isdir(root):
+            files = sorted(os.path.join(d, f) for d, _, names in os.walk(root) for f in names)
+        elif os.path.exists(root):
+            files = [root]
+        else:
+            continue
+        for path in files:
+            digest.update(os.path.relpath(path, root).encode('utf-8'))
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+    return digest.hexdigest()[:12]
@@ -0,0 +1,254 @@
+import atexit
+import datetime
+import gzip
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import pandas as pd
+from fork_safe import ForkSafeStarter
+
+# Segmented prediction log written off the request path:
+#   <log_dir>/<YYYY-MM-DD>/<YYYYMMDDTHHMMSSmmm>-<pid>-<seq>.parquet   (or .csv.gz)
+# A segment is written as <name>.inprogress and renamed once closed, so readers only ever
+# see complete files. Segments rotate by size and age, and each holds the rows of one UTC day
+# (the day of the rows' own timestamps, not of the flush).
+LOG_DIR = 'prediction_logs'
+LEGACY_CSV = 'prediction_logs.csv'
+COLUMNS = ['timestamp', 'model_version', 'text', 'label']
+_EXTENSIONS = {'parquet': '.parquet', 'csv': '.csv.gz'}
+_STOP = object()
+# Segment numbers are unique per process, even across logger instances
+_segment_seq = itertools.count(1)
+
+
+class _Segment:
+    def __init__(self, log_dir, fmt, day, seq):
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S%f')[:-3]
+        os.makedirs(os.path.join(log_dir, day), exist_ok=True)
+        self.path = os.path.join(log_dir, day, f"{stamp}-{os.getpid()}-{seq:04d}{_EXTENSIONS[fmt]}")
+        self.fmt = fmt
+        self.day = day
+        self.opened_at = time.monotonic()
+        self.rows = 0
+        self._writer = None
+
+    def write(self, df):
+        if self.fmt == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            schema = pa.schema([('timestamp', pa.timestamp('ms', tz='UTC')), ('model_version', pa.string()),
+                                ('text', pa.string()), ('label', pa.string())])
+            table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path + '.inprogress', schema, compression='zstd')
+            self._writer.write_table(table)
+        else:
+            if self._writer is None:
+                self._writer = gzip.open(self.path + '.inprogress', 'wt', encoding='utf-8', newline='')
+            df.to_csv(self._writer, index=False, header=self.rows == 0)
+            self._writer.flush()
+        self.rows += len(df)
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path + '.inprogress')
+        except OSError:
+            return 0
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self.path + '.inprogress', self.path)
+
+
+class PredictionLogger:
+    """
+    Non-blocking prediction log. log() only appends to a bounded in-memory queue (records
+    are dropped and counted when it is full); a background thread flushes every
+    `flush_rows` rows or `flush_seconds`, appending to the current segment and rotating
+    it after `rotate_bytes`, `rotate_seconds` or at UTC midnight. Rows are filed under the
+    day of their own timestamp, so a flush that spans midnight writes to two segments.
+    """
+
+    def __init__(self, log_dir=LOG_DIR, fmt='parquet', max_queue=10000, flush_rows=1000, flush_seconds=5.0,
+                 rotate_bytes=64 * 1024 * 1024, rotate_seconds=3600.0):
+        if fmt not in _EXTENSIONS:
+            raise ValueError(f"Unknown log format {fmt!r} (expected one of {', '.join(_EXTENSIONS)})")
+        self.log_dir = log_dir
+        self.fmt = fmt
+        self.max_queue = max_queue
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self._starter = ForkSafeStarter(self._start_worker)
+        self._stats_lock = threading.Lock()
+        self.logged = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.segments_closed = 0
+
+    def _start_worker(self):
+        self._queue = queue.Queue(self.max_queue)
+        self._segment = None
+        self._thread = threading.Thread(target=self._run, name="prediction-logger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, texts, predictions, model_version=None):
+        """Queues one request's predictions; never blocks."""
+        self._starter.ensure_started()
+        try:
+            self._queue.put_nowait((datetime.datetime.now(datetime.timezone.utc), model_version,
+                                    list(texts), list(predictions)))
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += len(predictions)
+
+    def _run(self):
+        buffer = []
+        deadline = time.monotonic() + self.flush_seconds
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush(buffer)
+                if self._segment is not None:
+                    self._close_segment()
+                return
+            if item is not None:
+                timestamp, version, texts, labels = item
+                buffer.extend((timestamp, version, t, l) for t, l in zip(texts, labels))
+            if len(buffer) >= self.flush_rows or time.monotonic() >= deadline:
+                self._flush(buffer)
+                buffer = []
+                deadline = time.monotonic() + self.flush_seconds
+
+    def _close_segment(self):
+        self._segment.close()
+        self._segment = None
+        with self._stats_lock:
+            self.segments_closed += 1
+
+    def _flush(self, rows):
+        try:
+            today = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d')
+            segment = self._segment
+            if segment is not None and (segment.day != today or segment.size() >= self.rotate_bytes
+                                        or time.monotonic() - segment.opened_at >= self.rotate_seconds):
+                self._close_segment()
+            if not rows:
+                return
+
+            df = pd.DataFrame(rows, columns=COLUMNS)
+            df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True).astype('datetime64[ms, UTC]')
+            df[['model_version', 'text', 'label']] = df[['model_version', 'text', 'label']].astype('string')
+            # Rows queued just before midnight belong to the previous day's directory, where the
+            # --since / --until day pruning of the readers looks for them
+            for day, part in df.groupby(df['timestamp'].dt.strftime('%Y-%m-%d'), sort=True):
+                if self._segment is not None and self._segment.day != day:
+                    self._close_segment()
+                if self._segment is None:
+                    self._segment = _Segment(self.log_dir, self.fmt, day, next(_segment_seq))
+                self._segment.write(part)
+            with self._stats_lock:
+                self.logged += len(rows)
+                self.flushes += 1
+        except Exception as e:
+            print(f"Logging Error: {e}")
+
+    def close(self, timeout=10.0):
+        """Flushes what is queued and closes the open segment (also runs at interpreter exit)."""
+        if not self._starter.started() or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def snapshot(self):
+        with self._stats_lock:
+            return {
+                "logged_rows": self.logged,
+                "dropped_rows": self.dropped,
+                "queued_requests": self._queue.qsize() if self._starter.started() else 0,
+                "flushes": self.flushes,
+                "segments_closed": self.segments_closed,
+                "format": self.fmt,
+            }
+
+
+def closed_segments(log_dir=LOG_DIR, start=None, end=None):
+    """Paths of finished segments in write order, optionally limited to UTC days start..end ('YYYY-MM-DD')."""
+    if not os.path.isdir(log_dir):
+        return []
+    paths = []
+    for day in sorted(os.listdir(log_dir)):
+        if (start and day < start) or (end and day > end) or not os.path.isdir(os.path.join(log_dir, day)):
+            continue
+        paths += [os.path.join(log_dir, day, name) for name in sorted(os.listdir(os.path.join(log_dir, day)))
+                  if name.endswith(tuple(_EXTENSIONS.values()))]
+    return paths
+
+
+def read_segments(paths, columns=None):
+    """One DataFrame from Parquet / gzipped CSV segments."""
+    frames = []
+    for path in paths:
+        if path.endswith('.parquet'):
+            frames.append(pd.read_parquet(path, columns=columns))
+        else:
+            df = pd.read_csv(path, usecols=columns, compression='gzip')
+            if 'timestamp' in df:
+                df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True, format='ISO8601')
+            frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=columns or COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_prediction_logs(log_dir=LOG_DIR, start=None, end=None, columns=None):
+    """All logged predictions (falling back to the legacy single CSV when there are no segments)."""
+    paths = closed_segments(log_dir, start, end)
+    if not paths and os.path.exists(LEGACY_CSV):
+        return pd.read_csv(LEGACY_CSV, usecols=[c for c in (columns or ['text', 'label']) if c in ('text', 'label')])
+    return read_segments(paths, columns)
+
+
+class LogCursor:
+    """
+    Incremental reading: read_new() returns only rows from segments closed since the
+    last commit(), which records what was consumed in a small JSON state file. Commit
+    once the rows are safely stored, so a crash in between re-reads them instead of
+    losing them.
+    """
+
+    def __init__(self, state_path, log_dir=LOG_DIR):
+        self.state_path = state_path
+        self.log_dir = log_dir
+        self.seen = set()
+        self._read = set()
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                self.seen = set(json.load(f)['segments'])
+
+    def pending(self):
+        return [p for p in closed_segments(self.log_dir) if os.path.relpath(p, self.log_dir) not in self.seen]
+
+    def read_new(self, columns=None):
+        paths = self.pending()
+        df = read_segments(paths, columns)
+        self._read.update(os.path.relpath(p, self.log_dir) for p in paths)
+        return df
+
+    def commit(self):
+        """Marks the segments returned by read_new() as consumed."""
+        self.seen |= self._read
+        self._read = set()
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'segments': sorted(self.seen)}, f)
+        os.replace(tmp_path, self.state_path)
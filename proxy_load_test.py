@@ -0,0 +1,113 @@
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import urllib3
+
+# Closed-loop load test for sagemaker_proxy.py (or any /invocations endpoint):
+# `--concurrency` clients each send requests back to back until `--requests` are done.
+#   python stub_endpoint.py &
+#   UPSTREAM_URL=http://127.0.0.1:8081/invocations PROXY_MODE=async python sagemaker_proxy.py &
+#   python proxy_load_test.py --url http://127.0.0.1:8080 --concurrency 64 --requests 2000
+
+SAMPLE_TEXTS = [
+    "I can't believe how good this video is",
+    "this is the worst thing I have seen all week",
+    "wow, did not expect that ending at all",
+    "I'm honestly scared of what comes next",
+    "meh, it was fine I guess",
+    "thank you so much for making this, it made my day",
+]
+
+def latency_summary(latencies_ms):
+    """p50 / p95 / p99 / mean of successful requests, shared by every load test report."""
+    if len(latencies_ms) == 0:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'mean_ms': None}
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3), 'p99_ms': round(p99, 3),
+            'mean_ms': round(float(np.mean(latencies_ms)), 3)}
+
+def closed_loop(send, payloads, concurrency):
+    """`concurrency` clients send payloads back to back; send() returns an error string or None."""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    pending = iter(payloads)
+
+    def client():
+        while True:
+            with lock:
+                payload = next(pending, None)
+            if payload is None:
+                return
+            start = time.perf_counter()
+            try:
+                error = send(payload)
+            except Exception as e:
+                error = str(e)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if error is None:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(error)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(client) for _ in range(concurrency)]:
+            future.result()
+    return time.perf_counter() - start, np.array(latencies), errors
+
+def http_sender(url, concurrency):
+    """send() for closed_loop: POSTs a list of texts to url/invocations and checks the prediction count."""
+    http = urllib3.PoolManager(maxsize=concurrency)
+
+    def send(texts):
+        response = http.request('POST', url + '/invocations', body=json.dumps({"text": texts}),
+                                headers={'Content-Type': 'application/json'})
+        if response.status != 200:
+            return f"HTTP {response.status}: {response.data[:200]!r}"
+        if len(json.loads(response.data.decode())['predictions']) != len(texts):
+            return "wrong number of predictions"
+        return None
+    return send
+
+def request_texts(n_requests, texts_per_request):
+    """Distinct texts per request, so a prediction cache behind the proxy does not answer them."""
+    return [[f"{SAMPLE_TEXTS[(i + k) % len(SAMPLE_TEXTS)]} #{i}" for k in range(texts_per_request)]
+            for i in range(n_requests)]
+
+def report(wall, latencies, errors, texts_per_request):
+    done = len(latencies)
+    print(f"requests: {done} ok, {len(errors)} failed in {wall:.2f}s")
+    if errors:
+        print(f"  first error: {errors[0]}")
+    if done:
+        summary = latency_summary(latencies)
+        print(f"throughput: {done / wall:.1f} req/s, {done * texts_per_request / wall:.1f} texts/s")
+        print(f"latency ms: p50 {summary['p50_ms']:.1f}  p95 {summary['p95_ms']:.1f}  p99 {summary['p99_ms']:.1f}  "
+              f"max {latencies.max():.1f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Throughput and latency percentiles of an /invocations endpoint")
+    parser.add_argument('--url', default='http://127.0.0.1:8080', help="Base URL of the proxy")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--texts-per-request', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests x {args.texts_per_request} text(s), {args.concurrency} concurrent clients -> {args.url}")
+    wall, latencies, errors = closed_loop(http_sender(args.url, args.concurrency),
+                                          request_texts(args.requests, args.texts_per_request), args.concurrency)
+    report(wall, latencies, errors, args.texts_per_request)
+
+    # Upstream batching, when the target is sagemaker_proxy.py in async mode
+    try:
+        stats = json.loads(urllib3.request('GET', args.url + '/stats').data.decode())
+        if stats.get('forwarding'):
+            forwarding = stats['forwarding']
+            print(f"upstream: {forwarding['batches']} invocations, avg batch {forwarding['avg_batch_size']:.1f} texts")
+    except Exception:
+        pass
@@ -1,43 +1,128 @@
 import boto3
 import json
+import os
 import flask
+import urllib3
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError
 from flask_cors import CORS
+from upstream_forwarder import UpstreamForwarder
+from endpoint_resolver import EndpointResolver
+from prediction_logger import PredictionLogger
 
 # --- CONFIGURATION ---
 REGION = 'ap-south-1'
 ENDPOINT_PREFIX = 'sentiment-analysis-v2-'
 
+# 'sync' blocks each request thread on its own invoke_endpoint call (original behaviour);
+# 'async' coalesces concurrent requests into shared upstream invocations (see upstream_forwarder.py)
+PROXY_MODE = os.environ.get('PROXY_MODE', 'sync')
+PROXY_MAX_CONCURRENCY = int(os.environ.get('PROXY_MAX_CONCURRENCY', '8'))
+PROXY_MAX_BATCH_SIZE = int(os.environ.get('PROXY_MAX_BATCH_SIZE', '64'))
+PROXY_MAX_WAIT_MS = float(os.environ.get('PROXY_MAX_WAIT_MS', '5'))
+# Upstream connect / read timeouts; a request still without an answer after both is a 504
+PROXY_CONNECT_TIMEOUT_S = float(os.environ.get('PROXY_CONNECT_TIMEOUT_S', '5'))
+PROXY_READ_TIMEOUT_S = float(os.environ.get('PROXY_READ_TIMEOUT_S', '60'))
+PROXY_PORT = int(os.environ.get('PROXY_PORT', '8080'))
+PROXY_DEBUG = os.environ.get('PROXY_DEBUG', '0') == '1'
+
+# Endpoint discovery is cached and refreshed in the background every ENDPOINT_TTL_SECONDS
+# instead of calling list_endpoints per request
+ENDPOINT_TTL_SECONDS = float(os.environ.get('ENDPOINT_TTL_SECONDS', '30'))
+
+# Forward to a plain HTTP endpoint instead of SageMaker, e.g. the local stand-in:
+#   python stub_endpoint.py   ->   UPSTREAM_URL=http://127.0.0.1:8081/invocations
+UPSTREAM_URL = os.environ.get('UPSTREAM_URL', '')
+
+# Prediction log for monitoring: segmented 'parquet' or gzipped 'csv' files under PREDICTION_LOG_DIR,
+# written by a background thread (see prediction_logger.py)
+PREDICTION_LOG_DIR = os.environ.get('PREDICTION_LOG_DIR', 'prediction_logs')
+PREDICTION_LOG_FORMAT = os.environ.get('PREDICTION_LOG_FORMAT', 'parquet')
+
 app = flask.Flask(__name__)
 CORS(app)
 
-# AWS Clients
+# AWS Clients (the runtime connection pool is sized to the number of in-flight invocations)
 sm_client = boto3.client('sagemaker', region_name=REGION)
-runtime = boto3.client('sagemaker-runtime', region_name=REGION)
+runtime = boto3.client('sagemaker-runtime', region_name=REGION,
+                       config=Config(max_pool_connections=PROXY_MAX_CONCURRENCY, connect_timeout=PROXY_CONNECT_TIMEOUT_S,
+                                     read_timeout=PROXY_READ_TIMEOUT_S))
+http = urllib3.PoolManager(maxsize=PROXY_MAX_CONCURRENCY, block=True, retries=False,
+                           timeout=urllib3.Timeout(connect=PROXY_CONNECT_TIMEOUT_S, read=PROXY_READ_TIMEOUT_S)) if UPSTREAM_URL else None
+UPSTREAM_TIMEOUTS = (TimeoutError, urllib3.exceptions.TimeoutError, ConnectTimeoutError, ReadTimeoutError)
+
+class NoEndpointError(Exception):
+    pass
+
+resolver = EndpointResolver(sm_client, 'sentiment-analysis', ENDPOINT_TTL_SECONDS)
 
 def get_latest_endpoint():
+    return resolver.resolve()
+
+def endpoint_unavailable(error):
+    """
+    True if an invoke_endpoint error means the endpoint itself is gone or unreachable. Bad
+    input (ModelError, other ValidationErrors) and throttling say nothing about which
+    endpoint to use, so they must not trigger another control-plane lookup.
+    """
+    if isinstance(error, EndpointConnectionError):
+        return True
+    if isinstance(error, ClientError):
+        details = error.response.get('Error', {})
+        message = details.get('Message', '').lower()
+        return details.get('Code') in ('ValidationError', 'ValidationException') and (
+            'not found' in message or 'not in service' in message or 'inservice' in message)
+    return False
+
+def invoke_upstream(payload):
+    """One upstream invocation with a JSON payload; returns the decoded JSON response."""
+    body = json.dumps(payload)
+    if UPSTREAM_URL:
+        response = http.request('POST', UPSTREAM_URL, body=body, headers={'Content-Type': 'application/json'})
+        if response.status != 200:
+            raise Exception(f"Upstream returned {response.status}: {response.data[:200]!r}")
+        return json.loads(response.data.decode())
+
+    # 1. Dynamically find the latest endpoint
+    active_endpoint = get_latest_endpoint()
+    if not active_endpoint:
+        raise NoEndpointError('No active SageMaker endpoint found.')
+    print(f"Routing request to: {active_endpoint}")
+
+    # 2. Forward to the dynamic endpoint
     try:
-        response = sm_client.list_endpoints(
-            SortBy='CreationTime',
-            SortOrder='Descending',
-            NameContains='sentiment-analysis' 
+        response = runtime.invoke_endpoint(
+            EndpointName=active_endpoint,
+            ContentType='application/json',
+            Body=body
         )
-        
-        endpoints = response.get('Endpoints', [])
-        
-        if not endpoints:
-            return None
-        
-        for ep in endpoints:
-            if ep['EndpointStatus'] == 'InService':
-                return ep['EndpointName']
-                
-        return None
     except Exception as e:
-        print(f"Error fetching latest endpoint: {e}")
-        return None
+        # The endpoint may have been replaced or deleted: look it up again on the next request
+        if endpoint_unavailable(e):
+            resolver.invalidate()
+        raise
+    return json.loads(response['Body'].read().decode())
+
+def invoke_batch(texts):
+    """
+    UpstreamForwarder callback: one invocation for the coalesced texts of several requests;
+    returns the upstream response (predictions and model_version).
+    """
+    result = invoke_upstream({'text': texts})
+    if 'predictions' not in result:
+        raise Exception(result.get('error', 'Upstream response has no predictions'))
+    return result
+
+forwarder = UpstreamForwarder(invoke_batch, PROXY_MAX_BATCH_SIZE, PROXY_MAX_WAIT_MS, PROXY_MAX_CONCURRENCY,
+                              PROXY_CONNECT_TIMEOUT_S + PROXY_READ_TIMEOUT_S) if PROXY_MODE == 'async' else None
+
+# LOGGING FOR EVIDENTLY AI
+prediction_logger = PredictionLogger(PREDICTION_LOG_DIR, PREDICTION_LOG_FORMAT)
 
 @app.route('/', methods=['GET'])
 def index():
+    if UPSTREAM_URL:
+        return f"Proxy is Live! Currently routing to: <b>{UPSTREAM_URL}</b> ({PROXY_MODE} mode)"
     latest_ep = get_latest_endpoint()
     if latest_ep:
         return f"Proxy is Live! Currently routing to: <b>{latest_ep}</b>"
@@ -45,56 +130,49 @@ def index():
 
 @app.route('/invocations', methods=['POST'])
 def proxy():
+    data = flask.request.get_json(silent=True)
+    texts = data.get('text') if isinstance(data, dict) else None
+    if isinstance(texts, str):
+        texts = [texts]
+    if not texts or not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        return flask.jsonify({'error': '"text" must be a string or a non-empty list of strings'}), 400
+
     try:
-        # 1. Dynamically find the latest endpoint
-        active_endpoint = get_latest_endpoint()
-        
-        if not active_endpoint:
-            return flask.jsonify({'error': 'No active SageMaker endpoint found.'}), 503
-            
-        print(f"Routing request to: {active_endpoint}")
-        data = flask.request.get_json()
-        
-        # 2. Forward to the dynamic endpoint
-        response = runtime.invoke_endpoint(
-            EndpointName=active_endpoint,
-            ContentType='application/json',
-            Body=json.dumps(data)
-        )
-        
-        result = json.loads(response['Body'].read().decode())
-        
-        # LOGGING FOR EVIDENTLY AI
-        try:
-            import os
-            import csv
-            log_file = 'prediction_logs.csv'
-            file_exists = os.path.isfile(log_file)
-            
-            with open(log_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                if not file_exists:
-                    writer.writerow(['text', 'label']) # Header
-                
-                # Zip comments and their predicted labels
-                for t, l in zip(data.get('text', []), result.get('predictions', [])):
-                    writer.writerow([t, l])
-            print(f"Logged {len(result.get('predictions', []))} predictions to {log_file}")
-        except Exception as log_e:
-            print(f"Logging Error: {log_e}")
+        if forwarder:
+            # Shares an upstream invocation with whatever else arrives within PROXY_MAX_WAIT_MS
+            result = forwarder.submit(texts)
+        else:
+            result = invoke_upstream(data)
 
+        # The version the endpoint itself reports (not the endpoint name), in both modes
+        prediction_logger.log(texts, result.get('predictions', []), result.get('model_version'))
         return flask.jsonify(result)
-        
+
+    except NoEndpointError as e:
+        return flask.jsonify({'error': str(e)}), 503
+    except UPSTREAM_TIMEOUTS as e:
+        print(f"Upstream timeout: {e}")
+        return flask.jsonify({'error': f"Upstream timeout: {e}"}), 504
     except Exception as e:
         print(f"Error: {e}")
         return flask.jsonify({'error': str(e)}), 500
 
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Upstream batching (async mode only), endpoint discovery and prediction log counters."""
+    return flask.jsonify({'mode': PROXY_MODE, 'forwarding': forwarder.stats.snapshot() if forwarder else None,
+                          'endpoint_resolver': None if UPSTREAM_URL else resolver.stats(),
+                          'prediction_log': prediction_logger.snapshot()})
+
 if __name__ == '__main__':
-    print("Checking for available SageMaker endpoints...")
-    initial_ep = get_latest_endpoint()
-    if initial_ep:
-        print(f"Ready! Initial target: {initial_ep}")
+    if UPSTREAM_URL:
+        print(f"Forwarding to {UPSTREAM_URL} ({PROXY_MODE} mode)")
     else:
-        print("Warning: No active endpoints found yet. Waiting for deployment...")
-        
-    app.run(port=8080, debug=True)
\ No newline at end of file
+        print("Checking for available SageMaker endpoints...")
+        initial_ep = get_latest_endpoint()
+        if initial_ep:
+            print(f"Ready! Initial target: {initial_ep}")
+        else:
+            print("Warning: No active endpoints found yet. Waiting for deployment...")
+
+    app.run(port=PROXY_PORT, debug=PROXY_DEBUG, threaded=True)
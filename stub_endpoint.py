@@ -0,0 +1,57 @@
+import argparse
+import json
+import threading
+import time
+import zlib
+import flask
+from DataSetup import LABELS
+
+# Local stand-in for the SageMaker endpoint, with the same /ping and /invocations contract
+# as inference.py, so sagemaker_proxy.py can be exercised and load-tested without AWS:
+#   python stub_endpoint.py --latency-ms 30
+#   UPSTREAM_URL=http://127.0.0.1:8081/invocations PROXY_MODE=async python sagemaker_proxy.py
+# Each invocation sleeps latency-ms + per-text-ms * len(texts), like a batched model call.
+
+app = flask.Flask(__name__)
+latency_ms = 20.0
+per_text_ms = 0.2
+_lock = threading.Lock()
+counters = {"invocations": 0, "texts": 0}
+MODEL_VERSION = 'stub'
+
+def predict(text):
+    # Deterministic per text, so results can be checked through the proxy
+    return LABELS[zlib.crc32(text.encode('utf-8')) % len(LABELS)]
+
+@app.route('/ping', methods=['GET'])
+def ping():
+    return flask.Response(response='\n', status=200, mimetype='application/json')
+
+@app.route('/invocations', methods=['POST'])
+def invocations():
+    texts = flask.request.get_json().get('text')
+    if texts is None:
+        return flask.Response(response='Missing "text" field in JSON', status=400, mimetype='text/plain')
+    if isinstance(texts, str):
+        texts = [texts]
+
+    time.sleep((latency_ms + per_text_ms * len(texts)) / 1000)
+    with _lock:
+        counters["invocations"] += 1
+        counters["texts"] += len(texts)
+    return flask.Response(response=json.dumps({"predictions": [predict(t) for t in texts], "model_version": MODEL_VERSION}),
+                          status=200, mimetype='application/json', headers={'X-Model-Version': MODEL_VERSION})
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    with _lock:
+        return flask.jsonify(dict(counters))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stub model endpoint for proxy tests")
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency-ms', type=float, default=latency_ms, help="Fixed cost of one invocation")
+    parser.add_argument('--per-text-ms', type=float, default=per_text_ms, help="Extra cost per text in an invocation")
+    args = parser.parse_args()
+    latency_ms, per_text_ms = args.latency_ms, args.per_text_ms
+    app.run(host='127.0.0.1', port=args.port, threaded=True)
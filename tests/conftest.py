@@ -0,0 +1,16 @@
+import importlib
+import pytest
+
+
+@pytest.fixture(scope='session')
+def inference(tmp_path_factory):
+    # Import without any artifacts: the server records a load error, the helpers still work
+    pytest.importorskip("flask")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(tmp_path_factory.mktemp('no_artifacts'))
+        for var, value in (('INFERENCE_RUNTIME', 'numpy'), ('PREDICTION_CACHE', 'off'), ('WARMUP', '0'),
+                           ('MODEL_WATCH_DIR', ''), ('LENGTH_BUCKETS', '')):
+            mp.setenv(var, value)
+        module = importlib.import_module('inference')
+    assert module.load_error
+    return module
@@ -0,0 +1,64 @@
+import io
+import json
+import pytest
+from bulk_scoring import csv_records, iter_lines, read_records, score_stream
+
+
+def results(stream):
+    return [json.loads(line) for chunk in stream for line in chunk.splitlines()]
+
+
+def upper(texts):
+    return [t.upper() for t in texts]
+
+
+def test_iter_lines_across_blocks():
+    body = 'first\nsecönd\n\nlast'.encode('utf-8')
+    # A 3-byte block splits the two-byte "ö" and every line
+    assert list(iter_lines(io.BytesIO(body), block_size=3)) == ['first\n', 'secönd\n', '\n', 'last']
+
+
+def test_ndjson_with_bad_lines():
+    body = b'{"id": "a", "text": "good"}\nnot json\n\n{"id": "b", "body": "x"}\n"bare string"\n{"text": 3}\n'
+    records = read_records(io.BytesIO(body), 'application/x-ndjson')
+    out = results(score_stream(records, upper, chunk_size=2))
+
+    assert [r['id'] for r in out] == ['a', 1, 'b', 4, 5]
+    assert out[0] == {'id': 'a', 'prediction': 'GOOD'}
+    assert out[1]['error'].startswith('Invalid JSON')
+    assert out[2] == {'id': 'b', 'error': 'Missing "text" string'}
+    assert out[3] == {'id': 4, 'prediction': 'BARE STRING'}
+    assert out[4] == {'id': 5, 'error': 'Missing "text" string'}
+
+
+def test_csv_records_and_text_field():
+    body = b'id,comment\n7,"hello, world"\n8,\n'
+    records = read_records(io.BytesIO(body), 'text/csv; charset=utf-8', text_field='comment')
+    assert results(score_stream(records, upper)) == [{'id': '7', 'prediction': 'HELLO, WORLD'},
+                                                     {'id': '8', 'prediction': ''}]
+
+
+def test_csv_without_text_column():
+    with pytest.raises(ValueError, match='"text" column'):
+        csv_records(iter_lines(io.BytesIO(b'id,comment\n1,hi\n')))
+
+
+def test_predict_failure_ends_the_stream_with_an_error():
+    def flaky(texts):
+        if 'boom' in texts:
+            raise RuntimeError('model down')
+        return upper(texts)
+
+    lines = (json.dumps({'text': t}) + '\n' for t in ['a', 'b', 'boom', 'c'])
+    out = results(score_stream(read_records(io.BytesIO(''.join(lines).encode()), 'application/x-ndjson'), flaky, chunk_size=2))
+    assert out[:2] == [{'id': 0, 'prediction': 'A'}, {'id': 1, 'prediction': 'B'}]
+    assert out[2] == {'error': 'Bulk scoring failed after 2 records: model down'}
+    assert len(out) == 3
+
+
+@pytest.mark.parametrize('text', [[None, 3], ['ok', None], {'a': 'b'}, 5])
+def test_json_text_must_be_strings(inference, monkeypatch, text):
+    monkeypatch.setattr(inference, 'load_error', None)
+    response = inference.app.test_client().post('/invocations', json={'text': text})
+    assert response.status_code == 400
+    assert b'"text" must be a string or a list of strings' in response.data
@@ -0,0 +1,39 @@
+import pandas as pd
+from DataSetup import clean_text, clean_texts
+
+# Strings where the single-pass regex could drift from the two-pass clean_text
+EDGE_CASES = [
+    "",
+    "   ",
+    "Hello World!",
+    "check http://t.co/abc and www.example.com/x?y=1 now",
+    "http://a.b/c,http://d.e/f",
+    "hey @user_1, @@double and email me@example.com",
+    "#hashtag # alone ##twice",
+    "wwwhat is this",
+    "httpnot a url",
+    "emoji 😂🔥 and ünïcödé ÇA VA?",
+    "snake_case stays_ but dash-es go",
+    "tabs\tand\nnewlines\r\n  ",
+    "@mention!http://x.y",
+    "ＦＵＬＬ width ＡＢＣ！",
+    "İstanbul ẞ straße",
+]
+NON_STRINGS = [None, float("nan"), 3, 1.5, b"bytes", ["list"]]
+
+
+def test_list_matches_clean_text():
+    texts = EDGE_CASES + NON_STRINGS
+    assert clean_texts(texts) == [clean_text(t) for t in texts]
+
+
+def test_series_matches_clean_text_and_keeps_index():
+    texts = pd.Series(EDGE_CASES + NON_STRINGS, index=range(100, 100 + len(EDGE_CASES) + len(NON_STRINGS)), dtype=object)
+    cleaned = clean_texts(texts)
+    assert list(cleaned.index) == list(texts.index)
+    assert cleaned.tolist() == [clean_text(t) for t in texts]
+
+
+def test_empty_inputs():
+    assert clean_texts([]) == []
+    assert clean_texts(pd.Series([], dtype=object)).tolist() == []
@@ -0,0 +1,89 @@
+import threading
+import time
+import types
+import pytest
+import endpoint_resolver
+from endpoint_resolver import EndpointResolver, find_latest_endpoint
+
+
+class StubSageMaker:
+    """list_endpoints with a programmable answer (endpoint names, or an exception to raise)."""
+
+    def __init__(self, *answers, delay=0.0):
+        self.answers = list(answers)
+        self.calls = 0
+        self.delay = delay
+
+    def list_endpoints(self, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        answer = self.answers[min(self.calls, len(self.answers)) - 1]
+        if isinstance(answer, Exception):
+            raise answer
+        return {'Endpoints': [{'EndpointName': name, 'EndpointStatus': status} for name, status in answer]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(endpoint_resolver, 'time', types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_find_latest_skips_endpoints_not_in_service():
+    sm = StubSageMaker([('sa-new', 'Creating'), ('sa-old', 'InService')])
+    assert find_latest_endpoint(sm) == 'sa-old'
+    assert find_latest_endpoint(StubSageMaker([])) is None
+
+
+def test_cached_until_ttl_then_refreshed(clock):
+    sm = StubSageMaker([('sa-1', 'InService')], [('sa-2', 'InService')])
+    resolver = EndpointResolver(sm, ttl_seconds=30, background=False)
+    assert resolver.resolve() == 'sa-1'
+    clock[0] += 29
+    assert resolver.resolve() == 'sa-1'
+    assert sm.calls == 1
+    clock[0] += 2
+    assert resolver.resolve() == 'sa-2'
+    assert sm.calls == 2
+    assert resolver.stats()['cache_hits'] == 1
+
+
+def test_failed_refresh_keeps_last_known_and_backs_off(clock):
+    sm = StubSageMaker([('sa-1', 'InService')], RuntimeError("throttled"), RuntimeError("throttled"),
+                       [('sa-2', 'InService')])
+    resolver = EndpointResolver(sm, ttl_seconds=30, retry_seconds=5, background=False)
+    assert resolver.resolve() == 'sa-1'
+    clock[0] += 31
+    assert resolver.resolve() == 'sa-1'   # refresh fails, old entry served
+    clock[0] += 1
+    assert resolver.resolve() == 'sa-1'   # within retry_seconds: no new lookup
+    assert sm.calls == 2
+    clock[0] += 5
+    resolver.resolve()                    # fails again
+    clock[0] += 6
+    assert resolver.resolve() == 'sa-2'
+    assert resolver.stats()['refresh_failures'] == 2
+
+
+def test_invalidate_forces_lookup_on_next_resolve(clock):
+    sm = StubSageMaker([('sa-1', 'InService')], [('sa-2', 'InService')])
+    resolver = EndpointResolver(sm, ttl_seconds=30, retry_seconds=5, background=False)
+    assert resolver.resolve() == 'sa-1'
+    clock[0] += 1
+    resolver.invalidate()
+    assert resolver.resolve() == 'sa-2'
+    assert sm.calls == 2
+
+
+def test_concurrent_callers_share_one_lookup():
+    sm = StubSageMaker([('sa-1', 'InService')], delay=0.2)
+    resolver = EndpointResolver(sm, background=False)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(resolver.resolve())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ['sa-1'] * 8
+    assert sm.calls == 1
@@ -0,0 +1,63 @@
+import types
+import numpy as np
+import pytest
+from fast_tokenizer import FastTokenizer, export_tokenizer, texts_to_padded
+
+KERAS_FILTERS = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n'
+WORD_INDEX = {'<OOV>': 1, 'the': 2, 'video': 3, 'is': 4, 'good': 5, 'bad': 6, 'rare': 7}
+
+
+def keras_like_tokenizer(num_words=None, oov_token='<OOV>'):
+    """The attributes of a fitted Keras Tokenizer that export_tokenizer reads."""
+    return types.SimpleNamespace(word_index=dict(WORD_INDEX), num_words=num_words, oov_token=oov_token,
+                                 filters=KERAS_FILTERS, lower=True, split=' ')
+
+
+@pytest.fixture
+def tokenizer(tmp_path):
+    path = tmp_path / 'vocab.json'
+    export_tokenizer(keras_like_tokenizer(), path, num_words=7)
+    return FastTokenizer.load(path)
+
+
+def test_words_beyond_num_words_become_oov(tokenizer):
+    # 'rare' has index 7, which Keras drops with num_words=7 (it keeps indices < num_words)
+    assert tokenizer.texts_to_sequences(["The video is GOOD", "rare unknown bad"]) == [[2, 3, 4, 5], [1, 1, 6]]
+
+
+def test_filters_split_like_keras(tokenizer):
+    assert tokenizer.texts_to_sequences(["the,video...is\tgood!!", "  ", ""]) == [[2, 3, 4, 5], [], []]
+
+
+def test_without_oov_token_unknown_words_are_dropped(tmp_path):
+    path = tmp_path / 'vocab.json'
+    export_tokenizer(keras_like_tokenizer(oov_token=None), path, num_words=7)
+    assert FastTokenizer.load(path).texts_to_sequences(["the unknown video"]) == [[2, 3]]
+
+
+def test_padding_and_truncation_match_pad_sequences(tokenizer):
+    padded, lengths = tokenizer.texts_to_padded(["good", "the video is good bad", ""], 3, return_lengths=True)
+    assert padded.dtype == np.int32
+    # Zeros in front; longer texts keep their last max_len tokens
+    assert padded.tolist() == [[0, 0, 5], [4, 5, 6], [0, 0, 0]]
+    assert lengths.tolist() == [1, 3, 0]
+    assert np.array_equal(texts_to_padded(tokenizer, ["good"], 3), [[0, 0, 5]])
+
+
+def test_explicit_ids_from_pruned_vocabulary():
+    pruned = FastTokenizer(['good', 'bad'], KERAS_FILTERS, oov_index=1, num_words=3, ids=[2, 3])
+    assert pruned.texts_to_sequences(["good bad other"]) == [[2, 3, 1]]
+
+
+def test_matches_keras_tokenizer(tmp_path):
+    text = pytest.importorskip("tensorflow.keras.preprocessing.text")
+    sequence = pytest.importorskip("tensorflow.keras.preprocessing.sequence")
+    corpus = ["the video is good", "the video is bad", "so good, really good!", "bad_take 2024 ok"]
+    keras_tokenizer = text.Tokenizer(num_words=8, oov_token='<OOV>')
+    keras_tokenizer.fit_on_texts(corpus)
+    export_tokenizer(keras_tokenizer, tmp_path / 'vocab.json')
+    fast = FastTokenizer.load(tmp_path / 'vocab.json')
+
+    texts = corpus + ["never seen words", "", "GOOD good GoOd"]
+    expected = sequence.pad_sequences(keras_tokenizer.texts_to_sequences(texts), maxlen=5)
+    assert np.array_equal(fast.texts_to_padded(texts, 5), expected)
@@ -0,0 +1,38 @@
+import threading
+import time
+import fork_safe
+from fork_safe import ForkSafeStarter
+
+
+def test_starts_once_per_process(monkeypatch):
+    calls = []
+    starter = ForkSafeStarter(lambda: (time.sleep(0.05), calls.append(1)))
+    threads = [threading.Thread(target=starter.ensure_started) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and starter.started()
+
+    # A forked child has another pid: it starts its own
+    monkeypatch.setattr(fork_safe.os, 'getpid', lambda: -1)
+    assert not starter.started()
+    starter.ensure_started()
+    assert len(calls) == 2 and starter.started()
+
+
+def test_failed_start_is_retried():
+    attempts = []
+
+    def start():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("no threads")
+    starter = ForkSafeStarter(start)
+    try:
+        starter.ensure_started()
+    except RuntimeError:
+        pass
+    assert not starter.started()
+    starter.ensure_started()
+    assert starter.started() and len(attempts) == 2
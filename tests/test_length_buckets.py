@@ -0,0 +1,46 @@
+import types
+import numpy as np
+import pytest
+
+pytest.importorskip("flask")
+
+
+class WidthRecorder:
+    """Returns [input width, tokens seen, last token id] per row and remembers each call's shape."""
+
+    def __init__(self):
+        self.shapes = []
+
+    def predict(self, x, verbose=0):
+        self.shapes.append(x.shape)
+        return np.stack([np.full(len(x), x.shape[1]), np.count_nonzero(x, axis=1), x[:, -1]], axis=1).astype(np.float32)
+
+
+def test_parse_buckets(inference):
+    assert inference.parse_buckets('', 100) == []
+    assert inference.parse_buckets('64, 16,32,16', 100) == [16, 32, 64, 100]
+    assert inference.parse_buckets('16,200', 100) == [16, 100]
+
+
+def test_forward_scatters_bucketed_rows_back_in_order(inference):
+    lengths = [3, 40, 0, 16, 17, 100, 5, 64]
+    padded = np.zeros((len(lengths), 100), dtype=np.int32)
+    for row, n in enumerate(lengths):
+        if n:
+            padded[row, 100 - n:] = 1
+            padded[row, -1] = 1000 + row  # identifies the row in the output
+    model = WidthRecorder()
+    out = inference.forward(padded, buckets=[16, 32, 64, 100], serving=types.SimpleNamespace(model=model))
+
+    assert out[:, 0].tolist() == [16, 64, 16, 16, 32, 100, 16, 64]
+    # Every token survives the trim, and row i of the output is row i of the input
+    assert out[:, 1].tolist() == lengths
+    assert out[:, 2].tolist() == [1000 + row if n else 0 for row, n in enumerate(lengths)]
+    assert sorted(model.shapes) == [(1, 32), (1, 100), (2, 64), (4, 16)]
+
+
+def test_forward_without_buckets_runs_one_batch(inference):
+    model = WidthRecorder()
+    padded = np.ones((3, 100), dtype=np.int32)
+    inference.forward(padded, buckets=[], serving=types.SimpleNamespace(model=model))
+    assert model.shapes == [(3, 100)]
@@ -0,0 +1,33 @@
+import threading
+from proxy_load_test import closed_loop, latency_summary
+
+
+def test_closed_loop_sends_every_payload_once():
+    seen, peak, in_flight = [], [0], [0]
+    lock = threading.Lock()
+
+    def send(payload):
+        with lock:
+            seen.append(payload)
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        with lock:
+            in_flight[0] -= 1
+        if payload % 10 == 0:
+            return "HTTP 500"
+        if payload % 10 == 5:
+            raise ConnectionError("reset")
+        return None
+
+    wall, latencies, errors = closed_loop(send, range(1, 101), concurrency=4)
+    assert sorted(seen) == list(range(1, 101))
+    assert len(latencies) == 80 and len(errors) == 20
+    assert errors.count("HTTP 500") == 10 and errors.count("reset") == 10
+    assert peak[0] <= 4 and wall > 0
+
+
+def test_latency_summary():
+    assert latency_summary([]) == {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'mean_ms': None}
+    summary = latency_summary(list(range(1, 101)))
+    assert summary['p50_ms'] == 50.5 and summary['mean_ms'] == 50.5
+    assert 95 <= summary['p95_ms'] <= summary['p99_ms'] <= 100
@@ -0,0 +1,47 @@
+import os
+import pandas as pd
+import pytest
+import DataSetup
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def master(tmp_path, monkeypatch):
+    csv_path = tmp_path / 'master_dataset.csv'
+    parquet_dir = tmp_path / 'master_dataset'
+    monkeypatch.setattr(DataSetup, 'MASTER_CSV', str(csv_path))
+    monkeypatch.setattr(DataSetup, 'MASTER_PARQUET_DIR', str(parquet_dir))
+    monkeypatch.setattr(DataSetup, 'MASTER_DATASET_FORMAT', 'auto')
+
+    def write(kind, label, mtime):
+        df = pd.DataFrame({'text': ['some text'], 'label': [label]})
+        if kind == 'csv':
+            df.to_csv(csv_path, index=False)
+            os.utime(csv_path, (mtime, mtime))
+        else:
+            parquet_dir.mkdir(exist_ok=True)
+            df.to_parquet(parquet_dir / 'part-00000.parquet', index=False)
+            os.utime(parquet_dir / 'part-00000.parquet', (mtime, mtime))
+    return write
+
+
+def test_auto_reads_the_newer_copy(master):
+    master('parquet', 'joy', 1_000_000)
+    master('csv', 'anger', 2_000_000)
+    assert DataSetup.load_master_dataset()['label'].tolist() == ['anger']
+
+    master('parquet', 'fear', 3_000_000)
+    assert DataSetup.load_master_dataset()['label'].tolist() == ['fear']
+
+
+def test_single_copy_and_explicit_format(master, monkeypatch):
+    master('csv', 'anger', 2_000_000)
+    assert DataSetup.master_dataset_format() == 'csv'
+    master('parquet', 'joy', 1_000_000)
+    monkeypatch.setattr(DataSetup, 'MASTER_DATASET_FORMAT', 'parquet')
+    assert DataSetup.load_master_dataset()['label'].tolist() == ['joy']
+
+    monkeypatch.setattr(DataSetup, 'MASTER_DATASET_FORMAT', 'feather')
+    with pytest.raises(ValueError):
+        DataSetup.master_dataset_format()
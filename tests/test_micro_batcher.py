@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import deque
+import pytest
+import micro_batcher
+from micro_batcher import BatchStats, MicroBatcher
+
+
+class RecordingModel:
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        time.sleep(self.delay)
+        return [t.upper() for t in texts]
+
+
+def submit_concurrently(batcher, requests):
+    results = {}
+    start = threading.Barrier(len(requests))
+
+    def client(i, texts):
+        start.wait()
+        results[i] = batcher.submit(texts)
+    threads = [threading.Thread(target=client, args=(i, texts)) for i, texts in enumerate(requests)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_results_scatter_back_in_submission_order():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=16, max_wait_ms=20)
+    requests = [[f"r{i}t{j}" for j in range(i % 4 + 1)] for i in range(30)]
+    results = submit_concurrently(batcher, requests)
+    assert results == {i: [t.upper() for t in texts] for i, texts in enumerate(requests)}
+    assert len(model.batches) < len(requests)
+    assert all(len(b) <= 16 for b in model.batches)
+    snapshot = batcher.stats.snapshot()
+    assert snapshot['requests'] == 30 and snapshot['texts'] == sum(map(len, requests))
+
+
+def test_oversized_request_runs_on_its_own():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=1)
+    assert batcher.submit(list("abcdefg")) == list("ABCDEFG")
+    assert model.batches == [list("abcdefg")]
+
+
+def test_predict_error_reaches_every_caller_in_the_batch():
+    def fail(texts):
+        raise RuntimeError("model failed")
+    batcher = MicroBatcher(fail, max_batch_size=8, max_wait_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher.submit(["x"])
+
+
+def test_close_drains_queued_requests_and_later_submits_run_inline():
+    model = RecordingModel(delay=0.05)
+    batcher = MicroBatcher(model, max_batch_size=2, max_wait_ms=1)
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.submit([f"t{i}"]))) for i in range(6)]
+    for t in threads:
+        t.start()
+    time.sleep(0.02)
+    batcher.close()
+    for t in threads:
+        t.join()
+    assert results == {i: [f"T{i}"] for i in range(6)}
+
+    batcher._worker.join(timeout=1)
+    assert not batcher._worker.is_alive()
+    assert batcher.submit(["late"]) == ["LATE"]
+
+
+def test_shared_stats_across_batchers():
+    stats = BatchStats()
+    for _ in range(2):
+        MicroBatcher(RecordingModel(), stats=stats).submit(["a"])
+    assert stats.snapshot()['batches'] == 2
+
+
+def test_caller_times_out_instead_of_waiting_forever():
+    batcher = MicroBatcher(RecordingModel(delay=0.5), max_wait_ms=1, timeout_s=0.05)
+    with pytest.raises(TimeoutError):
+        batcher.submit(["slow"])
+
+
+def test_concurrent_first_submits_start_one_worker(monkeypatch):
+    # A slow queue constructor widens the window in which a second request could see a half-built batcher
+    def slow_deque():
+        time.sleep(0.05)
+        return deque()
+    monkeypatch.setattr(micro_batcher, 'deque', slow_deque)
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=64, max_wait_ms=20)
+    started = []
+    original = batcher._run
+    batcher._run = lambda: (started.append(1), original())
+    results = submit_concurrently(batcher, [[f"t{i}"] for i in range(16)])
+    assert results == {i: [f"T{i}"] for i in range(16)}
+    assert started == [1]
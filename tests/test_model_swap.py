@@ -0,0 +1,42 @@
+import json
+import types
+import numpy as np
+import pytest
+from fast_tokenizer import FastTokenizer
+
+
+class ConstantModel:
+    def __init__(self, row):
+        self.row = np.asarray(row, dtype=np.float32)
+
+    def predict(self, x, verbose=0):
+        return np.tile(self.row, (len(x), 1))
+
+
+def serving(row):
+    tokenizer = FastTokenizer(['good', 'bad'], filters='!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n')
+    return types.SimpleNamespace(model=ConstantModel(row), tokenizer=tokenizer, classes=np.array(['joy', 'anger']))
+
+
+def test_sanity_check_without_golden_set(inference, tmp_path):
+    # A retrained model that disagrees with the serving one still passes
+    assert inference.golden_agreement(serving([0.1, 0.9]), str(tmp_path)) is None
+    inference.sanity_check(serving([0.1, 0.9]))
+    with pytest.raises(Exception, match='Sanity check failed'):
+        inference.sanity_check(serving([np.nan, 1.0]))
+    with pytest.raises(Exception, match='Sanity check failed'):
+        inference.sanity_check(serving([0.2, 0.3, 0.5]))
+
+
+def test_golden_agreement(inference, tmp_path):
+    rows = [{'text': 'good', 'label': 'joy'}, {'text': 'bad', 'label': 'anger'}]
+    (tmp_path / 'golden_set.jsonl').write_text(''.join(json.dumps(r) + '\n' for r in rows))
+    assert inference.golden_agreement(serving([0.9, 0.1]), str(tmp_path)) == 0.5
+
+
+def test_admin_token(inference, monkeypatch):
+    monkeypatch.setattr(inference, 'ADMIN_TOKEN', 's3cret')
+    client = inference.app.test_client()
+    assert client.get('/admin/model').status_code == 403
+    assert client.get('/admin/model', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+    assert client.get('/admin/model', headers={'X-Admin-Token': 's3cret'}).status_code == 200
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from numpy_runtime import NumpyModel, export_model, quantize_bundle
+
+
+@pytest.fixture(scope='module')
+def keras_model():
+    keras = pytest.importorskip("keras")
+    keras.utils.set_random_seed(0)
+    model = keras.Sequential([
+        keras.Input(shape=(12,)),
+        keras.layers.Embedding(50, 8),
+        keras.layers.SpatialDropout1D(0.2),
+        keras.layers.Bidirectional(keras.layers.LSTM(6, return_sequences=True)),
+        keras.layers.LSTM(5),
+        keras.layers.BatchNormalization(),
+        keras.layers.Dense(7, activation='relu'),
+        keras.layers.Dense(4, activation='softmax'),
+    ])
+    # Non-trivial normalisation statistics, so the folded scale / shift is exercised
+    bn = model.layers[4]
+    bn.moving_mean.assign(np.linspace(-0.5, 0.5, 5).astype(np.float32))
+    bn.moving_variance.assign(np.linspace(0.5, 2.0, 5).astype(np.float32))
+    return model
+
+
+@pytest.fixture(scope='module')
+def token_ids():
+    rng = np.random.default_rng(0)
+    x = rng.integers(1, 50, size=(16, 12)).astype(np.int32)
+    x[:4, :8] = 0  # pre-padded rows, as served
+    return x
+
+
+def test_export_matches_keras(keras_model, token_ids, tmp_path_factory):
+    path = tmp_path_factory.mktemp('bundle') / 'model.npz'
+    export_model(keras_model, ['anger', 'fear', 'joy', 'sadness'], path)
+    numpy_model = NumpyModel.load(path)
+    np.testing.assert_allclose(numpy_model.predict(token_ids), keras_model.predict(token_ids, verbose=0), atol=1e-5)
+    assert numpy_model.classes.tolist() == ['anger', 'fear', 'joy', 'sadness']
+
+
+def test_int8_bundle_stays_close(keras_model, token_ids, tmp_path):
+    export_model(keras_model, ['anger', 'fear', 'joy', 'sadness'], tmp_path / 'fp32.npz')
+    quantize_bundle(tmp_path / 'fp32.npz', tmp_path / 'int8.npz')
+    fp32 = NumpyModel.load(tmp_path / 'fp32.npz').predict(token_ids)
+    int8 = NumpyModel.load(tmp_path / 'int8.npz').predict(token_ids)
+    np.testing.assert_allclose(int8, fp32, atol=0.02)
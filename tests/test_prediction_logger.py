@@ -0,0 +1,53 @@
+import datetime
+import pytest
+from prediction_logger import LogCursor, PredictionLogger, closed_segments, read_segments
+
+
+def utc(*args):
+    return datetime.datetime(*args, tzinfo=datetime.timezone.utc)
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'csv'])
+def test_rows_are_filed_under_their_own_day(tmp_path, fmt):
+    if fmt == 'parquet':
+        pytest.importorskip("pyarrow")
+    logger = PredictionLogger(str(tmp_path), fmt=fmt)
+    logger._segment = None
+    # One flush (after midnight) holding rows from both sides of it
+    logger._flush([(utc(2026, 10, 1, 23, 59, 59, 900000), 'v1', 'late night', 'joy'),
+                   (utc(2026, 10, 2, 0, 0, 0, 100000), 'v1', 'early morning', 'fear')])
+    logger._close_segment()
+
+    before = read_segments(closed_segments(str(tmp_path), '2026-10-01', '2026-10-01'))
+    after = read_segments(closed_segments(str(tmp_path), '2026-10-02', '2026-10-02'))
+    assert before['text'].tolist() == ['late night']
+    assert after['text'].tolist() == ['early morning']
+    assert logger.segments_closed == 2 and logger.logged == 2
+
+
+def test_log_and_close_roundtrip(tmp_path):
+    pytest.importorskip("pyarrow")
+    logger = PredictionLogger(str(tmp_path), flush_rows=2, flush_seconds=0.05)
+    logger.log(['a', 'b', 'c'], ['joy', 'anger', 'fear'], model_version='v1')
+    logger.close()
+    df = read_segments(closed_segments(str(tmp_path)))
+    assert df['text'].tolist() == ['a', 'b', 'c']
+    assert set(df['model_version']) == {'v1'}
+
+
+def test_cursor_only_advances_on_commit(tmp_path):
+    log_dir, state = str(tmp_path / 'logs'), str(tmp_path / 'cursor.json')
+    logger = PredictionLogger(log_dir, fmt='csv')
+    logger._segment = None
+    logger._flush([(utc(2026, 10, 1, 12), 'v1', 'first', 'joy')])
+    logger._close_segment()
+
+    # Read but not committed (e.g. the caller crashed before storing the rows): read again
+    assert LogCursor(state, log_dir).read_new()['text'].tolist() == ['first']
+    cursor = LogCursor(state, log_dir)
+    assert cursor.read_new()['text'].tolist() == ['first']
+    cursor.commit()
+
+    logger._flush([(utc(2026, 10, 1, 13), 'v1', 'second', 'fear')])
+    logger._close_segment()
+    assert LogCursor(state, log_dir).read_new()['text'].tolist() == ['second']
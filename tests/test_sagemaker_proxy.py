@@ -0,0 +1,99 @@
+import importlib
+import time
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("flask_cors")
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.rows = []
+
+    def log(self, texts, predictions, model_version=None):
+        self.rows.append((list(texts), list(predictions), model_version))
+
+
+@pytest.fixture(scope='module')
+def proxy_module(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('UPSTREAM_URL', 'http://127.0.0.1:9/invocations')
+        mp.setenv('PROXY_MODE', 'async')
+        mp.setenv('PROXY_MAX_WAIT_MS', '1')
+        mp.setenv('PREDICTION_LOG_DIR', str(tmp_path_factory.mktemp('logs')))
+        return importlib.import_module('sagemaker_proxy')
+
+
+@pytest.fixture
+def proxy(proxy_module, monkeypatch):
+    logger = RecordingLogger()
+    monkeypatch.setattr(proxy_module, 'prediction_logger', logger)
+    monkeypatch.setattr(proxy_module, 'invoke_upstream',
+                        lambda payload: {'predictions': [t.upper() for t in payload['text']], 'model_version': 'abc123'})
+    return proxy_module, logger
+
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+def test_modes_answer_and_log_alike(proxy, monkeypatch, mode):
+    module, logger = proxy
+    if mode == 'sync':
+        monkeypatch.setattr(module, 'forwarder', None)
+    response = module.app.test_client().post('/invocations', json={'text': ['a', 'b']})
+    assert response.status_code == 200
+    assert response.get_json() == {'predictions': ['A', 'B'], 'model_version': 'abc123'}
+    assert logger.rows == [(['a', 'b'], ['A', 'B'], 'abc123')]
+
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+@pytest.mark.parametrize('body', [{}, {'text': []}, {'text': [None]}, {'text': 3}, ['a']])
+def test_bad_input_is_rejected_before_upstream(proxy, monkeypatch, mode, body):
+    module, logger = proxy
+    if mode == 'sync':
+        monkeypatch.setattr(module, 'forwarder', None)
+
+    def unexpected(payload):
+        raise AssertionError("sent upstream")
+    monkeypatch.setattr(module, 'invoke_upstream', unexpected)
+    response = module.app.test_client().post('/invocations', json=body)
+    assert response.status_code == 400 and 'error' in response.get_json()
+    assert logger.rows == []
+
+
+def test_stalled_upstream_is_a_504(proxy, monkeypatch):
+    module, _ = proxy
+    monkeypatch.setattr(module, 'invoke_upstream', lambda payload: time.sleep(1.0))
+    monkeypatch.setattr(module.forwarder, 'timeout_s', 0.1)
+    response = module.app.test_client().post('/invocations', json={'text': 'slow'})
+    assert response.status_code == 504
+
+
+def client_error(code, message):
+    from botocore.exceptions import ClientError
+    return ClientError({'Error': {'Code': code, 'Message': message}}, 'InvokeEndpoint')
+
+
+@pytest.mark.parametrize('error, invalidates', [
+    (client_error('ValidationError', 'Endpoint sentiment-analysis-v2-1 of account 123 not found.'), True),
+    (client_error('ValidationError', 'Endpoint sentiment-analysis-v2-1 is not in service.'), True),
+    ('connection', True),
+    (client_error('ModelError', 'Received client error (400) from primary'), False),
+    (client_error('ValidationError', '1 validation error detected: Value at body failed to satisfy constraint'), False),
+    (client_error('ThrottlingException', 'Rate exceeded'), False),
+])
+def test_only_endpoint_errors_invalidate_the_resolver(proxy_module, monkeypatch, error, invalidates):
+    if error == 'connection':
+        from botocore.exceptions import EndpointConnectionError
+        error = EndpointConnectionError(endpoint_url='https://runtime.sagemaker.ap-south-1.amazonaws.com')
+    invalidated = []
+
+    class FailingRuntime:
+        def invoke_endpoint(self, **kwargs):
+            raise error
+    monkeypatch.setattr(proxy_module, 'UPSTREAM_URL', '')
+    monkeypatch.setattr(proxy_module, 'runtime', FailingRuntime())
+    monkeypatch.setattr(proxy_module, 'get_latest_endpoint', lambda: 'sentiment-analysis-v2-1')
+    monkeypatch.setattr(proxy_module.resolver, 'invalidate', lambda: invalidated.append(True))
+    with pytest.raises(type(error)) as raised:
+        proxy_module.invoke_upstream({'text': ['hi']})
+    assert raised.value is error
+    assert bool(invalidated) == invalidates
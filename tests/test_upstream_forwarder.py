@@ -0,0 +1,123 @@
+import threading
+import time
+import pytest
+from upstream_forwarder import UpstreamForwarder
+
+
+class FakeUpstream:
+    """invoke_fn that labels each text and records the batches it was sent."""
+
+    def __init__(self, delay=0.0, fail_on=None):
+        self.batches = []
+        self.delay = delay
+        self.fail_on = fail_on
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        time.sleep(self.delay)
+        if self.fail_on is not None and self.fail_on in texts:
+            raise RuntimeError("upstream 500")
+        return {"predictions": [f"label:{t}" for t in texts], "model_version": "v1"}
+
+
+def submit_concurrently(forwarder, requests):
+    results, errors = {}, {}
+    start = threading.Barrier(len(requests))
+
+    def client(i, texts):
+        start.wait()
+        try:
+            results[i] = forwarder.submit(texts)["predictions"]
+        except Exception as e:
+            errors[i] = e
+    threads = [threading.Thread(target=client, args=(i, texts)) for i, texts in enumerate(requests)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_coalesced_results_are_split_back_per_request():
+    upstream = FakeUpstream()
+    forwarder = UpstreamForwarder(upstream, max_batch_size=64, max_wait_ms=50)
+    requests = [[f"r{i}-t{j}" for j in range(i % 3 + 1)] for i in range(20)]
+    results, errors = submit_concurrently(forwarder, requests)
+    assert not errors
+    assert results == {i: [f"label:{t}" for t in texts] for i, texts in enumerate(requests)}
+    # Coalesced into fewer upstream calls than requests, none above the batch limit
+    assert len(upstream.batches) < len(requests)
+    assert max(len(b) for b in upstream.batches) <= 64
+
+
+def test_batches_respect_max_batch_size():
+    upstream = FakeUpstream()
+    forwarder = UpstreamForwarder(upstream, max_batch_size=4, max_wait_ms=50)
+    requests = [["a", "b"], ["c", "d", "e"], ["f"], ["g", "h"]]
+    results, errors = submit_concurrently(forwarder, requests)
+    assert not errors and results[1] == ["label:c", "label:d", "label:e"]
+    assert all(len(b) <= 4 for b in upstream.batches)
+
+
+def test_upstream_error_reaches_only_that_batch():
+    upstream = FakeUpstream(fail_on="bad")
+    forwarder = UpstreamForwarder(upstream, max_batch_size=1, max_wait_ms=1)
+    results, errors = submit_concurrently(forwarder, [["ok"], ["bad"], ["fine"]])
+    assert results == {0: ["label:ok"], 2: ["label:fine"]}
+    assert isinstance(errors[1], RuntimeError)
+
+
+def test_wrong_number_of_predictions_is_an_error():
+    forwarder = UpstreamForwarder(lambda texts: {"predictions": ["only one"]}, max_batch_size=8, max_wait_ms=1)
+    with pytest.raises(ValueError):
+        forwarder.submit(["a", "b"])
+
+
+def test_concurrency_is_bounded():
+    upstream = FakeUpstream(delay=0.05)
+    in_flight, peak = [0], [0]
+    lock = threading.Lock()
+
+    def invoke(texts):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        try:
+            return upstream(texts)
+        finally:
+            with lock:
+                in_flight[0] -= 1
+    forwarder = UpstreamForwarder(invoke, max_batch_size=1, max_wait_ms=1, max_concurrency=2)
+    results, errors = submit_concurrently(forwarder, [[f"t{i}"] for i in range(8)])
+    assert not errors and len(results) == 8
+    assert peak[0] <= 2
+
+
+def test_empty_request_skips_upstream():
+    upstream = FakeUpstream()
+    assert UpstreamForwarder(upstream).submit([]) == {"predictions": []}
+    assert upstream.batches == []
+
+
+def test_response_fields_reach_every_request():
+    forwarder = UpstreamForwarder(FakeUpstream(), max_batch_size=64, max_wait_ms=50)
+    results = {}
+
+    def client(i):
+        results[i] = forwarder.submit([f"t{i}"])
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == {i: {"predictions": [f"label:t{i}"], "model_version": "v1"} for i in range(2)}
+
+
+def test_stalled_upstream_times_out():
+    forwarder = UpstreamForwarder(FakeUpstream(delay=1.0), max_wait_ms=1, timeout_s=0.1)
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        forwarder.submit(["slow"])
+    assert time.perf_counter() - start < 0.5
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fork_safe import ForkSafeStarter
+from micro_batcher import BatchStats
+
+
+class UpstreamForwarder:
+    """
+    Forwards texts to the model endpoint from an asyncio event loop running in a
+    background thread, so a slow upstream call never blocks the request threads.
+
+    `invoke_fn` takes a list of texts and returns the upstream response for them (one
+    invocation): a dict with one entry in "predictions" per text plus any other fields,
+    such as "model_version". Concurrent requests are coalesced: a batch is sent once it
+    holds `max_batch_size` texts or the oldest request has waited `max_wait_ms`, and each
+    request gets the response with its own slice of the predictions. At most
+    `max_concurrency` invocations are in flight; the blocking client calls run on a pool
+    of the same size, which should match the client's connection pool. A request that
+    has no response after `timeout_s` raises TimeoutError.
+    """
+
+    def __init__(self, invoke_fn, max_batch_size=64, max_wait_ms=5.0, max_concurrency=8, timeout_s=60.0):
+        self.invoke_fn = invoke_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_concurrency = max_concurrency
+        self.timeout_s = timeout_s
+        self.stats = BatchStats()
+        self._starter = ForkSafeStarter(self._start_loop)
+
+    def _start_loop(self):
+        self._loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="upstream")
+        self._semaphore = None
+        self._pending = []
+        self._timer = None
+        threading.Thread(target=self._loop.run_forever, name="upstream-forwarder", daemon=True).start()
+
+    def submit(self, texts):
+        """Blocks the calling (request) thread until `texts` have been predicted upstream."""
+        if not texts:
+            return {"predictions": []}
+        self._starter.ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self.forward(list(texts)), self._loop)
+        try:
+            return future.result(timeout=self.timeout_s)
+        except TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"No upstream response within {self.timeout_s}s")
+
+    async def forward(self, texts):
+        """Coroutine version of submit(), for callers already on the forwarder's loop."""
+        future = self._loop.create_future()
+        self._pending.append((texts, future, time.perf_counter()))
+        if sum(len(p[0]) for p in self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = [self._pending.pop(0)]
+            size = len(batch[0][0])
+            while self._pending and size + len(self._pending[0][0]) <= self.max_batch_size:
+                item = self._pending.pop(0)
+                size += len(item[0])
+                batch.append(item)
+            self._loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        texts = [t for item in batch for t in item[0]]
+        async with self._semaphore:
+            dispatched = time.perf_counter()
+            waits_ms = [(dispatched - item[2]) * 1000 for item in batch]
+            try:
+                response = await self._loop.run_in_executor(self._executor, self.invoke_fn, texts)
+                results = response['predictions']
+                if len(results) != len(texts):
+                    raise ValueError(f"Upstream returned {len(results)} predictions for {len(texts)} texts")
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            self.stats.record_batch(len(texts), len(batch), waits_ms, (time.perf_counter() - dispatched) * 1000)
+
+        # Scatter results back to each caller in submission order
+        offset = 0
+        for item_texts, future, _ in batch:
+            if not future.done():
+                future.set_result(dict(response, predictions=results[offset:offset + len(item_texts)]))
+            offset += len(item_texts)